@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+benchmark_suite.py
+
+This module runs a suite of protocol configurations and compares the results
+against earlier runs. The summary metrics of every run are stored in a local
+SQLite database, and a run is flagged as a regression when it is
+significantly slower, sends more data or uses more energy than its baseline.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+import config_engine
+import utils
+from data_processor import DataProcessor
+
+# Metrics for which a higher value is a regression
+REGRESSION_METRICS = ("duration", "data", "energy")
+
+# Configuration keys that define a benchmark, runs with the same values are
+# compared against each other.
+IDENTITY_KEYS = ("name", "run", "iterations", "topology", "network-profile",
+                 "cpus", "cpuset", "memory")
+
+
+class HistoryDatabase:
+    """
+    The history of benchmark runs, stored in a SQLite database.
+
+    Every run is stored with the key of its benchmark, the time it was run
+    and its summary metrics.
+    """
+
+    def __init__(self, path):
+        """
+        Open the database, creating it if it does not exist yet.
+
+        :param path: Path to the database file.
+        """
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "benchmark TEXT NOT NULL, "
+            "name TEXT NOT NULL, "
+            "timestamp REAL NOT NULL, "
+            "config TEXT NOT NULL, "
+            "summary TEXT NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS runs_benchmark "
+            "ON runs (benchmark, timestamp)"
+        )
+        self._connection.commit()
+
+    def record(self, benchmark, config, summary):
+        """
+        Store the summary of a run.
+
+        :param benchmark: Key of the benchmark.
+        :param config: Configuration data of the run.
+        :param summary: Summary of the run, see DataProcessor.summary.
+        """
+        self._connection.execute(
+            "INSERT INTO runs (benchmark, name, timestamp, config, summary) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (benchmark, config["name"], time.time(),
+             json.dumps(benchmark_identity(config)), json.dumps(summary))
+        )
+        self._connection.commit()
+
+    def baseline(self, benchmark, size):
+        """
+        Get the summaries of the most recent runs of a benchmark.
+
+        :param benchmark: Key of the benchmark.
+        :param size: Maximum number of runs.
+        :return: List of summaries, the most recent first.
+        """
+        rows = self._connection.execute(
+            "SELECT summary FROM runs WHERE benchmark = ? "
+            "ORDER BY timestamp DESC LIMIT ?",
+            (benchmark, size)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self):
+        """
+        Close the database.
+        """
+        self._connection.close()
+
+
+def benchmark_identity(config):
+    """
+    Get the part of the configuration that defines the benchmark.
+
+    :param config: Configuration data.
+    :return: Dictionary with the identifying configuration values.
+    """
+    return {key: config.get(key) for key in IDENTITY_KEYS}
+
+
+def benchmark_key(config):
+    """
+    Get the key of the benchmark of a configuration.
+
+    :param config: Configuration data.
+    :return: A hash of the identifying configuration values.
+    """
+    identity = json.dumps(benchmark_identity(config), sort_keys=True)
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+
+
+def detect_regressions(summary, baseline, threshold, tolerance,
+                       metrics=REGRESSION_METRICS):
+    """
+    Compare a run against its baseline. A metric regresses when its mean is
+    more than `threshold` standard deviations above the mean of the baseline
+    runs, and more than `tolerance` relatively higher. The spread of the
+    baseline combines the variation between runs and within runs, so
+    baselines of a single run can be used as well.
+
+    :param summary: Summary of the new run.
+    :param baseline: Summaries of the baseline runs.
+    :param threshold: Number of standard deviations that is tolerated.
+    :param tolerance: Relative increase that is tolerated.
+    :param metrics: Metrics for which a higher value is a regression.
+    :return: Dictionary mapping regressed metrics to a description.
+    """
+    regressions = {}
+    for metric in metrics:
+        value = summary.get(metric)
+        means = [run[metric] for run in baseline if run.get(metric)
+                 is not None]
+        if value is None or not means:
+            continue
+
+        samples = [sample for run in baseline
+                   for sample in run["iterations"].get(metric, [])]
+        mean = float(np.mean(means))
+        spread = float(np.std(samples)) if samples else 0.0
+        if len(means) > 1:
+            spread = max(spread, float(np.std(means, ddof=1)))
+
+        if value > mean + threshold * spread and \
+                value > mean * (1 + tolerance):
+            change = (value - mean) / mean * 100 if mean else float("inf")
+            regressions[metric] = (f"{value:.3f} vs baseline {mean:.3f} "
+                                   f"(+{change:.1f}%)")
+    return regressions
+
+
+def load_suite(suite_path):
+    """
+    Load a benchmark suite. A suite is a JSON file with a `benchmarks` list,
+    where every entry has the `name` of a protocol and optionally a `config`
+    path and values that override the configuration of the protocol, such
+    as `iterations`, `run`, `cpus` or `network-profile`. The command can also
+    be built from the command template of the protocol, with the `mode` and
+    the `values` of its variables.
+
+    :param suite_path: Path to the suite file.
+    :return: List of configurations to run.
+    """
+    suite = utils.parse_config(suite_path)
+    configs = []
+    for entry in suite.get("benchmarks", []):
+        entry = dict(entry)
+        name = entry.pop("name")
+        protocol_path = os.path.join(os.getcwd(), "protocols", name)
+        config_path = entry.pop("config", None)
+        if config_path is None:
+            config_path = os.path.join(protocol_path, "config.json")
+
+        config = utils.parse_config(config_path)
+        values = entry.pop("values", None)
+        if values is not None or "mode" in entry:
+            protocol = config_engine.Protocol(name, protocol_path, config)
+            try:
+                config = protocol.configure(values, entry.pop("mode", None))
+            except ValueError as e:
+                print(f"Invalid command for benchmark '{name}': {e}")
+                exit(1)
+        config.update({"iterations": 1, "verbose": False, "built": False,
+                       "max-top": 0})
+        config.update(entry)
+        config["name"] = name
+        config["path"] = protocol_path
+        if utils.validate_config(config) is False:
+            print(f"Invalid configuration for benchmark '{name}'")
+            exit(1)
+        configs.append(config)
+    return configs
+
+
+def run_suite(suite_path, history_path, threshold=3.0, tolerance=0.05,
+              baseline_size=10, sudo_password=None):
+    """
+    Run every benchmark of a suite, compare it against its baseline and store
+    it in the history database.
+
+    :param suite_path: Path to the suite file.
+    :param history_path: Path to the history database.
+    :param threshold: Number of standard deviations that is tolerated.
+    :param tolerance: Relative increase that is tolerated.
+    :param baseline_size: Number of earlier runs in the baseline.
+    :param sudo_password: Sudo password for Scaphandre, if required.
+    :return: Dictionary mapping benchmark names to their regressions, or
+    None if the suite was interrupted.
+    """
+    configs = load_suite(suite_path)
+    sudo_password = utils.get_sudo_password(sudo_password)
+    history = HistoryDatabase(history_path)
+    all_regressions = {}
+    try:
+        for config in configs:
+            print(f"== Benchmark '{config['name']}' ==")
+            result = utils.run_protocol(config, sudo_password)
+            if result[0] is False:
+                print(f"Error running benchmark '{config['name']}': "
+                      f"{result[1]}")
+                continue
+            if config.get("interrupted"):
+                # A partial run would become part of the baseline of every
+                # later run
+                return None
+            summary = DataProcessor(config).summary(sudo_password != "")
+
+            key = benchmark_key(config)
+            baseline = history.baseline(key, baseline_size)
+            regressions = detect_regressions(summary, baseline, threshold,
+                                             tolerance)
+            if config.get("cached"):
+                print("Results reused from the run cache, not recorded in "
+                      "the history")
+            else:
+                history.record(key, config, summary)
+
+            if not baseline:
+                print("No baseline yet, this run is the new baseline")
+            elif regressions:
+                print("Regression detected:")
+                for metric, description in regressions.items():
+                    print(f"  {metric}: {description}")
+                all_regressions[config["name"]] = regressions
+            else:
+                print(f"No regression compared to {len(baseline)} "
+                      "earlier run(s)")
+            print()
+    finally:
+        history.close()
+    return all_regressions
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+calibration.py
+
+This module measures how much the measurement backends distort the protocol
+they observe. The same configuration is run with every backend on its own,
+with none and with all of them, and the duration, the CPU time of the
+container and the energy of every variant are compared. The variants are
+run in turns over several repetitions, so a slow drift of the host, such as
+its temperature, affects all of them alike. The overhead of
+every backend and the correction factors for a fully measured run are
+reported with bootstrap confidence intervals, so an overhead that is within
+the noise of the measurements is recognized as such.
+"""
+
+import json
+import os
+
+import run_statistics
+import utils
+
+# Variants of a calibration and the backends that are enabled in them
+VARIANTS = (
+    ("baseline", ()),
+    ("nethogs", ("nethogs",)),
+    ("resources", ("resources",)),
+    ("scaphandre", ("scaphandre",)),
+    ("all", utils.OBSERVERS),
+)
+
+# Variant every metric is compared against. Energy can only be measured
+# with Scaphandre, so its reference is the variant with only Scaphandre.
+REFERENCES = {"duration": "baseline", "cpu": "baseline",
+              "energy": "scaphandre"}
+
+UNITS = {"duration": "s", "cpu": "s", "energy": "J"}
+
+# Number of times every variant is run
+REPETITIONS = 3
+
+
+def run_calibration(config, sudo_password=None, repetitions=REPETITIONS):
+    """
+    Run every variant of the calibration, and report and store the overhead
+    of the backends in calibration.json in the results directory. In every
+    repetition, the variants are run once each, starting one variant later
+    than in the previous repetition, so no variant is always run first or
+    last. The iterations of all repetitions of a variant are pooled.
+
+    :param config: Configuration data.
+    :param sudo_password: Sudo password for Scaphandre, if required.
+    :param repetitions: Number of times every variant is run.
+    :return: Tuple indicating success and a message.
+    """
+    from data_processor import DataProcessor
+
+    if config["iterations"] * repetitions < 5:
+        print("Warning: with fewer than 5 iterations per variant, the "
+              "confidence intervals of the overhead are wide")
+
+    sudo_password = utils.get_sudo_password(sudo_password)
+    variants = list(VARIANTS)
+    if sudo_password == "":
+        print("Scaphandre is not available, skipping the energy "
+              "calibration")
+        variants = [(name, observers) for name, observers in variants
+                    if name != "scaphandre"]
+
+    campaign_dir = utils.new_results_dir(config)
+    samples = {}
+    for repetition in range(repetitions):
+        shift = repetition % len(variants)
+        for name, observers in variants[shift:] + variants[:shift]:
+            print(f"== Calibration run '{name}' "
+                  f"({repetition + 1}/{repetitions}) ==")
+            run_config = dict(config, observers=list(observers),
+                              results=os.path.join(
+                                  campaign_dir, f"{name}_{repetition}"))
+            os.makedirs(run_config["results"])
+            result = utils.run_protocol(run_config, sudo_password)
+            if result[0] is False:
+                return result
+            if run_config.get("interrupted"):
+                return False, "Calibration interrupted"
+            # The image only has to be built for the first run
+            config["built"] = True
+            iterations = DataProcessor(run_config).summary(
+                utils.has_power_measurements(run_config))["iterations"]
+            for metric, values in iterations.items():
+                samples.setdefault(name, {}).setdefault(
+                    metric, []).extend(values)
+
+    report = calibration_report(samples)
+    report["config"] = {key: config.get(key) for key in
+                        ("name", "run", "iterations", "topology",
+                         "network-profile", "cpus", "cpuset", "memory")}
+    report["config"]["repetitions"] = repetitions
+    print_report(report)
+    with open(os.path.join(campaign_dir, "calibration.json"), "w") as f:
+        json.dump(report, f, indent=4)
+    return True, "Calibration executed successfully"
+
+
+def calibration_report(samples):
+    """
+    Compute the overhead of every variant relative to its reference, and
+    the correction factors that convert the measurements of a run with all
+    backends to an unobserved run.
+
+    :param samples: Dictionary mapping variant names to the value of every
+    metric for every iteration, as in the "iterations" of
+    DataProcessor.summary.
+    :return: Dictionary with the statistics of every variant, the overhead
+    of every variant per metric, and the correction factors per metric.
+    """
+    report = {"variants": {}, "overhead": {}, "correction_factors": {}}
+    for name, metrics in samples.items():
+        report["variants"][name] = {
+            metric: run_statistics.describe(metrics.get(metric, []))
+            for metric in REFERENCES}
+
+    for metric, reference in REFERENCES.items():
+        if not samples.get(reference, {}).get(metric):
+            continue
+        baseline = samples[reference][metric]
+        for name, metrics in samples.items():
+            if name == reference or not metrics.get(metric):
+                continue
+            ratio, low, high = run_statistics.ratio_interval(
+                metrics[metric], baseline)
+            report["overhead"].setdefault(name, {})[metric] = {
+                "overhead": ratio - 1, "ci_low": low - 1,
+                "ci_high": high - 1, "significant": not low <= 1 <= high,
+                "reference": reference}
+
+        if samples.get("all", {}).get(metric):
+            factor, low, high = run_statistics.ratio_interval(
+                baseline, samples["all"][metric])
+            report["correction_factors"][metric] = {
+                "factor": factor, "ci_low": low, "ci_high": high,
+                "reference": reference}
+    return report
+
+
+def print_report(report):
+    """
+    Print the overhead of every variant and the correction factors.
+
+    :param report: The result of calibration_report.
+    """
+    print("== Observer overhead ==")
+    for name, metrics in report["overhead"].items():
+        print(f"{name}:")
+        for metric, overhead in metrics.items():
+            note = "" if overhead["significant"] else ", within noise"
+            print(f"  {metric} {overhead['overhead'] * 100:+.2f}% "
+                  f"[{overhead['ci_low'] * 100:+.2f}%, "
+                  f"{overhead['ci_high'] * 100:+.2f}%] "
+                  f"(vs {overhead['reference']}{note})")
+    print()
+
+    print("== Correction factors for a fully measured run ==")
+    for metric, factor in report["correction_factors"].items():
+        print(f"{metric} ({UNITS[metric]}): x{factor['factor']:.4f} "
+              f"[{factor['ci_low']:.4f}, {factor['ci_high']:.4f}]")
+    print()
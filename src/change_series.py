@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+change_series.py
+
+This module stores time series that change rarely, such as the cumulative
+data amounts reported by nethogs, by the samples at which their value
+changes. nethogs reports the total of every party in every refresh, even
+when nothing was sent, so a protocol that computes locally for most of an
+iteration produces long runs of repeated values. A series of changes is
+resampled, differentiated and averaged over iterations without expanding
+these runs.
+"""
+
+import numpy as np
+
+
+class ChangeSeries:
+    def __init__(self, indices=(), values=(), length=0):
+        """
+        Initialize a series from the samples at which its value changes. The
+        value before the first change is 0.
+
+        :param indices: Increasing sample indices at which the value changes.
+        :param values: Value of the series from every index on.
+        :param length: Number of samples of the series.
+        """
+        self._indices = list(indices)
+        self._values = list(values)
+        self.length = length
+
+    @classmethod
+    def from_samples(cls, indices, values, length):
+        """
+        Create a series from the value at a number of samples, dropping the
+        samples that do not change the value.
+
+        :param indices: Increasing sample indices.
+        :param values: Value of the series at every index.
+        :param length: Number of samples of the series.
+        :return: The series.
+        """
+        indices = np.asarray(indices)
+        values = np.asarray(values, dtype=float)
+        changes = np.diff(values, prepend=0.0) != 0
+        return cls(indices[changes], values[changes], length)
+
+    @property
+    def indices(self):
+        """Sample indices at which the value changes."""
+        return np.asarray(self._indices, dtype=int)
+
+    @property
+    def values(self):
+        """Value of the series from every index in indices on."""
+        return np.asarray(self._values, dtype=float)
+
+    @property
+    def last(self):
+        """Value of the last sample of the series."""
+        return self._values[-1] if self._values else 0.0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, index, value):
+        """
+        Add the value of a sample. Only a changed value is stored.
+
+        :param index: Index of the sample, not before the stored indices.
+        :param value: Value of the sample.
+        """
+        if self._indices and self._indices[-1] == index:
+            # A later report of the same sample replaces the earlier one
+            self._indices.pop()
+            self._values.pop()
+        if value != self.last:
+            self._indices.append(index)
+            self._values.append(value)
+        self.length = max(self.length, index + 1)
+
+    def at(self, indices):
+        """
+        Look up the value of the series at a number of samples.
+
+        :param indices: Sample indices.
+        :return: Array with the value at every index.
+        """
+        positions = np.searchsorted(self.indices, indices, side="right")
+        return np.concatenate([[0.0], self.values])[positions]
+
+    def resample(self, delay, step, count):
+        """
+        Resample the series to equally spaced timestamps, by taking the
+        nearest sample for every timestamp. Samples beyond the end of the
+        series take the value of the last sample.
+
+        :param delay: Time between the samples of the series.
+        :param step: Time between the resampled timestamps.
+        :param count: Number of resampled timestamps, starting at 0.
+        :return: The resampled series, with count samples.
+        """
+        if delay <= 0 or not self._indices:
+            return ChangeSeries([0], [self.last], count) if self.last \
+                else ChangeSeries(length=count)
+
+        # A timestamp takes the value of a change once the change is the
+        # nearest sample, that is after the time halfway to the sample
+        # before it
+        positions = np.floor((self.indices - 0.5) * delay / step) + 1
+        positions = np.clip(positions, 0, count).astype(int)
+        keep = (positions < count) & np.append(
+            positions[1:] != positions[:-1], True)
+        return ChangeSeries.from_samples(positions[keep], self.values[keep],
+                                         count)
+
+    def difference(self, step):
+        """
+        Compute the rate of change of the series between consecutive
+        samples, which is 0 at the first sample.
+
+        :param step: Time between the samples.
+        :return: The rate of change, as a series with the same length.
+        """
+        indices = self.indices
+        indices = np.union1d(indices, indices + 1)
+        indices = indices[(indices > 0) & (indices < self.length)]
+        rates = (self.at(indices) - self.at(indices - 1)) / step
+        return ChangeSeries.from_samples(indices, rates, self.length)
+
+    def times(self, step):
+        """
+        Get the timestamps of the changes of the series.
+
+        :param step: Time between the samples.
+        :return: Array with the time of every change.
+        """
+        return self.indices * step
+
+
+def stack(series):
+    """
+    Look up the value of a number of series at every sample at which any of
+    them changes, so that they can be aggregated over the series.
+
+    :param series: List of series.
+    :return: Tuple of the array of sample indices and a two-dimensional
+    array with one row per series.
+    """
+    indices = np.unique(np.concatenate(
+        [[0]] + [item.indices for item in series])).astype(int)
+    return indices, np.array([item.at(indices) for item in series])
+
+
+def mean(series):
+    """
+    Compute the pointwise mean of a number of series.
+
+    :param series: List of series.
+    :return: The mean, as a series with the length of the longest series.
+    """
+    indices, values = stack(series)
+    return ChangeSeries.from_samples(
+        indices, values.mean(axis=0),
+        max(item.length for item in series))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+checkpoint.py
+
+This module saves the measurements of every iteration on the host as soon as
+the iteration is finished, so an interrupted run keeps its completed
+iterations and can be resumed. The protocol manager prints a checkpoint line
+after every iteration, upon which the files of that iteration are retrieved
+from the container while the next iteration runs.
+"""
+
+import json
+import os
+import re
+import threading
+
+CHECKPOINT_PREFIX = "snnif-checkpoint "
+
+# Files written by the protocol manager for every iteration
+ITERATION_FILES = ("nethogs", "phases", "resources")
+
+# A line of time.txt, such as "iteration_stop_3: 1700000000.0"
+TIME_LINE = re.compile(r"^(\w+)_(\d+):")
+
+
+def iteration_files(run):
+    """
+    Get the names of the files of an iteration.
+
+    :param run: Index of the iteration.
+    :return: List of file names, relative to the working directory.
+    """
+    return [f"{kind}_{run}.txt" for kind in ITERATION_FILES]
+
+
+def party_dirs(config):
+    """
+    Get the directories the containers of a run save their files to.
+
+    :param config: Configuration data, with the results directory set.
+    :return: List of directories, one for every container.
+    """
+    if config.get("topology", "single") == "multi":
+        return [os.path.join(config["results"], f"party_{i}")
+                for i in range(len(config["parties"]))]
+    return [config["results"]]
+
+
+def completed_iterations(config):
+    """
+    Count the iterations of a run whose measurements were all saved. An
+    iteration is complete if its stop time is in time.txt and its files
+    exist, in the directory of every container.
+
+    :param config: Configuration data, with the results directory set.
+    :return: Number of leading iterations that are complete.
+    """
+    completed = config["iterations"]
+    for directory in party_dirs(config):
+        stopped = set()
+        try:
+            with open(os.path.join(directory, "time.txt"), "r") as f:
+                for line in f:
+                    match = TIME_LINE.match(line)
+                    if match and match.group(1) == "iteration_stop":
+                        stopped.add(int(match.group(2)))
+        except OSError:
+            return 0
+
+        run = 0
+        while run < completed and run in stopped and all(
+                os.path.exists(os.path.join(directory, file))
+                for file in iteration_files(run)):
+            run += 1
+        completed = run
+    return completed
+
+
+def truncate_times(path, iterations):
+    """
+    Remove the times of the iterations that are run again from time.txt, so
+    the resumed run does not write them twice.
+
+    :param path: Path to time.txt.
+    :param iterations: Number of iterations to keep.
+    """
+    with open(path, "r") as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        for line in lines:
+            match = TIME_LINE.match(line)
+            if match is None or int(match.group(2)) < iterations:
+                f.write(line)
+
+
+def stop_time(path, run):
+    """
+    Read the stop time of an iteration from time.txt.
+
+    :param path: Path to time.txt.
+    :param run: Index of the iteration.
+    :return: The stop time, or None if the iteration did not stop.
+    """
+    with open(path, "r") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key == f"iteration_stop_{run}":
+                return float(value.strip())
+    return None
+
+
+def truncate_power(path, stop):
+    """
+    Remove the Scaphandre samples taken after a time, such as those of the
+    iteration that was interrupted. Its nethogs instance would otherwise
+    start an extra power iteration before the resumed ones.
+
+    :param path: Path to the Scaphandre output.
+    :param stop: Time after which the samples are removed.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        data = f.read()
+    kept = []
+    position = 0
+    while True:
+        position = data.find("{", position)
+        if position < 0:
+            break
+        try:
+            obj, position = decoder.raw_decode(data, position)
+        except json.JSONDecodeError:
+            # The object written when Scaphandre was stopped is incomplete
+            break
+        timestamps = [consumer["timestamp"]
+                      for consumer in obj.get("consumers", [])]
+        timestamp = obj.get("host", {}).get(
+            "timestamp", min(timestamps, default=None))
+        if timestamp is not None and timestamp <= stop:
+            kept.append(obj)
+    with open(path, "w") as f:
+        for obj in kept:
+            f.write(json.dumps(obj) + "\n")
+
+
+def merge_files(first, second):
+    """
+    Append a file to another one and delete it, such as the power
+    measurements of a resumed run to those of the interrupted run.
+
+    :param first: Path to the file that is appended to.
+    :param second: Path to the file that is appended and deleted.
+    """
+    if not os.path.exists(second):
+        return
+    with open(first, "a") as out, open(second, "r") as f:
+        for line in f:
+            out.write(line)
+    os.remove(second)
+
+
+class Checkpointer:
+    """
+    Retrieves the files of every iteration from a container when the
+    protocol manager reports that the iteration is finished.
+
+    It is fed the output of the protocol manager, in the thread that reads
+    the output of the container, and keeps track of the iterations that were
+    saved, so only the missing files are retrieved at the end of the run.
+    """
+
+    def __init__(self, docker_manager, directory, callback=None):
+        """
+        Initialize the checkpointer.
+
+        :param docker_manager: The Docker manager of the container.
+        :param directory: Directory the files are saved to.
+        :param callback: Function the output is passed on to, or None.
+        """
+        self._manager = docker_manager
+        self._directory = directory
+        self._callback = callback
+        self._buffer = ""
+        self._lock = threading.Lock()
+        self.saved = set()
+
+    def feed(self, text):
+        """
+        Feed output of the protocol manager. The output may be split at
+        arbitrary positions, so incomplete lines are buffered.
+
+        :param text: A chunk of output from the container.
+        """
+        if self._callback is not None:
+            self._callback(text)
+        lines = (self._buffer + text.replace("\r", "")).split("\n")
+        self._buffer = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line.startswith(CHECKPOINT_PREFIX):
+                try:
+                    run = int(line[len(CHECKPOINT_PREFIX):])
+                except ValueError:
+                    continue
+                self.save(run)
+
+    def save(self, run):
+        """
+        Retrieve the files of an iteration, and then time.txt, so the
+        iteration only appears complete once all its files are saved.
+
+        :param run: Index of the iteration.
+        """
+        with self._lock:
+            for file in iteration_files(run) + ["time.txt"]:
+                self._manager.retrieve_file(
+                    f"{self._manager.workdir}/{file}",
+                    os.path.join(self._directory, file))
+            self.saved.add(run)
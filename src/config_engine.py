@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+config_engine.py
+
+This module validates the protocol configurations and expands their command
+templates, for both the command line and the GUI. A `command_template` is
+compiled once into a format string, so expanding it for a combination of
+variable values only checks the values and formats the string. A protocol
+is only read, validated and compiled when it is first used.
+"""
+
+import json
+import os
+import re
+from collections.abc import Mapping
+
+# A variable in a command template, such as ${NETWORK}
+TEMPLATE_VARIABLE = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+# Variable that holds the selected mode in the templates of a protocol with
+# modes
+MODE_VARIABLE = "MODE"
+
+
+class CommandTemplate:
+    """
+    A command template compiled into a format string.
+
+    The literal parts of the template are escaped and every ${VAR} is
+    replaced by {VAR}, so a template is expanded with a single call to
+    str.format_map.
+    """
+
+    def __init__(self, template):
+        """
+        Compile the template.
+
+        :param template: The command template, with ${VAR} placeholders.
+        """
+        parts = TEMPLATE_VARIABLE.split(template)
+        format_string = ""
+        for i, part in enumerate(parts):
+            if i % 2 == 0:
+                format_string += part.replace("{", "{{").replace("}", "}}")
+            else:
+                format_string += "{" + part + "}"
+        self.template = template
+        self.variables = frozenset(parts[1::2])
+        self._format = format_string.format_map
+
+    def expand(self, values):
+        """
+        Substitute the values of the variables in the template.
+
+        :param values: Dictionary mapping every variable to its value.
+        :return: The command.
+        """
+        return self._format(values)
+
+
+def validate_variables(variables):
+    """
+    Check the `variables` of a configuration. Every variable either has a
+    list of `options`, or an integer `min` and `max`. The `default`, if
+    given, must be one of the options or within the range.
+
+    :param variables: The variables of the configuration.
+    :return: List of error messages, empty if the variables are valid.
+    """
+    errors = []
+    if not isinstance(variables, dict):
+        return ["'variables' must be an object"]
+
+    for name, info in variables.items():
+        if not TEMPLATE_VARIABLE.fullmatch(f"${{{name}}}"):
+            errors.append(f"invalid variable name '{name}'")
+            continue
+        if not isinstance(info, dict):
+            errors.append(f"variable '{name}' must be an object")
+            continue
+        default = info.get("default")
+        if "options" in info:
+            options = info["options"]
+            if not isinstance(options, list) or not options:
+                errors.append(f"variable '{name}' must have a non-empty "
+                              "list of options")
+            elif default is not None and default not in options:
+                errors.append(f"default '{default}' of variable '{name}' is "
+                              "not one of its options")
+        elif "min" in info and "max" in info:
+            low, high = info["min"], info["max"]
+            if not isinstance(low, int) or not isinstance(high, int):
+                errors.append(f"'min' and 'max' of variable '{name}' must "
+                              "be integers")
+            elif low > high:
+                errors.append(f"'min' of variable '{name}' is larger than "
+                              "its 'max'")
+            elif default is not None and not (
+                    isinstance(default, int) and low <= default <= high):
+                errors.append(f"default '{default}' of variable '{name}' is "
+                              f"not between {low} and {high}")
+        else:
+            errors.append(f"variable '{name}' must have either 'options' "
+                          "or 'min' and 'max'")
+    return errors
+
+
+def validate_modes(config):
+    """
+    Check the `modes` of a configuration. Every mode must have a
+    `command_template`, and the `default_mode` must be one of the modes.
+
+    :param config: Configuration data.
+    :return: List of error messages, empty if the modes are valid.
+    """
+    modes = config.get("modes")
+    if modes is None:
+        return []
+    if not isinstance(modes, dict) or not modes:
+        return ["'modes' must be a non-empty object"]
+
+    errors = []
+    for name, mode in modes.items():
+        if not isinstance(mode, dict) or \
+                not isinstance(mode.get("command_template"), str):
+            errors.append(f"mode '{name}' must have a 'command_template'")
+        elif not isinstance(mode.get("extra_files", []), list):
+            errors.append(f"'extra_files' of mode '{name}' must be a list")
+    default_mode = config.get("default_mode")
+    if default_mode is not None and default_mode not in modes:
+        errors.append(f"default mode '{default_mode}' is not one of the "
+                      "modes")
+    return errors
+
+
+def validate(config):
+    """
+    Check the variables, modes and command templates of a configuration.
+    Every variable used in a template must be declared in `variables`. When
+    the command is built from a template, the command of every party must be
+    built from a template as well, so the values also apply when every party
+    runs in its own container.
+
+    :param config: Configuration data.
+    :return: List of error messages, empty if the configuration is valid.
+    """
+    errors = validate_variables(config.get("variables", {}))
+    errors += validate_modes(config)
+    parties = config.get("parties", [])
+    if not isinstance(parties, list):
+        errors.append("'parties' must be a list")
+    elif "command_template" in config or "modes" in config:
+        for i, party in enumerate(parties):
+            if not isinstance(party.get("command_template"), str):
+                errors.append(f"party {i} must have a 'command_template'")
+    if errors:
+        return errors
+
+    declared = set(config.get("variables", {}))
+    if "modes" in config:
+        declared.add(MODE_VARIABLE)
+    for label, template in _templates(config).items():
+        for variable in sorted(template.variables - declared):
+            errors.append(f"{label} uses undeclared variable '{variable}'")
+    return errors
+
+
+def _templates(config):
+    """
+    Compile the command templates of a configuration.
+
+    :param config: Configuration data.
+    :return: Dictionary mapping a description of every template to the
+    compiled template.
+    """
+    templates = {}
+    if isinstance(config.get("command_template"), str):
+        templates["command template"] = CommandTemplate(
+            config["command_template"])
+    for name, mode in config.get("modes", {}).items():
+        templates[f"mode '{name}'"] = CommandTemplate(
+            mode["command_template"])
+    for i, party in enumerate(config.get("parties", [])):
+        if isinstance(party.get("command_template"), str):
+            templates[f"command template of party {i}"] = CommandTemplate(
+                party["command_template"])
+    return templates
+
+
+class Protocol:
+    """
+    A protocol configuration with its compiled command templates.
+
+    The checks of the variable values are prepared once as well, so a
+    combination of values is validated and expanded in a few microseconds.
+    """
+
+    def __init__(self, name, path, config):
+        """
+        Validate the configuration and compile its templates.
+
+        :param name: Name of the protocol.
+        :param path: Path to the protocol folder.
+        :param config: Configuration data.
+        """
+        self.name = name
+        self.path = path
+        self.config = config
+        self.errors = validate(config)
+        self.variables = config.get("variables", {})
+        self.modes = config.get("modes", {})
+        self.default_mode = config.get("default_mode")
+        if self.default_mode is None and self.modes:
+            self.default_mode = next(iter(self.modes))
+
+        self._defaults = {}
+        self._checks = {}
+        self._templates = {}
+        self._party_templates = []
+        if self.errors:
+            return
+
+        for variable, info in self.variables.items():
+            if "options" in info:
+                options = frozenset(str(option) for option
+                                    in info.get("options", []))
+                self._checks[variable] = (options, None)
+            else:
+                self._checks[variable] = (None, (info.get("min"),
+                                                 info.get("max")))
+            if "default" in info:
+                self._defaults[variable] = str(info["default"])
+
+        if isinstance(config.get("command_template"), str):
+            self._templates[None] = CommandTemplate(
+                config["command_template"])
+        for mode, mode_config in self.modes.items():
+            self._templates[mode] = CommandTemplate(
+                mode_config["command_template"])
+        self._party_templates = [
+            CommandTemplate(party["command_template"])
+            if "command_template" in party else None
+            for party in config.get("parties", [])]
+
+    @property
+    def has_template(self):
+        """
+        Whether the command of the protocol is built from a template.
+        """
+        return "command_template" in self.config or bool(self.modes)
+
+    def defaults(self):
+        """
+        Get the default values of the variables.
+
+        :return: Dictionary mapping variables to their default value.
+        """
+        return dict(self._defaults)
+
+    def check_values(self, values):
+        """
+        Check a combination of variable values and fill in the defaults.
+
+        :param values: Dictionary mapping variables to their values, which
+        may be strings, such as given on the command line.
+        :return: Dictionary mapping every variable to its value as a string.
+        :raises ValueError: If a value is unknown or out of range.
+        """
+        checked = dict(self._defaults)
+        for variable, value in values.items():
+            if variable not in self._checks:
+                raise ValueError(f"unknown variable '{variable}' for "
+                                 f"protocol '{self.name}'")
+            options, bounds = self._checks[variable]
+            value = str(value)
+            if options is not None:
+                if value not in options:
+                    raise ValueError(
+                        f"invalid value '{value}' for '{variable}', options "
+                        f"are {', '.join(sorted(options))}")
+            else:
+                try:
+                    number = int(value)
+                except ValueError:
+                    raise ValueError(f"'{variable}' must be an integer, not "
+                                     f"'{value}'") from None
+                if not bounds[0] <= number <= bounds[1]:
+                    raise ValueError(f"'{variable}' must be between "
+                                     f"{bounds[0]} and {bounds[1]}")
+                value = str(number)
+            checked[variable] = value
+        return checked
+
+    def expand(self, values=None, mode=None):
+        """
+        Expand the command template for a combination of variable values.
+
+        :param values: Dictionary mapping variables to their values, the
+        defaults are used for missing variables.
+        :param mode: Mode of the protocol, the default mode if None.
+        :return: The command.
+        :raises ValueError: If the configuration is invalid, or a value or
+        the mode is unknown.
+        """
+        return self._expand_all(values, mode)[0]
+
+    def _expand_all(self, values, mode):
+        """
+        Expand the command template and the command templates of the parties
+        for a combination of variable values.
+
+        :param values: Dictionary mapping variables to their values, the
+        defaults are used for missing variables.
+        :param mode: Mode of the protocol, the default mode if None.
+        :return: Tuple of the command and the list of party commands.
+        :raises ValueError: If the configuration is invalid, or a value or
+        the mode is unknown.
+        """
+        if self.errors:
+            raise ValueError(f"invalid configuration for protocol "
+                             f"'{self.name}': {'; '.join(self.errors)}")
+        if self.modes:
+            mode = mode or self.default_mode
+            if mode not in self.modes:
+                raise ValueError(f"unknown mode '{mode}', modes are "
+                                 f"{', '.join(self.modes)}")
+        elif mode is not None:
+            raise ValueError(f"protocol '{self.name}' has no modes")
+        if mode not in self._templates:
+            raise ValueError(f"protocol '{self.name}' has no command "
+                             "template")
+
+        checked = self.check_values(values or {})
+        templates = [self._templates[mode]] + [
+            template for template in self._party_templates
+            if template is not None]
+        missing = set().union(*(template.variables for template in templates))
+        missing -= set(checked) | {MODE_VARIABLE}
+        if missing:
+            raise ValueError(f"no value for {', '.join(sorted(missing))}")
+        if mode is not None:
+            checked[MODE_VARIABLE] = mode
+        return (self._templates[mode].expand(checked),
+                [None if template is None else template.expand(checked)
+                 for template in self._party_templates])
+
+    def configure(self, values=None, mode=None):
+        """
+        Create the configuration of a run with the expanded command.
+
+        :param values: Dictionary mapping variables to their values.
+        :param mode: Mode of the protocol, the default mode if None.
+        :return: A copy of the configuration, with `run` set to the expanded
+        command, the `command` of every party to its expanded command and
+        `mode` to the selected mode.
+        :raises ValueError: If the values or the mode are invalid.
+        """
+        config = dict(self.config)
+        config["run"], party_commands = self._expand_all(values, mode)
+        if party_commands:
+            config["parties"] = [
+                party if command is None else dict(party, command=command)
+                for party, command in zip(config["parties"], party_commands)]
+        if self.modes:
+            config["mode"] = mode or self.default_mode
+        return config
+
+
+class Catalog(Mapping):
+    """
+    The protocols in the protocols folder, by name.
+
+    The names are listed when the catalog is created, but a configuration is
+    only read, validated and compiled when its protocol is first looked up,
+    so listing the protocols does not pay for the protocols that are not
+    used.
+    """
+
+    def __init__(self, protocols_path):
+        """
+        List the protocols in the protocols folder.
+
+        :param protocols_path: Path to the protocols folder.
+        """
+        self._path = protocols_path
+        self._names = [name for name in sorted(os.listdir(protocols_path))
+                       if os.path.isfile(os.path.join(protocols_path, name,
+                                                      "config.json"))]
+        self._protocols = {}
+
+    def __getitem__(self, name):
+        if name not in self._protocols:
+            if name not in self._names:
+                raise KeyError(name)
+            path = os.path.join(self._path, name)
+            config_path = os.path.join(path, "config.json")
+            try:
+                with open(config_path, "r") as f:
+                    config = json.load(f)
+            except ValueError:
+                print(f"Invalid JSON format in '{config_path}'.")
+                config = None
+            self._protocols[name] = None if config is None \
+                else Protocol(name, path, config)
+        if self._protocols[name] is None:
+            raise KeyError(name)
+        return self._protocols[name]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+def load_catalog(protocols_path):
+    """
+    Load the configurations of all protocols.
+
+    :param protocols_path: Path to the protocols folder.
+    :return: Catalog mapping protocol names to Protocol objects, sorted by
+    name.
+    """
+    return Catalog(protocols_path)
+
+
+def parse_values(assignments):
+    """
+    Parse variable assignments given on the command line.
+
+    :param assignments: List of strings in the form NAME=VALUE.
+    :return: Dictionary mapping variables to their values.
+    :raises ValueError: If an assignment has no '='.
+    """
+    values = {}
+    for assignment in assignments or []:
+        name, separator, value = assignment.partition("=")
+        if not separator:
+            raise ValueError(f"invalid assignment '{assignment}', expected "
+                             "NAME=VALUE")
+        values[name.strip()] = value
+    return values
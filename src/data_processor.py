@@ -11,8 +11,13 @@ import os
 import json
 
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
+
+import change_series
+import run_statistics
+
+# matplotlib takes most of the import time of this module, so it is imported
+# by the methods that plot. Summarizing a run, as done by benchmark suites and
+# scaling runs, does not need matplotlib.
 
 
 class DataProcessor:
@@ -28,14 +33,21 @@ class DataProcessor:
         self._avg_delays = []
         self._results = []
         self._averages = None
+        self._series = None
         self._target_delay = config.get("target_delay", 0.01)
+        self._results_dir = config.get("results", os.path.abspath(
+            os.path.join(os.path.dirname(__file__), "../results")))
+        self._parties = 0
+        if config.get("topology", "single") == "multi":
+            self._parties = len(config.get("parties", []))
 
     def scaphandre_graphs(self):
         """
         Generate graphs for the Scaphandre data.
         """
-        time_file_path = os.path.join(
-            os.path.dirname(__file__), "../results/time.txt")
+        import matplotlib.pyplot as plt
+
+        time_file_path = os.path.join(self._results_dir, "time.txt")
         if not os.path.exists(time_file_path):
             print("Error: time.txt not found, please run the protocol first")
             return
@@ -97,7 +109,8 @@ class DataProcessor:
             plt.xlabel("Time (s)")
             plt.ylabel("Power consumption (W)")
             plt.legend()
-            plt.savefig(f"results/figures/scaphandre_{self._name}_{i}.png")
+            plt.savefig(os.path.join(self._results_dir, "figures",
+                                     f"scaphandre_{self._name}_{i}.png"))
             plt.clf()
 
     def _parse_scaphandre(self):
@@ -105,9 +118,7 @@ class DataProcessor:
         Process  and filter the data gathered by Scaphandre and split the
         results into separate iterations based on new nethogs instances.
         """
-        base_dir = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), ".."))
-        path = os.path.join(base_dir, "results/scaphandre.json")
+        path = os.path.join(self._results_dir, "scaphandre.json")
 
         with open(path, "r") as f:
             data = f.read()
@@ -137,6 +148,9 @@ class DataProcessor:
                         # Skip incomplete objects
                         continue
 
+        if self._parties:
+            return self._split_scaphandre_by_time(objects)
+
         iterations = []
         current_iteration = {}
         seen_pids = set()
@@ -168,58 +182,119 @@ class DataProcessor:
 
         return iterations
 
+    def _split_scaphandre_by_time(self, objects):
+        """
+        Split the Scaphandre data into iterations based on the iteration times
+        instead of new nethogs instances. This is used when every party runs
+        in its own container, since then every iteration starts a nethogs
+        instance in every container.
+
+        :param objects: The objects written by Scaphandre.
+        :return: The samples of every party, split into iterations.
+        """
+        iteration_times = self._parse_iteration_times()
+        iterations = [{} for _ in range(self._iterations)]
+
+        for obj in objects:
+            for consumer in obj['consumers']:
+                if consumer['container'] is None or \
+                        self._execfile.lower() not in consumer['exe'].lower():
+                    continue
+
+                timestamp = consumer['timestamp']
+                for i, times in iteration_times.items():
+                    if i < len(iterations) and \
+                            times["start"] <= timestamp <= times["stop"] + 1:
+                        unique_key = (f"{consumer['container']['name']}_"
+                                      f"{consumer['pid']}")
+                        iterations[i].setdefault(unique_key, []).append(
+                            (timestamp, consumer['consumption']))
+                        break
+
+        return [iteration for iteration in iterations if iteration]
+
     def nethogs_graphs(self):
         """
         Generate graphs for the nethogs data.
         """
+        import matplotlib.pyplot as plt
+
         self._parse_scaphandre()
         self._parse_nethogs()
         averages = self._nethogs_averages()
         speeds = self._nethogs_speed()
 
-        base_dir = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), ".."))
-        os.makedirs(os.path.join(base_dir, "results"), exist_ok=True)
-        os.makedirs(os.path.join(base_dir, "results/figures"), exist_ok=True)
+        os.makedirs(os.path.join(self._results_dir, "figures"), exist_ok=True)
 
         plt.figure(figsize=(19.2, 10.8))
         for party_id, data_amounts in averages.items():
-            trimmed = self._trim_array(data_amounts)
-            xs = np.arange(len(trimmed)) * self._target_delay
-            plt.plot(xs, trimmed, linestyle='--', alpha=0.5)
-            plt.scatter(xs, trimmed, label=f"Data Amounts - party {party_id}")
+            xs = data_amounts.times(self._target_delay)
+            line, = plt.plot(xs, data_amounts.values, linestyle='--',
+                             alpha=0.5, drawstyle='steps-post')
+            plt.scatter(xs, data_amounts.values, color=line.get_color(),
+                        label=f"Data Amounts - party {party_id}")
+            self._plot_band(self._series[party_id], line.get_color(),
+                            f"Data Amounts - party {party_id}")
         plt.title("Data Amounts for All Parties")
         plt.xlabel("Time (seconds)")
         plt.ylabel("Cumulative Data Amount (kB)")
         plt.legend()
-        plt.savefig(f"results/figures/data_amounts_{self._name}.png")
+        plt.savefig(os.path.join(self._results_dir, "figures",
+                                 f"data_amounts_{self._name}.png"))
         plt.clf()
 
         plt.figure(figsize=(19.2, 10.8))
         for party_id, speed in speeds.items():
-            trimmed = self._trim_array(speed)
-            xs = np.arange(len(trimmed)) * self._target_delay
-            plt.plot(xs, trimmed, linestyle='--', alpha=0.5)
+            xs = speed.times(self._target_delay)
+            line, = plt.plot(xs, speed.values, linestyle='--', alpha=0.5,
+                             drawstyle='steps-post')
             plt.scatter(
-                xs, trimmed, label=f"Communication Speed - party {party_id}")
+                xs, speed.values, color=line.get_color(),
+                label=f"Communication Speed - party {party_id}")
+            self._plot_band([series.difference(self._target_delay)
+                             for series in self._series[party_id]],
+                            line.get_color(),
+                            f"Communication Speed - party {party_id}")
         plt.title("Communication Speed for All Parties")
         plt.xlabel("Time (seconds)")
         plt.ylabel("Speed (kB/s)")
         plt.legend()
-        plt.savefig(f"results/figures/speed_{self._name}.png")
+        plt.savefig(os.path.join(self._results_dir, "figures",
+                                 f"speed_{self._name}.png"))
         plt.clf()
 
+    def _plot_band(self, series, color, label):
+        """
+        Shade the spread of a time series over the iterations around its
+        average, between the percentiles in run_statistics.BAND_PERCENTILES.
+        The spread is only computed at the samples at which an iteration
+        changes.
+
+        :param series: List of ChangeSeries, one for every iteration.
+        :param color: Color of the plotted average.
+        :param label: Label of the series in the legend.
+        """
+        import matplotlib.pyplot as plt
+
+        if len(series) < 2:
+            return
+        indices, values = change_series.stack(series)
+        band = run_statistics.describe_series(values)
+        low, high = run_statistics.BAND_PERCENTILES
+        plt.fill_between(indices * self._target_delay, band["low"],
+                         band["high"], step="post", color=color, alpha=0.2,
+                         label=f"{label} - p{low}-p{high}")
+
     def _calculate_iteration_time(self, iteration_index, measurement_amt):
         """
         Calculate the average delay for a specific iteration by reading the
-        time from the results/time.txt file.
+        time from the time.txt file of the run.
 
         :param iteration_index: The index of the current iteration.
         :param measurement_amt: The number of measurements in the iteration.
         :return: The average delay for the iteration.
         """
-        time_file = os.path.join(os.path.dirname(
-            __file__), "../results/time.txt")
+        time_file = os.path.join(self._results_dir, "time.txt")
         if not os.path.exists(time_file):
             print("Error: time.txt not found, please run the protocol first")
             return None
@@ -241,53 +316,52 @@ class DataProcessor:
 
     def _parse_nethogs(self):
         """
-        Parse and trim the nethogs output file and populate the results. The
-        results get stored in the following format in self._results:
+        Parse the nethogs output file and populate the results. The results
+        get stored in the following format in self._results:
         [
             {
-                "party_id": [data_amounts],
+                "party_id": ChangeSeries(data_amounts),
                 ...
             },
             ...
         ]
-        where each dictionary corresponds to an iteration.
+        where each dictionary corresponds to an iteration. The data amounts
+        are indexed by the refresh of nethogs, and only the refreshes at
+        which they change are stored. A party that appears in a later
+        refresh has sent nothing before. When every party runs in its own
+        container, the output files of all containers are combined, and the
+        delay between measurements of the first party is used for all
+        parties.
         """
         for i in range(self._iterations):
             self._results.append({})
-            output_file = os.path.join(os.path.dirname(
-                __file__), f"../results/nethogs_{i}.txt")
-            if not os.path.exists(output_file):
+            output_files = self._result_files(f"nethogs_{i}.txt")
+            if not all(os.path.exists(path) for path in output_files):
                 print(f"Error: nethogs_{i}.txt not found, "
                       "please run the protocol first")
                 return
 
             measurement_amt = 0
-            with open(output_file, "r") as outfile:
-                lines = outfile.readlines()
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith("Refreshing"):
-                        measurement_amt += 1
-                    if (line.startswith(f"./{self._execfile}") or
-                            line.startswith(f"/{self._execfile}")):
-                        parts = line.split()
-                        path_parts = parts[0].split("/")
-                        if len(path_parts) >= 3:
-                            party_id = path_parts[-2]
-                            data_amount = parts[1]
-                            if party_id not in self._results[i]:
-                                max_length = max(
-                                    (len(arr)
-                                     for arr in self._results[i].values()),
-                                    default=0)
-                                if max_length > 0:
-                                    self._results[i][party_id] = [
-                                        0] * max_length
-                                else:
-                                    self._results[i][party_id] = []
-                            self._results[i][party_id].append(
-                                float(data_amount)
-                            )
+            for container, output_file in enumerate(output_files):
+                refreshes = 0
+                with open(output_file, "r") as outfile:
+                    for line in outfile:
+                        line = line.strip()
+                        if line.startswith("Refreshing"):
+                            refreshes += 1
+                            if container == 0:
+                                measurement_amt += 1
+                        if (line.startswith(f"./{self._execfile}") or
+                                line.startswith(f"/{self._execfile}")):
+                            parts = line.split()
+                            path_parts = parts[0].split("/")
+                            if len(path_parts) >= 3:
+                                party_id = (container, path_parts[-2])
+                                if party_id not in self._results[i]:
+                                    self._results[i][party_id] = \
+                                        change_series.ChangeSeries()
+                                self._results[i][party_id].append(
+                                    max(refreshes - 1, 0), float(parts[1]))
 
             party_ids = sorted(self._results[i].keys())
             for j, party_id in enumerate(party_ids):
@@ -300,13 +374,16 @@ class DataProcessor:
     def _nethogs_averages(self):
         """
         Calculate the point wise averages of the data amounts for each party
-        across all iterations.
+        across all iterations. The data amounts of every iteration are
+        resampled to the target delay, and stored in self._series.
+
+        :return: Dictionary mapping party ids to the average, as a
+        ChangeSeries sampled at the target delay.
         """
         if self._averages is not None:
             return self._averages
 
-        time_file = os.path.join(os.path.dirname(
-            __file__), "../results/time.txt")
+        time_file = os.path.join(self._results_dir, "time.txt")
         if not os.path.exists(time_file):
             print("Error: time.txt not found, please run the protocol first")
             return None
@@ -320,22 +397,16 @@ class DataProcessor:
                     iteration_time = float(parts[1].strip())
                     max_time = max(max_time, iteration_time)
 
-        target_timestamps = np.arange(0, max_time, self._target_delay)
-        interpolated_results = {}
+        target_count = len(np.arange(0, max_time, self._target_delay))
+        self._series = {}
         for i in range(self._iterations):
             for party_id, data_amounts in self._results[i].items():
-                if party_id not in interpolated_results:
-                    interpolated_results[party_id] = []
-                orig_times = np.arange(len(data_amounts)) * self._avg_delays[i]
-                interp_func = interp1d(orig_times, data_amounts,
-                                       kind='nearest', bounds_error=False,
-                                       fill_value="extrapolate")
-                resampled = interp_func(target_timestamps)
-                interpolated_results[party_id].append(resampled)
-
-        averages = {}
-        for party_id, resampled_array in interpolated_results.items():
-            averages[party_id] = np.mean(resampled_array, axis=0)
+                self._series.setdefault(party_id, []).append(
+                    data_amounts.resample(self._avg_delays[i],
+                                          self._target_delay, target_count))
+
+        averages = {party_id: change_series.mean(resampled)
+                    for party_id, resampled in self._series.items()}
 
         self._averages = averages
         return averages
@@ -344,30 +415,438 @@ class DataProcessor:
         """
         Calculate the speed of data transfer for each party across all
         iterations.
+
+        :return: Dictionary mapping party ids to the average speed, as a
+        ChangeSeries sampled at the target delay.
         """
         averages = self._nethogs_averages()
-        speeds = {}
-        for party_id, data_amounts in averages.items():
-            delay = self._target_delay
-            speed = np.zeros(len(data_amounts))
-            for i in range(1, len(data_amounts)):
-                speed[i] = (data_amounts[i] - data_amounts[i - 1]) / delay
-            speeds[party_id] = speed
-        return speeds
-
-    def _trim_array(self, arr):
-        """
-        Trim a numpy array to remove repeating values at the end.
-        """
-        end_val = arr[-1]
-        change_indices = np.where(arr != end_val)[0]
-        if change_indices.size == 0:
-            result = np.array([end_val])
-        else:
-            last_unique_index = change_indices[-1] + 1
-            result = np.concatenate([arr[:last_unique_index], [end_val]])
-
-        return result
+        return {party_id: data_amounts.difference(self._target_delay)
+                for party_id, data_amounts in averages.items()}
+
+    def summary(self, scaphandre=True):
+        """
+        Summarize the run in a few metrics per iteration: the duration, the
+        total amount of data sent by all parties, the resulting bandwidth,
+        the CPU time used in the container and the energy consumed by all
+        parties.
+
+        :param scaphandre: Whether power measurements are available.
+        :return: Dictionary with the mean of every metric, under
+        "iterations" the value of every metric for every iteration and under
+        "statistics" their percentiles and confidence intervals.
+        """
+        iteration_times = self._parse_iteration_times()
+        if not self._results:
+            self._parse_nethogs()
+        power = self._parse_scaphandre() if scaphandre else []
+
+        metrics = {"duration": [], "data": [], "bandwidth": [], "cpu": [],
+                   "energy": []}
+        for i in range(self._iterations):
+            if i not in iteration_times or i >= len(self._results):
+                continue
+            times = iteration_times[i]
+            duration = times["stop"] - times["start"]
+            data = float(sum(amounts.last for amounts
+                             in self._results[i].values()))
+            metrics["duration"].append(duration)
+            metrics["data"].append(data)
+            metrics["bandwidth"].append(data / duration if duration > 0
+                                        else 0.0)
+            if "cpu" in times:
+                metrics["cpu"].append(times["cpu"])
+
+            if i < len(power):
+                energy = 0.0
+                for samples in power[i].values():
+                    samples = [(t, c) for t, c in samples
+                               if times["start"] <= t <= times["stop"]]
+                    if len(samples) > 1:
+                        timestamps, consumption = zip(*samples)
+                        energy += float(np.trapezoid(consumption, timestamps))
+                metrics["energy"].append(energy)
+
+        summary = {name: (float(np.mean(values)) if values else None)
+                   for name, values in metrics.items()}
+        summary["iterations"] = metrics
+        summary["statistics"] = {name: run_statistics.describe(values)
+                                 for name, values in metrics.items()}
+        return summary
+
+    def statistics_report(self, scaphandre=True):
+        """
+        Print the statistics of the duration, data amount, bandwidth, CPU
+        time and energy over the iterations, and store them in
+        statistics.json in the results directory.
+
+        :param scaphandre: Whether power measurements are available.
+        """
+        statistics = self.summary(scaphandre)["statistics"]
+        run_statistics.print_statistics(statistics, {
+            "duration": "s", "data": "kB", "bandwidth": "kB/s", "cpu": "s",
+            "energy": "J"})
+        with open(os.path.join(self._results_dir, "statistics.json"),
+                  "w") as f:
+            json.dump(statistics, f, indent=4)
+
+    def scaling_graphs(self, summaries):
+        """
+        Generate speedup and efficiency curves from the summaries of runs with
+        different numbers of cores. The speedup and efficiency are relative
+        to the run with the fewest cores. The curves are stored in
+        scaling.json in the results directory as well.
+
+        :param summaries: Dictionary mapping core counts to run summaries.
+        """
+        import matplotlib.pyplot as plt
+
+        cores = np.array(sorted(summaries))
+        durations = np.array([summaries[n]["duration"] for n in cores])
+        speedup = durations[0] / durations
+        efficiency = speedup / (cores / cores[0])
+
+        os.makedirs(os.path.join(self._results_dir, "figures"), exist_ok=True)
+
+        _, axes = plt.subplots(2, 2, figsize=(19.2, 10.8))
+        ax1, ax2, ax3, ax4 = axes.flat
+        ax1.plot(cores, speedup, marker="o", label="Measured")
+        statistics = [summaries[n].get("statistics", {}).get("duration")
+                      for n in cores]
+        if all(stats is not None for stats in statistics):
+            ci_low = np.array([stats["ci_low"] for stats in statistics])
+            ci_high = np.array([stats["ci_high"] for stats in statistics])
+            ax1.fill_between(cores, durations[0] / ci_high,
+                             durations[0] / ci_low, alpha=0.2,
+                             label="95% CI of the duration")
+        ax1.plot(cores, cores / cores[0], linestyle="--", label="Ideal")
+        ax1.set_title("Speedup")
+        ax1.set_ylabel("Speedup")
+        ax1.legend()
+        ax2.plot(cores, efficiency, marker="o")
+        ax2.set_title("Parallel efficiency")
+        ax2.set_ylabel("Efficiency")
+        ax3.plot(cores, [summaries[n]["bandwidth"] for n in cores],
+                 marker="o")
+        ax3.set_title("Bandwidth")
+        ax3.set_ylabel("Bandwidth (kB/s)")
+        energies = [summaries[n]["energy"] for n in cores]
+        if all(energy is not None for energy in energies):
+            ax4.plot(cores, energies, marker="o")
+        ax4.set_title("Energy per iteration")
+        ax4.set_ylabel("Energy (J)")
+        for ax in axes.flat:
+            ax.set_xlabel("Cores")
+            ax.set_xscale("log", base=2)
+            ax.set_xticks(cores, [str(n) for n in cores])
+            ax.grid(True)
+        plt.tight_layout()
+        plt.savefig(os.path.join(self._results_dir, "figures",
+                                 f"scaling_{self._name}.png"))
+        plt.close()
+
+        print("== Scaling ==")
+        curves = {}
+        for n, s, e in zip(cores, speedup, efficiency):
+            print(f"{n} core(s)\t{summaries[n]['duration']:.3f} s\t"
+                  f"speedup {s:.2f}\tefficiency {e:.2f}")
+            curves[int(n)] = dict(
+                {key: value for key, value in summaries[n].items()
+                 if key != "iterations"},
+                speedup=float(s), efficiency=float(e))
+        print()
+
+        with open(os.path.join(self._results_dir, "scaling.json"), "w") as f:
+            json.dump(curves, f, indent=4)
+
+    def phase_report(self, scaphandre=True):
+        """
+        Attribute the data amounts, the CPU time and the energy consumption of
+        every party to the phases marked by the protocol, averaged over all
+        iterations. Within an iteration, a phase covers the time in which any
+        party is in it, and the measurements of repeated occurrences of the
+        phase are summed. The report is printed and stored in phases.json in
+        the results directory of the run.
+
+        :param scaphandre: Whether power measurements are available.
+        """
+        phases = self._parse_phases()
+        if not any(phases):
+            return
+
+        iteration_times = self._parse_iteration_times()
+        if not self._results:
+            self._parse_nethogs()
+        power = self._parse_scaphandre() if scaphandre else []
+        resources = self._parse_resources()
+
+        report = {}
+        for i, iteration_phases in enumerate(phases):
+            if i not in iteration_times or i >= len(self._avg_delays):
+                continue
+            start_time = iteration_times[i]["start"]
+            delay = self._avg_delays[i]
+
+            for name, intervals in self._merge_phases(
+                    iteration_phases).items():
+                entry = report.setdefault(
+                    name,
+                    {"durations": [], "data": {}, "cpu": {}, "energy": {}})
+                entry["durations"].append(
+                    sum(end - begin for begin, end in intervals))
+
+                for party_id, data_amounts in self._results[i].items():
+                    if not data_amounts:
+                        continue
+                    amount = 0.0
+                    for begin, end in intervals:
+                        first = self._sample_index(begin - start_time, delay,
+                                                   len(data_amounts))
+                        last = self._sample_index(end - start_time, delay,
+                                                  len(data_amounts))
+                        before, after = data_amounts.at([first, last])
+                        amount += after - before
+                    entry["data"].setdefault(party_id, []).append(amount)
+
+                for party_id, samples in enumerate(resources[i].values()):
+                    cpu_time = 0.0
+                    for begin, end in intervals:
+                        window = ((samples["timestamp"] >= begin) &
+                                  (samples["timestamp"] <= end))
+                        if np.count_nonzero(window) > 1:
+                            cpu_time += float(np.trapezoid(
+                                samples["cpu_percent"][window] / 100,
+                                samples["timestamp"][window]))
+                    entry["cpu"].setdefault(party_id, []).append(cpu_time)
+
+                if i >= len(power):
+                    continue
+                consumers = sorted(power[i].items(),
+                                   key=lambda x: int(x[0].split("_")[-1]))
+                for party_id, (_, samples) in enumerate(consumers):
+                    energy = 0.0
+                    for begin, end in intervals:
+                        window = [(t, c) for t, c in samples
+                                  if begin <= t <= end]
+                        if len(window) > 1:
+                            timestamps, consumption = zip(*window)
+                            energy += float(np.trapezoid(consumption,
+                                                         timestamps))
+                    entry["energy"].setdefault(party_id, []).append(energy)
+
+        summary = {}
+        print("== Phase report ==")
+        for name, entry in report.items():
+            summary[name] = {
+                "duration": float(np.mean(entry["durations"])),
+                "data": {party_id: float(np.mean(amounts))
+                         for party_id, amounts in entry["data"].items()},
+                "cpu": {party_id: float(np.mean(cpu_times))
+                        for party_id, cpu_times in entry["cpu"].items()},
+                "energy": {party_id: float(np.mean(energies))
+                           for party_id, energies in entry["energy"].items()},
+            }
+            print(f"Phase '{name}': {summary[name]['duration']:.3f} s")
+            for party_id, amount in summary[name]["data"].items():
+                duration = summary[name]["duration"]
+                bandwidth = amount / duration if duration > 0 else 0
+                print(f"  Party {party_id} data: {amount:.2f} kB "
+                      f"({bandwidth:.2f} kB/s)")
+            for party_id, cpu_time in summary[name]["cpu"].items():
+                print(f"  Party {party_id} CPU time: {cpu_time:.3f} s")
+            for party_id, energy in summary[name]["energy"].items():
+                print(f"  Party {party_id} energy: {energy:.3f} J")
+        print()
+
+        with open(os.path.join(self._results_dir, "phases.json"), "w") as f:
+            json.dump(summary, f, indent=4)
+
+    def resource_graphs(self):
+        """
+        Generate graphs for the CPU utilization and memory usage of every
+        party, and print a summary of the resource usage per iteration.
+        """
+        import matplotlib.pyplot as plt
+
+        resources = self._parse_resources()
+        if not any(resources):
+            return
+
+        os.makedirs(os.path.join(self._results_dir, "figures"), exist_ok=True)
+
+        print("== Resource usage ==")
+        for i, parties in enumerate(resources):
+            if not parties:
+                continue
+
+            _, (ax1, ax2) = plt.subplots(2, 1, figsize=(19.2, 10.8),
+                                         sharex=True)
+            start_time = min(samples["timestamp"][0]
+                             for samples in parties.values())
+            for party_id, samples in enumerate(parties.values()):
+                xs = samples["timestamp"] - start_time
+                ax1.plot(xs, samples["cpu_percent"],
+                         label=f"Party {party_id}")
+                ax2.plot(xs, samples["rss_kb"] / 1024,
+                         label=f"Party {party_id}")
+
+                read = int(samples["read_bytes"][-1] -
+                           samples["read_bytes"][0])
+                written = int(samples["write_bytes"][-1] -
+                              samples["write_bytes"][0])
+                voluntary = int(samples["voluntary_ctxt_switches"][-1])
+                involuntary = int(samples["nonvoluntary_ctxt_switches"][-1])
+                print(f"Iteration {i}, party {party_id}: "
+                      f"{np.mean(samples['cpu_percent']):.1f}% CPU on "
+                      f"average, {samples['peak_rss_kb'][-1] / 1024:.1f} MB "
+                      f"peak RSS, {read} B read, {written} B written, "
+                      f"{voluntary} voluntary and {involuntary} involuntary "
+                      "context switches")
+
+            ax1.set_title(f"CPU utilization for Iteration {i}")
+            ax1.set_ylabel("CPU utilization (%)")
+            ax1.legend()
+            ax2.set_title(f"Memory usage for Iteration {i}")
+            ax2.set_xlabel("Time (s)")
+            ax2.set_ylabel("Resident set size (MB)")
+            ax2.legend()
+            plt.savefig(os.path.join(self._results_dir, "figures",
+                                     f"resources_{self._name}_{i}.png"))
+            plt.close()
+        print()
+
+    def _parse_resources(self):
+        """
+        Parse the resource samples taken by the protocol manager. The samples
+        of every iteration are grouped by process id and sorted by time.
+
+        :return: A list with, for every iteration, a dictionary mapping
+        process ids to a dictionary of numpy arrays, one for every column.
+        """
+        resources = []
+        for i in range(self._iterations):
+            parties = {}
+            resources.append(parties)
+            for container, resource_file in enumerate(
+                    self._result_files(f"resources_{i}.txt")):
+                if not os.path.exists(resource_file) or \
+                        os.path.getsize(resource_file) == 0:
+                    continue
+
+                data = np.genfromtxt(resource_file, delimiter="\t",
+                                     names=True, ndmin=1)
+                if data.size == 0:
+                    continue
+                for pid in np.unique(data["pid"]):
+                    samples = data[data["pid"] == pid]
+                    parties[(container, int(pid))] = {
+                        name: samples[name] for name in data.dtype.names}
+        return resources
+
+    def _parse_phases(self):
+        """
+        Parse the phase markers of every iteration. A phase starts with a
+        'begin <phase> [party]' marker and ends with the matching
+        'end <phase> [party]' marker of the same party, so the parties can
+        mark the same phase at the same time. Phases that are never ended
+        are discarded.
+
+        :return: A list with, for every iteration, a list of tuples of the
+        phase name, its start and its stop time.
+        """
+        phases = []
+        for i in range(self._iterations):
+            iteration_phases = []
+            phases.append(iteration_phases)
+            for phase_file in self._result_files(f"phases_{i}.txt"):
+                if not os.path.exists(phase_file):
+                    continue
+
+                open_phases = {}
+                with open(phase_file, "r") as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) not in (3, 4):
+                            continue
+                        timestamp, marker, name = parts[:3]
+                        key = (name, parts[3] if len(parts) == 4 else None)
+                        if marker == "begin":
+                            open_phases[key] = float(timestamp)
+                        elif marker == "end" and key in open_phases:
+                            iteration_phases.append(
+                                (name, open_phases.pop(key),
+                                 float(timestamp)))
+        return phases
+
+    def _merge_phases(self, iteration_phases):
+        """
+        Merge the overlapping occurrences of every phase in an iteration,
+        such as the same phase marked by several parties.
+
+        :param iteration_phases: List of tuples of the phase name, its start
+        and its stop time, as returned by _parse_phases for an iteration.
+        :return: Dictionary mapping phase names to a sorted list of tuples of
+        the start and stop time of the disjoint intervals of the phase.
+        """
+        merged = {}
+        for name, begin, end in sorted(iteration_phases,
+                                       key=lambda phase: phase[1]):
+            intervals = merged.setdefault(name, [])
+            if intervals and begin <= intervals[-1][1]:
+                intervals[-1] = (intervals[-1][0], max(intervals[-1][1], end))
+            else:
+                intervals.append((begin, end))
+        return merged
+
+    def _result_files(self, filename):
+        """
+        Get the paths of a result file. When every party runs in its own
+        container, every container has its own copy of the file.
+
+        :param filename: Name of the result file.
+        :return: List of paths, one for every container.
+        """
+        if not self._parties:
+            return [os.path.join(self._results_dir, filename)]
+        return [os.path.join(self._results_dir, f"party_{party}", filename)
+                for party in range(self._parties)]
+
+    def _parse_iteration_times(self):
+        """
+        Read the start and stop times of every iteration from time.txt, and
+        the CPU time used in the container if it was measured.
+
+        :return: Dictionary mapping iteration indices to their start and stop
+        times, and their CPU time under "cpu".
+        """
+        time_file_path = os.path.join(self._results_dir, "time.txt")
+        iteration_times = {}
+        if not os.path.exists(time_file_path):
+            print("Error: time.txt not found, please run the protocol first")
+            return iteration_times
+
+        with open(time_file_path, "r") as time_file:
+            for line in time_file:
+                for field in ("start", "stop", "cpu"):
+                    if line.startswith(f"iteration_{field}_"):
+                        parts = line.split(":")
+                        iteration_index = int(parts[0].split("_")[-1])
+                        iteration_times.setdefault(iteration_index, {})[
+                            field] = float(parts[1].strip())
+        return iteration_times
+
+    def _sample_index(self, offset, delay, length):
+        """
+        Convert a time offset within an iteration to the index of the nethogs
+        sample taken at that time.
+
+        :param offset: Time since the start of the iteration in seconds.
+        :param delay: Average delay between nethogs samples.
+        :param length: Number of samples.
+        :return: The index of the sample, clamped to the available samples.
+        """
+        if delay <= 0:
+            return length - 1
+        return int(min(max(round(offset / delay), 0), length - 1))
 
 
 if __name__ == "__main__":
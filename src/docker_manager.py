@@ -8,12 +8,50 @@ communication with the Docker daemon and manages the lifecycle of
 containers.
 """
 
+import atexit
 import tarfile
 import io
 import os
+import threading
+import uuid
 
 import docker
 
+# The Docker client is shared by all managers in the process, so the
+# connection to the daemon and the API version negotiation are reused across
+# runs instead of being set up again for every operation.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Get the Docker client shared by all Docker managers, creating it on first
+    use. The underlying HTTP connections to the Docker socket are kept alive
+    and pooled between operations.
+
+    :return: The shared Docker client.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = docker.from_env(max_pool_size=32)
+        return _client
+
+
+def close_client():
+    """
+    Close the shared Docker client, if it has been created.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_client)
+
 
 class DockerManager:
     """
@@ -39,6 +77,10 @@ class DockerManager:
         self._verbose = config.get("verbose", False)
         self._path = config.get("path")
         self._built = config.get("built", False)
+        self._network_profile = config.get("network-profile", "none")
+        self._cpus = config.get("cpus")
+        self._memory = config.get("memory")
+        self._cpuset = config.get("cpuset")
         self.workdir = '/'
 
         dockerfile_path = os.path.join(self._path, 'Dockerfile')
@@ -59,12 +101,30 @@ class DockerManager:
                              f"from Dockerfile.")
                         )
 
+    @property
+    def container_name(self):
+        """
+        The name Docker assigned to the running container, or None if no
+        container is running.
+        """
+        if self._container:
+            return self._container.name
+        return None
+
+    @property
+    def image_id(self):
+        """
+        The digest of the Docker image of the protocol, which changes
+        whenever the image is changed.
+        """
+        return get_client().images.get(self._image_name).id
+
     def build_image(self):
         """
         Build the Docker image for the protocol. In case the user has used the
         built flag, this function will check if a build already exists instead.
         """
-        client = docker.from_env()
+        client = get_client()
         if self._built:
             try:
                 client.images.get(self._image_name)
@@ -75,8 +135,6 @@ class DockerManager:
                 print(f"Image '{self._image_name}' not found.")
                 print("Maybe you accidentally added the built flag?")
                 exit(1)
-            finally:
-                client.close()
             return
 
         if self._verbose:
@@ -115,13 +173,14 @@ class DockerManager:
         except docker.errors.APIError as e:
             print(f"Error communicating with Docker API: {e}")
             exit(1)
-        finally:
-            client.close()
 
-    def run_command(self, command):
+    def run_command(self, command, output_callback=None):
         """
         Run the specified command inside the Docker container.
 
+        :param command: The command to run.
+        :param output_callback: Optional function called with every chunk of
+        output while the command is running.
         :return: The output of the command execution.
         """
         if self._container:
@@ -138,6 +197,8 @@ class DockerManager:
 
                 output_lines = []
                 for line in output.output:
+                    if output_callback is not None:
+                        output_callback(line.decode('utf-8'))
                     decoded = line.decode('utf-8').rstrip()
                     if self._verbose:
                         print(decoded)
@@ -223,24 +284,86 @@ class DockerManager:
             print("Container is not running. Cannot copy file.")
             exit(1)
 
-    def run_container(self):
+    def write_file(self, dest, content):
+        """
+        Write a text file inside the Docker container.
+
+        :param dest: Destination file path inside the container.
+        :param content: Content of the file.
+        """
+        if self._container:
+            if self._verbose:
+                print(f"Writing file '{dest}' in container...")
+
+            try:
+                data = content.encode('utf-8')
+                tar_stream = io.BytesIO()
+                with tarfile.open(fileobj=tar_stream, mode='w') as tar:
+                    info = tarfile.TarInfo(name=os.path.basename(dest))
+                    info.size = len(data)
+                    tar.addfile(info, io.BytesIO(data))
+                tar_stream.seek(0)
+
+                self._container.put_archive(os.path.dirname(dest), tar_stream)
+            except docker.errors.APIError as e:
+                print(f"Error writing file: {e}")
+                exit(1)
+        else:
+            print("Container is not running. Cannot write file.")
+            exit(1)
+
+    def has_file(self, path):
+        """
+        Check if a file exists inside the Docker container.
+
+        :param path: File path inside the container.
+        :return: True if the file exists, False otherwise.
+        """
+        if not self._container:
+            return False
+        return self._container.exec_run(["test", "-e", path]).exit_code == 0
+
+    @property
+    def ip_address(self):
+        """
+        The IP address of the running container on its first network, or None
+        if no container is running.
+        """
+        if not self._container:
+            return None
+        self._container.reload()
+        networks = self._container.attrs["NetworkSettings"]["Networks"]
+        return next(iter(networks.values()))["IPAddress"]
+
+    def run_container(self, name=None, network=None):
         """
         Start the Docker container with the specified configuration without
         running any command.
 
+        :param name: Optional name of the container.
+        :param network: Optional Docker network to connect the container to.
         :return: The active Docker container object.
         """
         if self._verbose:
             print(f"Starting Docker container '{self._protocol_name}'...")
 
-        client = docker.from_env()
+        client = get_client()
         try:
             container = client.containers.run(
                 self._image_name,
                 detach=True,
                 tty=True,
                 auto_remove=False,
+                name=name,
+                network=network,
                 volumes={self._path: {'bind': '/data', 'mode': 'rw'}},
+                # Shaping the network traffic with tc requires NET_ADMIN
+                cap_add=(["NET_ADMIN"] if self._network_profile != "none"
+                         else None),
+                nano_cpus=(int(self._cpus * 1e9) if self._cpus is not None
+                           else None),
+                mem_limit=self._memory,
+                cpuset_cpus=self._cpuset,
             )
 
             if self._verbose:
@@ -280,3 +403,107 @@ class DockerManager:
                 print(f"Error stopping container: {e}")
                 return False
         return False
+
+
+class DockerTopology:
+    """
+    Runs a protocol with one container for every party.
+
+    The containers are connected by a dedicated Docker network and each one
+    gets its own resource limits, so parties do not share CPU time or the
+    loopback interface. Every container is managed by its own DockerManager.
+    The commands and limits of the parties are taken from the `parties` field
+    of the configuration.
+    """
+
+    def __init__(self, config):
+        """
+        Initialize a Docker manager for every party.
+
+        :param config: Configuration data for the protocol.
+        """
+        self._verbose = config.get("verbose", False)
+        self._hosts_file = config.get("hosts_file")
+        self._network = None
+        self.network_name = f"snnif-{uuid.uuid4().hex[:8]}"
+        self.managers = []
+        for party in config["parties"]:
+            party_config = dict(config)
+            party_config["cpus"] = party.get("cpus", config.get("cpus"))
+            party_config["memory"] = party.get("memory", config.get("memory"))
+            party_config["cpuset"] = party.get("cpuset", config.get("cpuset"))
+            self.managers.append(DockerManager(party_config))
+        self.workdir = self.managers[0].workdir
+
+    @property
+    def container_names(self):
+        """
+        The names of the containers of all parties.
+        """
+        return [manager.container_name for manager in self.managers]
+
+    @property
+    def image_id(self):
+        """
+        The digest of the Docker image shared by all parties.
+        """
+        return self.managers[0].image_id
+
+    def build_image(self):
+        """
+        Build the Docker image, which is shared by all parties.
+        """
+        self.managers[0].build_image()
+
+    def run_containers(self):
+        """
+        Create the Docker network and start a container for every party. If
+        the configuration specifies a hosts file, the IP addresses of the
+        parties are written to it in every container, one per line.
+        """
+        client = get_client()
+        try:
+            self._network = client.networks.create(self.network_name,
+                                                   driver="bridge")
+        except docker.errors.APIError as e:
+            print(f"Error creating Docker network: {e}")
+            exit(1)
+        if self._verbose:
+            print(f"Created Docker network '{self.network_name}'.")
+
+        for i, manager in enumerate(self.managers):
+            manager.run_container(name=f"{self.network_name}-p{i}",
+                                  network=self.network_name)
+
+        if self._hosts_file:
+            hosts = "\n".join(manager.ip_address for manager in self.managers)
+            for manager in self.managers:
+                manager.write_file(f"{self.workdir}/{self._hosts_file}",
+                                   hosts + "\n")
+
+    def retrieve_file(self, src, dest):
+        """
+        Retrieve a file from the container of the party that has it.
+
+        :param src: Source file path inside the containers.
+        :param dest: Destination file path on the host.
+        """
+        for manager in self.managers:
+            if manager.has_file(src):
+                manager.retrieve_file(src, dest)
+                return
+        print(f"Error: file '{src}' not found in any party container")
+        exit(1)
+
+    def stop_containers(self):
+        """
+        Stop and remove the containers of all parties and the Docker network.
+        """
+        for manager in self.managers:
+            manager.stop_container()
+        if self._network is not None:
+            try:
+                self._network.remove()
+            except docker.errors.APIError as e:
+                print(f"Error removing Docker network: {e}")
+            self._network = None
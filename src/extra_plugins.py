@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+extra_plugins.py
+
+This module is the registry of the extra data processors. A protocol with
+`extra` enabled declares the log files to retrieve in `extra_files` and the
+lines to parse in `log_schema` of its configuration file, which is handled
+without any Python code. A protocol can still add a module with its own name
+to src/extra to override `retrieve_data` or `process_data`, for example to
+create plots. These modules are only imported when the protocol is run, so
+their dependencies do not slow down the start of the program.
+"""
+
+import importlib
+import importlib.util
+import os
+import re
+
+from log_parser import LogParser
+
+# Plugins that were loaded, by protocol name
+_plugins = {}
+
+
+class ExtraPlugin:
+    """
+    The extra data processor of a protocol.
+
+    By default, the extra files are retrieved from the container and parsed
+    with the log schema of the configuration, and the parsed records are
+    printed as a summary. The hooks of the module in src/extra, if any, take
+    precedence.
+    """
+
+    def __init__(self, name, module=None):
+        """
+        Initialize the plugin.
+
+        :param name: Name of the protocol.
+        :param module: The module in src/extra of the protocol, or None.
+        """
+        self.name = name
+        self._module = module
+
+    def retrieve_data(self, docker_manager, config):
+        """
+        Retrieve the extra files from the container and parse them.
+
+        :param docker_manager: The Docker manager of the run.
+        :param config: Configuration data.
+        :return: Dictionary mapping every file to its parsed records.
+        """
+        if hasattr(self._module, "retrieve_data"):
+            return self._module.retrieve_data(docker_manager, config)
+
+        files = extra_files(config)
+        for file in files:
+            docker_manager.retrieve_file(
+                f"{docker_manager.workdir}/{file}",
+                os.path.join(config["results"], file))
+        return parse_logs(config, files)
+
+    def process_data(self, data, config):
+        """
+        Process the parsed extra data. By default, the patterns marked as
+        `summary` in the log schema are printed as the overall metrics of
+        the first file, which is the log of the first party, and the other
+        patterns are printed for every file.
+
+        :param data: The data returned by retrieve_data.
+        :param config: Configuration data.
+        """
+        if hasattr(self._module, "process_data"):
+            self._module.process_data(data, config)
+            return
+
+        schema = config.get("log_schema", {})
+        summary = [name for name, entry in schema.items()
+                   if entry.get("summary")]
+        if data and summary:
+            file = next(iter(data))
+            print(f"Overall Metrics (from {file}):")
+            for name in summary:
+                print(f"{_label(schema, name)}: "
+                      f"{_values(data[file][name])}")
+            print("\n")
+
+        for file, records in data.items():
+            print(f"File: {file}")
+            for name, values in records.items():
+                if name not in summary:
+                    print(f"{_label(schema, name)}: {_values(values)}")
+            print("\n")
+
+
+def _label(schema, name):
+    """
+    Get the label of a pattern of the log schema, which is its `label` or
+    otherwise its name in title case.
+
+    :param schema: The log schema.
+    :param name: Name of the pattern.
+    :return: The label.
+    """
+    return schema[name].get("label", name.replace("_", " ").title())
+
+
+def _values(records):
+    """
+    Convert parsed records to plain values for printing. A record with a
+    single field is printed as the value of that field.
+
+    :param records: List of records of a pattern.
+    :return: List of values and tuples.
+    """
+    return [record[0] if len(record) == 1 else tuple(record)
+            for record in records]
+
+
+def extra_files(config):
+    """
+    Get the extra files of the run. A mode of the protocol can override the
+    `extra_files` of the configuration, for protocols where the number of
+    parties depends on the mode.
+
+    :param config: Configuration data.
+    :return: List of file names, relative to the working directory.
+    """
+    mode = config.get("modes", {}).get(config.get("mode"), {})
+    return mode.get("extra_files", config.get("extra_files", []))
+
+
+def parse_logs(config, files=None):
+    """
+    Parse retrieved log files with the log schema of the configuration.
+
+    :param config: Configuration data.
+    :param files: Names of the files in the results directory, the extra
+    files of the run by default.
+    :return: Dictionary mapping every file to a dictionary with the records
+    of every pattern.
+    """
+    parser = LogParser.from_schema(config.get("log_schema", {}))
+    if files is None:
+        files = extra_files(config)
+    return {file: parser.parse(os.path.join(config["results"], file))
+            for file in files}
+
+
+def get_plugin(config):
+    """
+    Get the extra data processor of a protocol. The module in src/extra of
+    the protocol is imported the first time it is needed.
+
+    :param config: Configuration data.
+    :return: The plugin of the protocol.
+    """
+    name = config["name"]
+    if name not in _plugins:
+        module = None
+        if importlib.util.find_spec(f"extra.{name}") is not None:
+            module = importlib.import_module(f"extra.{name}")
+        _plugins[name] = ExtraPlugin(name, module)
+    return _plugins[name]
+
+
+def validate_schema(config):
+    """
+    Check that the log schema of the configuration can be compiled.
+
+    :param config: Configuration data.
+    :return: True if the schema is valid, False otherwise.
+    """
+    try:
+        LogParser.from_schema(config.get("log_schema", {}))
+    except (KeyError, ValueError, TypeError) as e:
+        print(f"Error: invalid log schema: {e}")
+        return False
+    except re.error as e:
+        print(f"Error: invalid regular expression in log schema: {e}")
+        return False
+    return True
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+log_parser.py
+
+This module parses the log files written by the protocols, as used by the
+extra data processors. All patterns of a parser are combined into a single
+compiled regular expression, so every file is read once, line by line, and
+every match is converted into a typed record of the pattern that matched.
+"""
+
+import re
+from collections import namedtuple
+
+# Field types that can be used in a declarative log schema
+FIELD_TYPES = {"int": int, "float": float, "str": str}
+
+
+class LogPattern:
+    """
+    A pattern of a log line and the fields it extracts.
+
+    Every capturing group of the regular expression is a field, converted
+    with the type given for it. The groups must be unnamed, since the parser
+    names the pattern itself.
+    """
+
+    def __init__(self, name, regex, fields):
+        """
+        Initialize the pattern.
+
+        :param name: Name of the pattern, which must be a valid identifier.
+        :param regex: Regular expression matching a single line.
+        :param fields: List of tuples of the field name and its type, one for
+        every capturing group, such as [("sent", float), ("recv", float)].
+        """
+        if not name.isidentifier():
+            raise ValueError(f"Pattern name '{name}' is not an identifier")
+        groups = re.compile(regex).groups
+        if groups != len(fields):
+            raise ValueError(f"Pattern '{name}' has {groups} group(s) but "
+                             f"{len(fields)} field(s)")
+        self.name = name
+        self.regex = regex
+        self.types = [field_type for _, field_type in fields]
+        self.record = namedtuple(name, [field for field, _ in fields])
+
+
+class LogParser:
+    """
+    A single-pass parser for log files.
+
+    The patterns are joined into one alternation of named groups. For every
+    match, the name of the outer group tells which pattern matched, and the
+    position of its capturing groups in the combined expression is known in
+    advance, so no pattern is tried twice.
+    """
+
+    def __init__(self, patterns):
+        """
+        Compile the patterns into a single regular expression.
+
+        :param patterns: List of LogPattern objects.
+        """
+        self._patterns = {}
+        alternatives = []
+        group = 0
+        for pattern in patterns:
+            group += 1
+            alternatives.append(f"(?P<{pattern.name}>{pattern.regex})")
+            self._patterns[pattern.name] = (pattern, group)
+            group += len(pattern.types)
+        self._regex = re.compile("|".join(alternatives))
+
+    @classmethod
+    def from_schema(cls, schema):
+        """
+        Create a parser from a declarative log schema, as used in the
+        `log_schema` field of the configuration file. The schema maps every
+        pattern name to an object with the `regex` of the line and its
+        `fields`, which map every field name to its type ("int", "float" or
+        "str"), in the order of the capturing groups.
+
+        :param schema: The log schema.
+        :return: The parser.
+        """
+        patterns = []
+        for name, entry in schema.items():
+            fields = []
+            for field, type_name in entry.get("fields", {}).items():
+                if type_name not in FIELD_TYPES:
+                    raise ValueError(f"Unknown type '{type_name}' of field "
+                                     f"'{field}' in pattern '{name}'")
+                fields.append((field, FIELD_TYPES[type_name]))
+            patterns.append(LogPattern(name, entry["regex"], fields))
+        return cls(patterns)
+
+    def records(self, path):
+        """
+        Read a log file line by line and yield a record for every match.
+
+        :param path: Path to the log file.
+        :return: Generator of tuples of the pattern name and its record.
+        """
+        with open(path, "r", errors="replace") as f:
+            for line in f:
+                for match in self._regex.finditer(line):
+                    pattern, group = self._patterns[match.lastgroup]
+                    values = match.groups()[group:group + len(pattern.types)]
+                    yield pattern.name, pattern.record(*(
+                        field_type(value) for field_type, value
+                        in zip(pattern.types, values)))
+
+    def parse(self, paths):
+        """
+        Parse one or more log files.
+
+        :param paths: Path to a log file, or a list of paths whose records
+        are combined in order.
+        :return: Dictionary mapping every pattern name to its records.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        parsed = {name: [] for name in self._patterns}
+        for path in paths:
+            for name, record in self.records(path):
+                parsed[name].append(record)
+        return parsed
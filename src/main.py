@@ -10,6 +10,9 @@ information is passed to the Docker manager.
 import argparse
 import os
 
+import checkpoint
+import config_engine
+import run_cache
 import utils
 
 
@@ -33,7 +36,119 @@ def parse_arguments():
     parser.add_argument("--iterations", "-i", type=int,
                         default=1, help="Number of iterations to run")
     parser.add_argument("--max-top", "-m", type=int, default=0,
-                        help="Maximum Scaphandre ranking")
+                        help=(
+                            "Maximum Scaphandre ranking, only used with the "
+                            "host scope"
+                        ))
+    parser.add_argument("--scope", "-s", type=str, default="container",
+                        choices=["container", "host"],
+                        help=(
+                            "Scaphandre measurement scope, either only the "
+                            "benchmark container or all host processes"
+                        ))
+    parser.add_argument("--metrics-port", "-p", type=int, default=0,
+                        help=(
+                            "Serve live OpenMetrics measurements on this "
+                            "port during the run, disabled by default"
+                        ))
+    parser.add_argument("--network-profile", "-w", type=str, default="none",
+                        help=(
+                            "Network profile to emulate inside the container, "
+                            "such as 'lan' or 'wan'"
+                        ))
+    parser.add_argument("--topology", "-t", type=str, default="single",
+                        choices=["single", "multi"],
+                        help=(
+                            "Run all parties in a single container, or every "
+                            "party in its own container"
+                        ))
+    parser.add_argument("--cpus", type=float,
+                        help="Number of CPUs the container may use")
+    parser.add_argument("--cpuset", type=str,
+                        help="Cores the container may run on, e.g. '0-3'")
+    parser.add_argument("--memory", type=str,
+                        help="Memory limit of the container, e.g. '4g'")
+    parser.add_argument("--scaling", type=str,
+                        help=(
+                            "Comma-separated core counts to run the protocol "
+                            "with, e.g. '1,2,4,8,16'"
+                        ))
+    parser.add_argument("--calibrate", action="store_true",
+                        help=(
+                            "Measure the overhead of the measurement "
+                            "backends by running the protocol with each of "
+                            "them toggled on and off"
+                        ))
+    parser.add_argument("--suite", type=str,
+                        help=(
+                            "Path to a benchmark suite to run and compare "
+                            "against earlier runs"
+                        ))
+    parser.add_argument("--self-benchmark", type=str,
+                        choices=["small", "medium", "large"],
+                        help=(
+                            "Benchmark the processing of snnif on synthetic "
+                            "runs of the given size, without Docker"
+                        ))
+    parser.add_argument("--history", type=str,
+                        help=(
+                            "Path to the benchmark history database "
+                            "(default: benchmark_history.sqlite, or "
+                            "self_benchmark_history.sqlite with "
+                            "--self-benchmark)"
+                        ))
+    parser.add_argument("--threshold", type=float, default=3.0,
+                        help=(
+                            "Number of standard deviations above the "
+                            "baseline that is flagged as a regression"
+                        ))
+    parser.add_argument("--mode", type=str,
+                        help=(
+                            "Mode of the protocol, the command is built from "
+                            "the command template of the mode"
+                        ))
+    parser.add_argument("--var", type=str, action="append",
+                        metavar="NAME=VALUE",
+                        help=(
+                            "Value of a variable of the command template, "
+                            "can be given multiple times"
+                        ))
+    parser.add_argument("--force", "-f", action="store_true",
+                        help=(
+                            "Run the protocol even if the results of an "
+                            "identical run are cached"
+                        ))
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the run cache")
+    parser.add_argument("--cache-max-age", type=float,
+                        help=(
+                            "Remove cached runs that were not used for this "
+                            "many days"
+                        ))
+    parser.add_argument("--cache-max-size", type=str,
+                        help=(
+                            "Disk budget of the run cache, e.g. '20g', the "
+                            "least recently used runs are removed first"
+                        ))
+    parser.add_argument("--analyze", "-a", type=str,
+                        help=(
+                            "Process the results of an earlier run again, "
+                            "given its results directory"
+                        ))
+    parser.add_argument("--report", type=str, nargs="+", metavar="DIR",
+                        help=(
+                            "Create an HTML report of all runs in the given "
+                            "results directories"
+                        ))
+    parser.add_argument("--report-output", type=str,
+                        default=os.path.join("results", "report.html"),
+                        help="Path to the HTML report")
+    parser.add_argument("--resume", "-r", type=str,
+                        help=(
+                            "Continue an interrupted run from its last "
+                            "completed iteration, given its results "
+                            "directory"
+                        ))
     return parser.parse_args()
 
 
@@ -71,6 +186,24 @@ def get_config_path(protocol_path, config_arg):
     return config_path
 
 
+def finish_run(config, result):
+    """
+    Process the results of a run, unless it failed or was interrupted.
+
+    :param config: Configuration data.
+    :param result: Tuple indicating success and a message, as returned by
+    run_protocol.
+    """
+    if result[0] is False:
+        print(f"Error running protocol: {result[1]}")
+        exit(1)
+    if config.get("interrupted"):
+        if config.get("results"):
+            print(f"Resume the run with: --resume {config['results']}")
+        exit(1)
+    utils.process_data(config, utils.has_power_measurements(config))
+
+
 def display_verbose_info(protocol_name, config):
     """
     Display verbose information about the protocol and configuration.
@@ -90,6 +223,55 @@ def display_verbose_info(protocol_name, config):
 if __name__ == "__main__":
     args = parse_arguments()
 
+    if args.suite:
+        import benchmark_suite
+
+        regressions = benchmark_suite.run_suite(
+            args.suite, args.history or "benchmark_history.sqlite",
+            threshold=args.threshold)
+        if regressions is None:
+            print("Benchmark suite interrupted, the interrupted run is not "
+                  "recorded")
+            exit(1)
+        exit(1 if regressions else 0)
+
+    if args.self_benchmark:
+        import self_benchmark
+
+        regressions = self_benchmark.run_benchmarks(
+            args.self_benchmark,
+            args.history or self_benchmark.HISTORY_PATH,
+            threshold=args.threshold)
+        exit(1 if regressions else 0)
+
+    if args.analyze:
+        config = utils.load_run(args.analyze)
+        utils.process_data(config, utils.has_power_measurements(config))
+        exit(0)
+
+    if args.report:
+        import report
+
+        runs = report.generate_report(args.report, args.report_output)
+        print(f"Report of {runs} run(s) written to '{args.report_output}'")
+        exit(0)
+
+    if args.resume:
+        config = utils.load_run(args.resume)
+        config["path"] = get_protocol_path(config["name"])
+        config["verbose"] = args.verbose
+        config["built"] = args.built
+        start = checkpoint.completed_iterations(config)
+        if start < config["iterations"]:
+            print(f"Resuming the run at iteration {start + 1} of "
+                  f"{config['iterations']}")
+            config["start-iteration"] = start
+            finish_run(config, utils.run_protocol(config))
+        else:
+            print("All iterations of the run are completed")
+            utils.process_data(config, utils.has_power_measurements(config))
+        exit(0)
+
     if not args.name:
         print("Error: missing protocol name")
         exit(1)
@@ -98,7 +280,19 @@ if __name__ == "__main__":
     config_path = get_config_path(protocol_path, args.config)
 
     config = utils.parse_config(config_path)
+    if args.mode or args.var:
+        protocol = config_engine.Protocol(args.name, protocol_path, config)
+        try:
+            config = protocol.configure(
+                config_engine.parse_values(args.var), args.mode)
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit(1)
     config["iterations"] = args.iterations
+    config["topology"] = args.topology
+    for limit in ("cpus", "cpuset", "memory"):
+        if getattr(args, limit) is not None:
+            config[limit] = getattr(args, limit)
     if utils.validate_config(config) is False:
         print("Invalid configuration")
         exit(1)
@@ -107,12 +301,43 @@ if __name__ == "__main__":
     config["verbose"] = args.verbose
     config["built"] = args.built
     config["max-top"] = args.max_top
+    config["scaphandre-scope"] = args.scope
+    config["metrics-port"] = args.metrics_port
+    config["network-profile"] = args.network_profile
+    config["force"] = args.force
+    config["run-cache"] = not args.no_cache
+    if args.cache_max_age is not None:
+        config["cache-max-age"] = args.cache_max_age
+    if args.cache_max_size is not None:
+        try:
+            run_cache.parse_size(args.cache_max_size)
+        except ValueError:
+            print(f"Error: invalid cache size '{args.cache_max_size}'")
+            exit(1)
+        config["cache-max-size"] = args.cache_max_size
 
     if args.verbose:
         display_verbose_info(args.name, config)
 
-    result = utils.run_protocol(config)
-    if result[0] is False:
-        print(f"Error running protocol: {result[1]}")
-        exit(1)
-    utils.process_data(config)
+    if args.scaling:
+        try:
+            core_counts = [int(cores) for cores in args.scaling.split(",")]
+        except ValueError:
+            print(f"Error: invalid core counts '{args.scaling}'")
+            exit(1)
+        result = utils.run_scaling(config, core_counts)
+        if result[0] is False:
+            print(f"Error running scaling benchmark: {result[1]}")
+            exit(1)
+        exit(0)
+
+    if args.calibrate:
+        import calibration
+
+        result = calibration.run_calibration(config)
+        if result[0] is False:
+            print(f"Error running calibration: {result[1]}")
+            exit(1)
+        exit(0)
+
+    finish_run(config, utils.run_protocol(config))
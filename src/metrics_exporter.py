@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+metrics_exporter.py
+
+This module exposes the measurements of a running protocol as an OpenMetrics
+endpoint, so they can be scraped by Prometheus while the protocol is still
+running. It is fed by the progress lines of the protocol manager and by the
+Scaphandre output stream.
+"""
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROGRESS_PREFIX = "snnif-progress "
+
+# nethogs reports data amounts in kilobytes of 1024 bytes, the metrics are in
+# the base unit
+KILOBYTE = 1024
+
+METRICS = {
+    "snnif_iterations_completed": "Number of completed iterations",
+    "snnif_iterations": "Number of iterations in the run",
+    "snnif_iteration_duration_seconds": "Duration of the last iteration",
+    "snnif_party_sent_bytes": "Data sent by a party in the last iteration",
+    "snnif_party_received_bytes": (
+        "Data received by a party in the last iteration"),
+    "snnif_party_bandwidth_bytes_per_second": (
+        "Average bandwidth of a party in the last iteration"),
+    "snnif_process_power_watts": (
+        "Last measured power consumption of a process of the protocol"),
+}
+
+# Metric families of the info type, whose single sample has the _info suffix
+# and the value 1. The process ids of the parties change in every iteration,
+# so they are exposed here instead of as a label of the party gauges.
+INFO_METRICS = {
+    "snnif_party": "Process id of a party in the last iteration",
+}
+
+
+class MetricsExporter:
+    """
+    A small OpenMetrics HTTP server holding the latest measurements.
+
+    The values are stored as gauges and are updated from the output of the
+    protocol manager and from the Scaphandre JSON stream. The server runs in a
+    background thread and serves the values on /metrics.
+    """
+
+    def __init__(self, config):
+        """
+        Initialize the exporter with the configuration data.
+
+        :param config: Configuration data for the protocol.
+        """
+        self._port = config.get("metrics-port", 0)
+        self._protocol = config.get("name")
+        self._execfile = config.get("execfile", "")
+        self._verbose = config.get("verbose", False)
+        self._values = {}
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._server = None
+        self._tail_thread = None
+        self._stop_event = threading.Event()
+        self.set("snnif_iterations", {}, config.get("iterations", 1))
+        self.set("snnif_iterations_completed", {}, 0)
+
+    def start(self):
+        """
+        Start serving the metrics on the configured port.
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type",
+                    "application/openmetrics-text; version=1.0.0; "
+                    "charset=utf-8"
+                )
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self._port), Handler)
+        thread = threading.Thread(target=self._server.serve_forever,
+                                  daemon=True)
+        thread.start()
+        print(f"Serving OpenMetrics on http://127.0.0.1:{self._port}/metrics")
+
+    def stop(self):
+        """
+        Stop the HTTP server and the Scaphandre stream, if they are running.
+        """
+        self._stop_event.set()
+        if self._tail_thread is not None:
+            self._tail_thread.join()
+            self._tail_thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def set(self, name, labels, value):
+        """
+        Set the value of a gauge.
+
+        :param name: Name of the metric.
+        :param labels: Dictionary of label names and values.
+        :param value: New value of the gauge.
+        """
+        labels = dict(labels, protocol=self._protocol)
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = value
+
+    def replace(self, name, samples, match=None):
+        """
+        Replace the series of a metric by new ones, so the series of
+        processes that no longer exist are removed. The series are replaced
+        at once, so a scrape never sees only part of them.
+
+        :param name: Name of the metric.
+        :param samples: List of tuples of a label dictionary and a value.
+        :param match: Dictionary of labels the replaced series must have, or
+        None to replace all series of the metric.
+        """
+        match = dict(match or {}, protocol=self._protocol)
+        new_values = {}
+        for labels, value in samples:
+            labels = dict(labels, protocol=self._protocol)
+            new_values[(name, tuple(sorted(labels.items())))] = value
+        with self._lock:
+            for key in list(self._values):
+                metric, labels = key
+                labels = dict(labels)
+                if metric == name and all(labels.get(label) == value
+                                          for label, value in match.items()):
+                    del self._values[key]
+            self._values.update(new_values)
+
+    def render(self):
+        """
+        Render all gauges in the OpenMetrics text format.
+
+        :return: The exposition as a string.
+        """
+        with self._lock:
+            items = sorted(self._values.items())
+
+        lines = []
+        families = [(name, description, "gauge", name)
+                    for name, description in METRICS.items()]
+        families += [(name, description, "info", f"{name}_info")
+                     for name, description in INFO_METRICS.items()]
+        for name, description, kind, sample_name in families:
+            samples = [(labels, value) for (metric, labels), value in items
+                       if metric == name]
+            if not samples:
+                continue
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {description}")
+            for labels, value in samples:
+                label_str = ",".join(
+                    f'{key}="{str(val)}"' for key, val in labels)
+                lines.append(f"{sample_name}{{{label_str}}} {value}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def feed(self, text, source=None):
+        """
+        Feed output of the protocol manager to the exporter. The output may be
+        split at arbitrary positions, so incomplete lines are buffered.
+
+        :param text: A chunk of output from the container.
+        :param source: Index of the party whose container produced the
+        output, or None if all parties run in the same container.
+        """
+        with self._lock:
+            buffer = self._buffers.get(source, "") + text.replace("\r", "")
+            lines = buffer.split("\n")
+            self._buffers[source] = lines.pop()
+        for line in lines:
+            self._handle_line(line.strip(), source)
+
+    def _handle_line(self, line, source=None):
+        """
+        Update the gauges from a single progress line of the protocol manager.
+
+        :param line: A line of output from the container.
+        :param source: Index of the party whose container produced the line,
+        which is then used as party label. Otherwise, the parties are
+        numbered in the order of their process ids, like in the data
+        processor. The process ids are published as an info metric.
+        """
+        if not line.startswith(PROGRESS_PREFIX):
+            return
+        try:
+            progress = json.loads(line[len(PROGRESS_PREFIX):])
+        except json.JSONDecodeError:
+            return
+
+        duration = progress["duration"]
+        self.set("snnif_iterations_completed", {}, progress["iteration"] + 1)
+        self.set("snnif_iteration_duration_seconds", {}, duration)
+        samples = {name: [] for name in (
+            "snnif_party_sent_bytes", "snnif_party_received_bytes",
+            "snnif_party_bandwidth_bytes_per_second", "snnif_party")}
+        for party_id, pid in enumerate(sorted(progress["parties"])):
+            sent, received = progress["parties"][pid]
+            sent, received = sent * KILOBYTE, received * KILOBYTE
+            labels = {"party": str(party_id if source is None else source)}
+            samples["snnif_party_sent_bytes"].append((labels, sent))
+            samples["snnif_party_received_bytes"].append((labels, received))
+            if duration > 0:
+                samples["snnif_party_bandwidth_bytes_per_second"].append(
+                    (labels, (sent + received) / duration))
+            samples["snnif_party"].append((dict(labels, pid=pid), 1))
+
+        # In a container per party, every container only replaces the series
+        # of its own party
+        match = None if source is None else {"party": str(source)}
+        for name, values in samples.items():
+            self.replace(name, values, match)
+
+    def follow_scaphandre(self, path):
+        """
+        Follow the Scaphandre output file in a background thread and update
+        the power gauges of the parties as new objects are written.
+
+        :param path: Path to the Scaphandre JSON file.
+        """
+        self._tail_thread = threading.Thread(
+            target=self._tail_scaphandre, args=(path,), daemon=True)
+        self._tail_thread.start()
+
+    def _tail_scaphandre(self, path):
+        """
+        Read complete JSON objects from the Scaphandre output file as they are
+        appended to it. The objects are decoded one after another from a
+        buffer that is refilled with the new output.
+
+        :param path: Path to the Scaphandre JSON file.
+        """
+        while not os.path.exists(path) and not self._stop_event.is_set():
+            time.sleep(0.1)
+        if not os.path.exists(path):
+            return
+
+        decoder = json.JSONDecoder()
+        buffer = ""
+        with open(path, "r") as f:
+            while True:
+                block = f.read()
+                if not block:
+                    if self._stop_event.is_set():
+                        return
+                    time.sleep(0.1)
+                    continue
+
+                buffer += block
+                position = 0
+                while True:
+                    position = buffer.find("{", position)
+                    if position < 0:
+                        buffer = ""
+                        break
+                    try:
+                        obj, position = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        # An incomplete object is completed by the next block
+                        buffer = buffer[position:]
+                        break
+                    self._handle_scaphandre(obj)
+
+    def _handle_scaphandre(self, obj):
+        """
+        Update the power gauges from a single Scaphandre object. Scaphandre
+        reports processes, so the gauges are labelled with the process id.
+        Every object is a complete sample, so the gauges of the processes
+        that are no longer in it are removed.
+
+        :param obj: A JSON object written by Scaphandre.
+        """
+        samples = []
+        for consumer in obj.get("consumers", []):
+            if consumer.get("container") is None:
+                continue
+            if self._execfile.lower() not in consumer["exe"].lower():
+                continue
+            samples.append(({"pid": str(consumer["pid"])},
+                            consumer["consumption"]))
+        self.replace("snnif_process_power_watts", samples)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+network_emulation.py
+
+This module shapes the network traffic inside the Docker container, so the
+protocols can be measured under LAN or WAN conditions instead of at loopback
+speed. The shaping is done with tc netem on every interface of the container.
+"""
+
+import json
+
+# Built-in network profiles. The round trip time is in milliseconds, the
+# bandwidth in Mbit/s and the loss in percent.
+PROFILES = {
+    "none": None,
+    "lan": {"rtt": 0.5, "bandwidth": 1000, "loss": 0},
+    "wan": {"rtt": 40, "bandwidth": 100, "loss": 0},
+}
+
+
+class NetworkEmulationError(RuntimeError):
+    """
+    Raised when a network profile cannot be applied to a container. The
+    profile is applied in a worker thread, where exiting would only stop the
+    thread, so the error is reported to the run instead.
+    """
+
+
+def get_profile(config):
+    """
+    Get the network profile selected in the configuration. Profiles defined
+    in the `network_profiles` field of the configuration take precedence over
+    the built-in profiles.
+
+    :param config: Configuration data.
+    :return: The profile as a dictionary, None if no shaping is applied.
+    """
+    name = config.get("network-profile", "none")
+    profiles = dict(PROFILES, **config.get("network_profiles", {}))
+    if name not in profiles:
+        print(f"Error: unknown network profile '{name}', available profiles "
+              f"are {', '.join(profiles)}")
+        exit(1)
+    if profiles[name] is None:
+        return None
+    return dict(profiles[name], name=name)
+
+
+def netem_arguments(profile):
+    """
+    Convert a network profile to tc netem arguments. The delay is applied
+    when a packet leaves an interface, so every direction gets half of the
+    round trip time.
+
+    :param profile: The network profile.
+    :return: The netem arguments as a string.
+    """
+    arguments = []
+    if profile.get("rtt", 0) > 0:
+        arguments.append(f"delay {profile['rtt'] / 2}ms")
+    if profile.get("bandwidth", 0) > 0:
+        arguments.append(f"rate {profile['bandwidth']}mbit")
+    if profile.get("loss", 0) > 0:
+        arguments.append(f"loss {profile['loss']}%")
+    return " ".join(arguments)
+
+
+def apply_profile(docker_manager, profile):
+    """
+    Apply the network profile to every interface of the running container.
+    The container must have the NET_ADMIN capability and tc must be installed
+    in the image.
+
+    :param docker_manager: The Docker manager of the running container.
+    :param profile: The network profile.
+    :raises NetworkEmulationError: If tc could not shape an interface.
+    """
+    arguments = netem_arguments(profile)
+    interfaces = docker_manager.run_command("ls /sys/class/net").split()
+    for interface in interfaces:
+        docker_manager.run_command(
+            f"tc qdisc replace dev {interface} root netem {arguments}")
+        output = docker_manager.run_command(f"tc qdisc show dev {interface}")
+        if "netem" not in output:
+            raise NetworkEmulationError(
+                f"Could not apply network profile '{profile['name']}' to "
+                f"interface '{interface}', is iproute2 installed in the "
+                "image?")
+    print(f"Applied network profile '{profile['name']}' ({arguments}) to "
+          f"{', '.join(interfaces)}")
+
+
+def save_profile(profile, path):
+    """
+    Store the network profile used for the run.
+
+    :param profile: The network profile, or None if no shaping was applied.
+    :param path: Path to the output file.
+    """
+    with open(path, "w") as f:
+        json.dump(profile if profile is not None else {"name": "none"}, f,
+                  indent=4)
@@ -7,11 +7,270 @@ responsible for running the protocol and for taking measurements.
 """
 
 import argparse
+import json
 import subprocess
 import time
 import os
 import signal
 import sys
+import threading
+
+MARKER_FIFO = "snnif_markers"
+
+# CPU usage of the container in cgroup v2 (microseconds) and v1 (nanoseconds)
+CGROUP_CPU_FILES = (
+    ("/sys/fs/cgroup/cpu.stat", 1e-6),
+    ("/sys/fs/cgroup/cpuacct/cpuacct.usage", 1e-9),
+    ("/sys/fs/cgroup/cpu,cpuacct/cpuacct.usage", 1e-9),
+)
+
+
+def container_cpu_time():
+    """
+    Read the CPU time used by all processes of the container, including the
+    measurement processes, from its cgroup.
+
+    :return: The CPU time in seconds, or None if the cgroup is not readable.
+    """
+    for path, unit in CGROUP_CPU_FILES:
+        try:
+            with open(path, "r") as f:
+                if path.endswith("cpu.stat"):
+                    for line in f:
+                        key, _, value = line.partition(" ")
+                        if key == "usage_usec":
+                            return int(value) * unit
+                    continue
+                return int(f.read().strip()) * unit
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def nethogs_totals(output_file, execfile):
+    """
+    Read the last cumulative sent and received amounts of every party from a
+    nethogs output file.
+
+    :param output_file: Path to the nethogs output file.
+    :param execfile: Name of the executable of the protocol.
+    :return: Dictionary mapping party ids to (sent, received) in kB.
+    """
+    totals = {}
+    with open(output_file, "r") as outfile:
+        for line in outfile:
+            line = line.strip()
+            if not (line.startswith("./" + execfile) or
+                    line.startswith("/" + execfile)):
+                continue
+            parts = line.split()
+            path_parts = parts[0].split("/")
+            if len(path_parts) >= 3 and len(parts) >= 3:
+                totals[path_parts[-2]] = (float(parts[1]), float(parts[2]))
+    return totals
+
+
+class PhaseRecorder:
+    """
+    Timestamps the phase markers written by the protocol.
+
+    The protocol marks its phases by writing lines of the form
+    'begin <phase> [party]' and 'end <phase> [party]' to the named pipe in the
+    SNNIF_MARKERS environment variable, for example with
+    echo "begin online 0" > $SNNIF_MARKERS. The pipe does not tell which
+    process wrote a line, so parties that share the pipe add their id. Every
+    line is timestamped as soon as it is read and written to the phase file
+    of the current iteration.
+    """
+
+    def __init__(self, fifo_path):
+        """
+        Create the named pipe and start reading from it.
+
+        :param fifo_path: Path of the named pipe to create.
+        """
+        self.path = os.path.abspath(fifo_path)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.mkfifo(self.path)
+
+        # Opening the pipe for both reading and writing does not block, and
+        # keeps it open while the protocol opens and closes it for writing.
+        self._fd = os.open(self.path, os.O_RDWR)
+        self._lock = threading.Lock()
+        self._outfile = None
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def record_to(self, output_file):
+        """
+        Write the markers to the given file from now on.
+
+        :param output_file: Path to the phase file, or None to stop recording.
+        """
+        with self._lock:
+            if self._outfile is not None:
+                self._outfile.close()
+            self._outfile = None
+            if output_file is not None:
+                self._outfile = open(output_file, "w")
+
+    def _read(self):
+        """
+        Read and timestamp the markers until the pipe is closed.
+        """
+        with os.fdopen(self._fd, "r") as pipe:
+            for line in pipe:
+                timestamp = time.time()
+                line = line.strip()
+                if not line:
+                    continue
+                with self._lock:
+                    if self._outfile is not None:
+                        self._outfile.write(f"{timestamp} {line}\n")
+                        self._outfile.flush()
+
+    def close(self):
+        """
+        Stop recording and remove the named pipe.
+        """
+        self.record_to(None)
+        os.remove(self.path)
+
+
+class ResourceSampler:
+    """
+    Samples the resource usage of the party processes from /proc.
+
+    Every process whose executable or program name contains the name of the
+    executable of the protocol is sampled at a fixed interval. A sample
+    contains the CPU utilization since the previous sample, the current and
+    peak resident set size, the bytes read and written and the number of
+    voluntary and involuntary context switches.
+    """
+
+    HEADER = ("timestamp\tpid\tcpu_percent\trss_kb\tpeak_rss_kb\t"
+              "read_bytes\twrite_bytes\tvoluntary_ctxt_switches\t"
+              "nonvoluntary_ctxt_switches\n")
+
+    def __init__(self, execfile, interval):
+        """
+        Initialize the sampler.
+
+        :param execfile: Name of the executable of the protocol.
+        :param interval: Time between samples in seconds.
+        """
+        self._execfile = execfile
+        self._interval = interval
+        self._clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._previous = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._outfile = None
+
+    def start(self, output_file):
+        """
+        Start sampling to the given file in a background thread.
+
+        :param output_file: Path to the output file.
+        """
+        self._previous = {}
+        self._stop_event.clear()
+        self._outfile = open(output_file, "w")
+        self._outfile.write(self.HEADER)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop sampling and close the output file.
+        """
+        self._stop_event.set()
+        self._thread.join()
+        self._outfile.close()
+
+    def _run(self):
+        """
+        Take samples until the sampler is stopped.
+        """
+        while not self._stop_event.is_set():
+            for sample in self._sample():
+                self._outfile.write("\t".join(str(v) for v in sample) + "\n")
+            self._stop_event.wait(self._interval)
+        self._outfile.flush()
+
+    def _party_pids(self):
+        """
+        Find the processes of the parties.
+
+        :return: List of process ids.
+        """
+        pids = []
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit() or int(entry) == os.getpid():
+                continue
+            try:
+                with open(f"/proc/{entry}/cmdline", "rb") as f:
+                    program = f.read().split(b"\0")[0].decode()
+                exe = os.readlink(f"/proc/{entry}/exe")
+            except OSError:
+                continue
+            # Only the program itself is matched, not its arguments, so the
+            # shells that launch the parties are not sampled.
+            if self._execfile in exe or self._execfile in program:
+                pids.append(int(entry))
+        return pids
+
+    def _sample(self):
+        """
+        Take one sample of every party process.
+
+        :return: List of samples, one for every process.
+        """
+        samples = []
+        for pid in self._party_pids():
+            try:
+                timestamp = time.time()
+                with open(f"/proc/{pid}/stat", "r") as f:
+                    # The command name may contain spaces, so the fields are
+                    # split after its closing parenthesis.
+                    fields = f.read().rsplit(")", 1)[1].split()
+                cpu_time = (int(fields[11]) + int(fields[12])) / \
+                    self._clock_ticks
+                status = {}
+                with open(f"/proc/{pid}/status", "r") as f:
+                    for line in f:
+                        key, _, value = line.partition(":")
+                        status[key] = value.split()[0] if value.split() \
+                            else "0"
+                io = {}
+                try:
+                    with open(f"/proc/{pid}/io", "r") as f:
+                        for line in f:
+                            key, _, value = line.partition(":")
+                            io[key] = value.strip()
+                except OSError:
+                    pass
+            except (OSError, IndexError, ValueError):
+                continue
+
+            cpu_percent = 0.0
+            if pid in self._previous:
+                previous_time, previous_cpu = self._previous[pid]
+                elapsed = timestamp - previous_time
+                if elapsed > 0:
+                    cpu_percent = (cpu_time - previous_cpu) / elapsed * 100
+            self._previous[pid] = (timestamp, cpu_time)
+
+            samples.append((
+                timestamp, pid, round(cpu_percent, 2),
+                status.get("VmRSS", "0"), status.get("VmHWM", "0"),
+                io.get("read_bytes", "0"), io.get("write_bytes", "0"),
+                status.get("voluntary_ctxt_switches", "0"),
+                status.get("nonvoluntary_ctxt_switches", "0"),
+            ))
+        return samples
+
 
 if __name__ == "__main__":
     def main():
@@ -20,25 +279,61 @@ if __name__ == "__main__":
                             required=True, help="Command to run")
         parser.add_argument("--iterations", type=int, default=1,
                             help="Number of iterations to run (minimum 1)")
+        parser.add_argument("--start", type=int, default=0,
+                            help="Index of the first iteration, to resume "
+                                 "an interrupted run")
         parser.add_argument("--verbose", action="store_true")
+        parser.add_argument("--progress", action="store_true",
+                            help="Print a progress line after each iteration")
+        parser.add_argument("--execfile", type=str, default="",
+                            help="Executable used to find the parties")
+        parser.add_argument("--interface", type=str, default="lo",
+                            help="Network interface measured by nethogs")
+        parser.add_argument("--sample-interval", type=float, default=0.1,
+                            help="Time between resource samples in seconds")
+        parser.add_argument("--no-nethogs", action="store_true",
+                            help="Do not measure the network traffic")
+        parser.add_argument("--no-resources", action="store_true",
+                            help="Do not sample the resource usage")
         args = parser.parse_args()
 
         if args.iterations < 1:
             print("Error: The number of iterations must be at least 1.")
             sys.exit(1)
+        if not 0 <= args.start < args.iterations:
+            print("Error: The first iteration must be between 0 and the "
+                  "number of iterations.")
+            sys.exit(1)
+
+        nethogs_cmd = ["nethogs", args.interface, "-a", "-t", "-d", "0", "-v",
+                       "1"]
 
-        nethogs_cmd = ["nethogs", "lo", "-a", "-t", "-d", "0", "-v", "1"]
+        recorder = PhaseRecorder(MARKER_FIFO)
+        os.environ["SNNIF_MARKERS"] = recorder.path
+        sampler = None
+        if args.execfile and not args.no_resources:
+            sampler = ResourceSampler(args.execfile, args.sample_interval)
 
-        for run in range(args.iterations):
+        for run in range(args.start, args.iterations):
             output_file = f"nethogs_{run}.txt"
 
+            # The output files are created even if a measurement is
+            # disabled, so every iteration has the same files
             with open(output_file, "w") as outfile:
-                nethogs_proc = subprocess.Popen(
-                    nethogs_cmd,
-                    stdout=outfile,
-                    stderr=subprocess.DEVNULL,
-                    preexec_fn=os.setsid
-                )
+                nethogs_proc = None
+                if not args.no_nethogs:
+                    nethogs_proc = subprocess.Popen(
+                        nethogs_cmd,
+                        stdout=outfile,
+                        stderr=subprocess.DEVNULL,
+                        preexec_fn=os.setsid
+                    )
+                recorder.record_to(f"phases_{run}.txt")
+                if sampler is not None:
+                    sampler.start(f"resources_{run}.txt")
+                else:
+                    open(f"resources_{run}.txt", "w").close()
+                start_cpu = container_cpu_time()
                 start_time = time.time()
 
                 result = subprocess.run(args.command, shell=True)
@@ -46,11 +341,17 @@ if __name__ == "__main__":
                     print(f"Command error:\n{result.stderr}", file=sys.stderr)
 
                 stop_time = time.time()
+                stop_cpu = container_cpu_time()
+                if sampler is not None:
+                    sampler.stop()
 
-                # Ensure that all traffic is captured by waiting for a second
+                # Ensure that all traffic is captured by waiting for a second,
+                # this also leaves time to read the last phase markers
                 time.sleep(1)
+                recorder.record_to(None)
 
-                os.killpg(os.getpgid(nethogs_proc.pid), signal.SIGTERM)
+                if nethogs_proc is not None:
+                    os.killpg(os.getpgid(nethogs_proc.pid), signal.SIGTERM)
                 nethogs_stop_time = time.time()
                 with open('time.txt', 'a') as time_file:
                     duration = nethogs_stop_time - start_time
@@ -60,6 +361,23 @@ if __name__ == "__main__":
                         f"iteration_duration_{run}: {iteration_duration}\n")
                     time_file.write(f"iteration_start_{run}: {start_time}\n")
                     time_file.write(f"iteration_stop_{run}: {stop_time}\n")
+                    if start_cpu is not None and stop_cpu is not None:
+                        time_file.write(
+                            f"iteration_cpu_{run}: {stop_cpu - start_cpu}\n")
+
+            # All files of the iteration are closed, so the host can save
+            # them while the next iteration runs
+            print(f"snnif-checkpoint {run}", flush=True)
+
+            if args.progress:
+                progress = {
+                    "iteration": run,
+                    "duration": stop_time - start_time,
+                    "parties": nethogs_totals(output_file, args.execfile),
+                }
+                print("snnif-progress " + json.dumps(progress), flush=True)
+
+        recorder.close()
     try:
         main()
     except KeyboardInterrupt:
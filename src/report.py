@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+report.py
+
+This module creates a single self-contained HTML report of many runs. It
+only reads the summaries that are stored with every run, such as
+statistics.json, alignment.json, scaling.json and calibration.json, and
+never the raw measurements, so a report of thousands of runs is created in
+seconds. The charts are drawn as inline SVG, so no display, browser or
+plotting library is needed to create the report.
+"""
+
+import html
+import json
+import math
+import os
+import time
+
+# Summary files that are read from a run directory
+RUN_FILES = ("config.json", "statistics.json", "alignment.json")
+
+# Metrics of the comparison table, with their unit
+METRICS = (("duration", "s"), ("data", "kB"), ("bandwidth", "kB/s"),
+           ("cpu", "s"), ("energy", "J"))
+
+# Configuration values shown for every run
+CONFIG_KEYS = ("name", "mode", "iterations", "topology", "network-profile",
+               "cpus", "memory")
+
+COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b",
+          "#e377c2", "#7f7f7f", "#bcbd22", "#17becf")
+
+STYLE = """
+body { font-family: sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; margin-bottom: 2em; font-size: 0.85em; }
+th, td { border: 1px solid #ccc; padding: 0.3em 0.6em; text-align: right; }
+th { background: #f0f0f0; }
+td.text, th.text { text-align: left; }
+svg { margin: 0 2em 2em 0; }
+svg text { font-size: 11px; }
+"""
+
+
+def _read_json(path):
+    """
+    Read a JSON file.
+
+    :param path: Path to the file.
+    :return: The data, or None if the file is missing or invalid.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def find_summaries(paths):
+    """
+    Find the runs, scaling benchmarks and calibrations under the given
+    directories. The run cache and the latest link are skipped.
+
+    :param paths: List of results directories or run directories.
+    :return: Dictionary with the lists "runs", "scaling" and "calibration",
+    every entry holding the path of the directory and its summaries.
+    """
+    found = {"runs": [], "scaling": [], "calibration": []}
+    for root in paths:
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = sorted(
+                name for name in subdirectories
+                if name != "cache" and not name.startswith(".") and
+                name != "timeline" and name != "figures")
+            if "statistics.json" in files and "config.json" in files:
+                run = {"path": directory}
+                for file in RUN_FILES:
+                    run[file.split(".")[0]] = _read_json(
+                        os.path.join(directory, file))
+                found["runs"].append(run)
+            if "scaling.json" in files:
+                found["scaling"].append({
+                    "path": directory,
+                    "curves": _read_json(os.path.join(directory,
+                                                      "scaling.json"))})
+            if "calibration.json" in files:
+                found["calibration"].append({
+                    "path": directory,
+                    "report": _read_json(os.path.join(directory,
+                                                      "calibration.json"))})
+    return found
+
+
+def _format(value, digits=3):
+    """
+    Format a number for a table cell.
+
+    :param value: The number, or None.
+    :param digits: Number of decimals.
+    :return: The formatted number, or an empty string for None.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.{digits}f}"
+    return html.escape(str(value))
+
+
+def _table(headers, rows, text_columns=1):
+    """
+    Create an HTML table.
+
+    :param headers: List of column headers.
+    :param rows: List of rows, each a list of formatted cells.
+    :param text_columns: Number of leading columns that are left aligned.
+    :return: The table as HTML.
+    """
+    parts = ["<table><tr>"]
+    for i, header in enumerate(headers):
+        css = ' class="text"' if i < text_columns else ""
+        parts.append(f"<th{css}>{html.escape(header)}</th>")
+    parts.append("</tr>")
+    for row in rows:
+        parts.append("<tr>")
+        for i, cell in enumerate(row):
+            css = ' class="text"' if i < text_columns else ""
+            parts.append(f"<td{css}>{cell}</td>")
+        parts.append("</tr>")
+    parts.append("</table>")
+    return "".join(parts)
+
+
+def svg_chart(series, title, x_label, y_label, lines=True, log_x=False,
+              width=640, height=400):
+    """
+    Draw a line or scatter chart as SVG.
+
+    :param series: Dictionary mapping labels to lists of (x, y) points.
+    :param title: Title of the chart.
+    :param x_label: Label of the x axis.
+    :param y_label: Label of the y axis.
+    :param lines: Whether the points of a series are connected.
+    :param log_x: Whether the x axis is logarithmic with base 2.
+    :param width: Width of the chart in pixels.
+    :param height: Height of the chart in pixels.
+    :return: The chart as an SVG element.
+    """
+    def x_value(x):
+        return math.log2(x) if log_x else x
+
+    points = [(x_value(x), y) for values in series.values()
+              for x, y in values if y is not None and (x > 0 or not log_x)]
+    if not points:
+        return ""
+    left, right, top, bottom = 70, 20, 30, 50
+    x_min = min(x for x, _ in points)
+    x_max = max(x for x, _ in points)
+    y_min = min(0.0, min(y for _, y in points))
+    y_max = max(y for _, y in points)
+    x_span = (x_max - x_min) or 1.0
+    y_span = (y_max - y_min) or 1.0
+
+    def position(x, y):
+        return (left + (x_value(x) - x_min) / x_span *
+                (width - left - right),
+                height - bottom - (y - y_min) / y_span *
+                (height - top - bottom))
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+             f'height="{height}">',
+             f'<text x="{width / 2}" y="18" text-anchor="middle" '
+             f'font-weight="bold">{html.escape(title)}</text>',
+             f'<line x1="{left}" y1="{height - bottom}" x2="{width - right}" '
+             f'y2="{height - bottom}" stroke="#000"/>',
+             f'<line x1="{left}" y1="{top}" x2="{left}" '
+             f'y2="{height - bottom}" stroke="#000"/>']
+    for i in range(5):
+        y = y_min + y_span * i / 4
+        y_pos = height - bottom - i / 4 * (height - top - bottom)
+        parts.append(f'<text x="{left - 5}" y="{y_pos + 4:.1f}" '
+                     f'text-anchor="end">{y:.3g}</text>')
+        x = x_min + x_span * i / 4
+        x_pos = left + i / 4 * (width - left - right)
+        label = 2 ** x if log_x else x
+        parts.append(f'<text x="{x_pos:.1f}" y="{height - bottom + 15}" '
+                     f'text-anchor="middle">{label:.3g}</text>')
+    parts.append(f'<text x="{width / 2}" y="{height - 10}" '
+                 f'text-anchor="middle">{html.escape(x_label)}</text>')
+    parts.append(f'<text x="15" y="{height / 2}" text-anchor="middle" '
+                 f'transform="rotate(-90 15 {height / 2})">'
+                 f'{html.escape(y_label)}</text>')
+
+    for i, (label, values) in enumerate(series.items()):
+        color = COLORS[i % len(COLORS)]
+        coordinates = [position(x, y) for x, y in sorted(values)
+                       if y is not None and (x > 0 or not log_x)]
+        if lines and len(coordinates) > 1:
+            path = " ".join(f"{x:.1f},{y:.1f}" for x, y in coordinates)
+            parts.append(f'<polyline points="{path}" fill="none" '
+                         f'stroke="{color}"/>')
+        parts.extend(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" '
+                     f'fill="{color}"/>' for x, y in coordinates)
+        parts.append(f'<text x="{width - right - 5}" y="{top + 14 * i}" '
+                     f'text-anchor="end" fill="{color}">'
+                     f'{html.escape(str(label))}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def _mean(statistics, metric):
+    """
+    Get the mean of a metric from the statistics of a run.
+
+    :param statistics: The statistics of the run, or None.
+    :param metric: Name of the metric.
+    :return: The mean, or None if the metric was not measured.
+    """
+    values = (statistics or {}).get(metric)
+    return None if values is None else values["mean"]
+
+
+def runs_section(runs, root):
+    """
+    Create the comparison table and the charts of the runs.
+
+    :param runs: Runs, as found by find_summaries.
+    :param root: Directory the paths of the runs are shown relative to.
+    :return: The section as HTML.
+    """
+    headers = ["Run"] + list(CONFIG_KEYS) + \
+        [f"{metric} ({unit})" for metric, unit in METRICS] + \
+        ["95% CI duration (s)", "data/energy (kB/J)"]
+    rows = []
+    energy_bandwidth = {}
+    energy_duration = {}
+    for run in sorted(runs, key=lambda run: (
+            str((run["config"] or {}).get("name")), run["path"])):
+        config = run["config"] or {}
+        statistics = run["statistics"] or {}
+        row = [html.escape(os.path.relpath(run["path"], root))]
+        row += [_format(config.get(key)) for key in CONFIG_KEYS]
+        row += [_format(_mean(statistics, metric)) for metric, _ in METRICS]
+        duration = statistics.get("duration")
+        row.append("" if duration is None else
+                   f"[{duration['ci_low']:.3f}, {duration['ci_high']:.3f}]")
+        alignment = run["alignment"] or {}
+        row.append(_format(alignment.get("data_per_joule")))
+        rows.append(row)
+
+        name = str(config.get("name"))
+        bandwidth = _mean(statistics, "bandwidth")
+        energy = _mean(statistics, "energy")
+        if energy is not None and bandwidth is not None:
+            energy_bandwidth.setdefault(name, []).append((bandwidth, energy))
+        if energy is not None and duration is not None:
+            energy_duration.setdefault(name, []).append(
+                (duration["mean"], energy))
+
+    charts = svg_chart(energy_bandwidth, "Energy and bandwidth per run",
+                       "Bandwidth (kB/s)", "Energy per iteration (J)",
+                       lines=False)
+    charts += svg_chart(energy_duration, "Energy and duration per run",
+                        "Duration per iteration (s)",
+                        "Energy per iteration (J)", lines=False)
+    return (f"<h2>Runs ({len(runs)})</h2>" + charts +
+            _table(headers, rows))
+
+
+def scaling_section(campaigns, root):
+    """
+    Create the scaling curves of the scaling benchmarks.
+
+    :param campaigns: Scaling benchmarks, as found by find_summaries.
+    :param root: Directory the paths are shown relative to.
+    :return: The section as HTML.
+    """
+    if not campaigns:
+        return ""
+    speedup = {}
+    efficiency = {}
+    energy = {}
+    rows = []
+    for campaign in campaigns:
+        label = os.path.relpath(campaign["path"], root)
+        curves = campaign["curves"] or {}
+        for cores, values in sorted(curves.items(), key=lambda x: int(x[0])):
+            cores = int(cores)
+            speedup.setdefault(label, []).append((cores, values["speedup"]))
+            efficiency.setdefault(label, []).append(
+                (cores, values["efficiency"]))
+            energy.setdefault(label, []).append((cores, values["energy"]))
+            rows.append([html.escape(label), _format(cores),
+                         _format(values["duration"]),
+                         _format(values["speedup"], 2),
+                         _format(values["efficiency"], 2),
+                         _format(values["bandwidth"]),
+                         _format(values["energy"])])
+    return ("<h2>Scaling</h2>" +
+            svg_chart(speedup, "Speedup", "Cores", "Speedup", log_x=True) +
+            svg_chart(efficiency, "Parallel efficiency", "Cores",
+                      "Efficiency", log_x=True) +
+            svg_chart(energy, "Energy per iteration", "Cores", "Energy (J)",
+                      log_x=True) +
+            _table(["Benchmark", "Cores", "Duration (s)", "Speedup",
+                    "Efficiency", "Bandwidth (kB/s)", "Energy (J)"], rows))
+
+
+def calibration_section(calibrations, root):
+    """
+    Create the tables of the observer overhead calibrations.
+
+    :param calibrations: Calibrations, as found by find_summaries.
+    :param root: Directory the paths are shown relative to.
+    :return: The section as HTML.
+    """
+    if not calibrations:
+        return ""
+    rows = []
+    for calibration in calibrations:
+        label = os.path.relpath(calibration["path"], root)
+        report = calibration["report"] or {}
+        for variant, metrics in report.get("overhead", {}).items():
+            for metric, overhead in metrics.items():
+                rows.append([
+                    html.escape(label), html.escape(variant),
+                    html.escape(metric),
+                    f"{overhead['overhead'] * 100:+.2f}%",
+                    f"[{overhead['ci_low'] * 100:+.2f}%, "
+                    f"{overhead['ci_high'] * 100:+.2f}%]",
+                    "yes" if overhead["significant"] else "no"])
+        for metric, factor in report.get("correction_factors", {}).items():
+            rows.append([html.escape(label), "correction factor",
+                         html.escape(metric), _format(factor["factor"], 4),
+                         f"[{factor['ci_low']:.4f}, "
+                         f"{factor['ci_high']:.4f}]", ""])
+    return ("<h2>Observer overhead</h2>" +
+            _table(["Calibration", "Variant", "Metric", "Value", "95% CI",
+                    "Significant"], rows, text_columns=3))
+
+
+def generate_report(paths, output):
+    """
+    Create the HTML report of all runs under the given directories.
+
+    :param paths: List of results directories or run directories.
+    :param output: Path to the HTML file.
+    :return: Number of runs in the report.
+    """
+    found = find_summaries(paths)
+    root = os.path.commonpath([os.path.abspath(path) for path in paths])
+    if os.path.isfile(root) or not os.path.isdir(root):
+        root = os.path.dirname(root)
+    for entries in found.values():
+        for entry in entries:
+            entry["path"] = os.path.abspath(entry["path"])
+
+    body = (runs_section(found["runs"], root) +
+            scaling_section(found["scaling"], root) +
+            calibration_section(found["calibration"], root))
+    document = (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        "<title>snnif report</title>"
+        f"<style>{STYLE}</style></head><body>"
+        "<h1>snnif report</h1>"
+        f"<p>Created on {time.strftime('%Y-%m-%d %H:%M:%S')} from "
+        f"{html.escape(', '.join(paths))}.</p>"
+        f"{body}</body></html>")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        f.write(document)
+    return len(found["runs"])
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+run_cache.py
+
+This module stores the results of runs by the inputs that determine them, so
+a configuration that was already measured does not have to be run again. The
+key of a run is a hash of the image digest, the protocol manager that takes
+the measurements, the expanded command, the number of iterations, the
+resource limits and the other settings that change the measurements. Every
+entry is a copy of the results directory of the run.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+# Configuration keys that change the measurements of a run
+KEY_FIELDS = ("name", "run", "iterations", "execfile", "topology", "parties",
+              "hosts_file", "network-profile", "network_profiles", "cpus",
+              "cpuset", "memory", "scaphandre-scope", "max-top", "extra",
+              "extra_files", "log_schema", "mode", "observers")
+
+MANIFEST = "cache_entry.json"
+
+# The protocol manager is copied into the container at run time instead of
+# being built into the image, so its digest is part of the key
+MANAGER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "protocol_manager.py")
+
+
+def file_digest(path):
+    """
+    Compute the SHA-256 digest of a file.
+
+    :param path: Path to the file.
+    :return: The hexadecimal digest.
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_key(config, image_id, power_measurements):
+    """
+    Compute the key of a run.
+
+    :param config: Configuration data.
+    :param image_id: Digest of the Docker image the run uses.
+    :param power_measurements: Whether the power consumption is measured.
+    :return: Tuple of the key and the inputs it was computed from.
+    """
+    inputs = {field: config.get(field) for field in KEY_FIELDS}
+    inputs["image"] = image_id
+    inputs["protocol_manager"] = file_digest(MANAGER_PATH)
+    inputs["power_measurements"] = power_measurements
+    digest = hashlib.sha256(
+        json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+    return digest, inputs
+
+
+def parse_size(size):
+    """
+    Parse a disk budget such as "500m" or "20g".
+
+    :param size: The size as a number of bytes, or a string with a b, k, m
+    or g suffix.
+    :return: The size in bytes.
+    :raises ValueError: If the size cannot be parsed.
+    """
+    if isinstance(size, (int, float)):
+        return int(size)
+    units = {"b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    size = str(size).strip().lower()
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+class RunCache:
+    """
+    A content-addressed store of run results.
+
+    Every entry is a directory named after the key of the run, with a
+    manifest holding the inputs of the run, its size and when it was created
+    and last used. Entries are written to a temporary directory first and
+    renamed when complete, so an interrupted run never leaves a partial
+    entry.
+    """
+
+    def __init__(self, root=None):
+        """
+        Initialize the cache.
+
+        :param root: Directory of the cache, results/cache in the current
+        working directory by default.
+        """
+        self.root = root or os.path.join(os.getcwd(), "results", "cache")
+
+    def _entry(self, key):
+        """
+        Get the directory of an entry.
+
+        :param key: Key of the run.
+        :return: Path to the entry.
+        """
+        return os.path.join(self.root, key)
+
+    def lookup(self, key):
+        """
+        Check whether the results of a run are cached.
+
+        :param key: Key of the run.
+        :return: True if the cache has a complete entry for the key.
+        """
+        return os.path.exists(os.path.join(self._entry(key), MANIFEST))
+
+    def store(self, key, inputs, results_dir):
+        """
+        Store the results of a run.
+
+        :param key: Key of the run.
+        :param inputs: Inputs the key was computed from.
+        :param results_dir: Results directory of the run.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        staging = os.path.join(self.root, f".{key}-{uuid.uuid4().hex[:6]}")
+        shutil.copytree(results_dir, staging, symlinks=True)
+        now = time.time()
+        manifest = {"key": key, "inputs": inputs, "created": now,
+                    "last_used": now, "size": _directory_size(staging)}
+        with open(os.path.join(staging, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=4)
+
+        entry = self._entry(key)
+        if os.path.exists(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another run stored the same key in the meantime
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def restore(self, key, results_dir):
+        """
+        Copy the cached results of a run into a results directory, and mark
+        the entry as used.
+
+        :param key: Key of the run.
+        :param results_dir: Results directory to copy the results into.
+        """
+        entry = self._entry(key)
+        shutil.copytree(entry, results_dir, symlinks=True,
+                        dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns(MANIFEST))
+        manifest = self._manifest(entry)
+        manifest["last_used"] = time.time()
+        with open(os.path.join(entry, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=4)
+
+    def evict(self, max_age=None, max_size=None):
+        """
+        Remove entries that were not used for `max_age` days, and then the
+        least recently used entries until the cache fits in `max_size`.
+
+        :param max_age: Maximum age in days since the last use, or None.
+        :param max_size: Disk budget of the cache in bytes, or None.
+        :return: Number of removed entries.
+        """
+        if not os.path.isdir(self.root):
+            return 0
+
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith("."):
+                # Staging directories of interrupted stores
+                if time.time() - os.path.getmtime(path) > 24 * 3600:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            manifest = self._manifest(path)
+            if manifest is not None:
+                entries.append((manifest["last_used"], manifest["size"],
+                                path))
+        entries.sort()
+
+        removed = 0
+        total = sum(size for _, size, _ in entries)
+        for last_used, size, path in entries:
+            too_old = max_age is not None and \
+                time.time() - last_used > max_age * 24 * 3600
+            too_large = max_size is not None and total > max_size
+            if not too_old and not too_large:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def _manifest(self, entry):
+        """
+        Read the manifest of an entry.
+
+        :param entry: Path to the entry.
+        :return: The manifest, or None if the entry is incomplete.
+        """
+        try:
+            with open(os.path.join(entry, MANIFEST), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def _directory_size(path):
+    """
+    Compute the total size of the files in a directory.
+
+    :param path: Path to the directory.
+    :return: Size in bytes.
+    """
+    size = 0
+    for directory, _, files in os.walk(path):
+        for file in files:
+            file_path = os.path.join(directory, file)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+    return size
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+run_statistics.py
+
+This module aggregates the measurements of the iterations of a run. Besides
+the mean, it reports the median, the tail percentiles, the standard deviation
+and a bootstrap confidence interval of the mean, since a few slow iterations
+are hidden by the mean. All statistics are computed over the iteration axis
+with numpy, so whole time series can be aggregated at once.
+"""
+
+import numpy as np
+
+# Percentiles reported for every metric
+PERCENTILES = (50, 90, 99)
+
+# Percentiles between which the spread of a time series is drawn
+BAND_PERCENTILES = (10, 90)
+
+# Number of bootstrap resamples drawn at once, which bounds the memory of the
+# index matrix to BOOTSTRAP_CHUNK times the number of samples
+BOOTSTRAP_CHUNK = 1000
+
+
+def _resampled_means(rng, samples, resamples):
+    """
+    Compute the means of bootstrap resamples of a set of measurements. The
+    resamples are drawn in chunks of BOOTSTRAP_CHUNK as a matrix of indices,
+    so the means of a chunk are computed in a single vectorized operation.
+
+    :param rng: Numpy random generator.
+    :param samples: One-dimensional array of measurements.
+    :param resamples: Number of bootstrap resamples.
+    :return: Array with the mean of every resample.
+    """
+    means = np.empty(resamples)
+    for start in range(0, resamples, BOOTSTRAP_CHUNK):
+        count = min(BOOTSTRAP_CHUNK, resamples - start)
+        indices = rng.integers(0, samples.size, size=(count, samples.size))
+        means[start:start + count] = samples[indices].mean(axis=1)
+    return means
+
+
+def bootstrap_interval(samples, confidence=0.95, resamples=10000, seed=0):
+    """
+    Estimate a confidence interval of the mean with the percentile bootstrap.
+
+    :param samples: One-dimensional array of measurements.
+    :param confidence: Confidence level of the interval.
+    :param resamples: Number of bootstrap resamples.
+    :param seed: Seed of the random generator, so reports are reproducible.
+    :return: Tuple with the lower and upper bound of the interval.
+    """
+    samples = np.asarray(samples, dtype=float)
+    if samples.size < 2:
+        return float(samples.mean()), float(samples.mean())
+
+    rng = np.random.default_rng(seed)
+    means = _resampled_means(rng, samples, resamples)
+    alpha = (1 - confidence) / 2 * 100
+    low, high = np.percentile(means, [alpha, 100 - alpha])
+    return float(low), float(high)
+
+
+def ratio_interval(numerator, denominator, confidence=0.95, resamples=10000,
+                   seed=0):
+    """
+    Estimate the ratio of the means of two independent sets of measurements
+    and its confidence interval with the percentile bootstrap.
+
+    :param numerator: Measurements whose mean is the numerator.
+    :param denominator: Measurements whose mean is the denominator.
+    :param confidence: Confidence level of the interval.
+    :param resamples: Number of bootstrap resamples.
+    :param seed: Seed of the random generator, so reports are reproducible.
+    :return: Tuple with the ratio and the lower and upper bound of its
+    interval.
+    """
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    ratio = float(numerator.mean() / denominator.mean())
+
+    rng = np.random.default_rng(seed)
+    ratios = (_resampled_means(rng, numerator, resamples) /
+              _resampled_means(rng, denominator, resamples))
+    alpha = (1 - confidence) / 2 * 100
+    low, high = np.percentile(ratios, [alpha, 100 - alpha])
+    return ratio, float(low), float(high)
+
+
+def describe(samples, confidence=0.95, resamples=10000):
+    """
+    Compute the statistics of a metric over the iterations of a run.
+
+    :param samples: The value of the metric for every iteration.
+    :param confidence: Confidence level of the interval of the mean.
+    :param resamples: Number of bootstrap resamples.
+    :return: Dictionary with the count, mean, standard deviation, minimum,
+    maximum, the percentiles in PERCENTILES as `p<n>` (`p50` is the median)
+    and the bounds of the confidence interval of the mean, or None if there
+    are no samples.
+    """
+    samples = np.asarray(samples, dtype=float)
+    if samples.size == 0:
+        return None
+
+    percentiles = np.percentile(samples, PERCENTILES)
+    ci_low, ci_high = bootstrap_interval(samples, confidence, resamples)
+    statistics = {
+        "count": int(samples.size),
+        "mean": float(samples.mean()),
+        "std": float(samples.std(ddof=1)) if samples.size > 1 else 0.0,
+        "min": float(samples.min()),
+        "max": float(samples.max()),
+    }
+    for percentile, value in zip(PERCENTILES, percentiles):
+        statistics[f"p{percentile}"] = float(value)
+    statistics["ci_low"] = ci_low
+    statistics["ci_high"] = ci_high
+    statistics["confidence"] = confidence
+    return statistics
+
+
+def describe_series(series):
+    """
+    Compute the pointwise statistics of a time series that was measured in
+    every iteration and resampled to common timestamps.
+
+    :param series: Two-dimensional array, with one row per iteration.
+    :return: Dictionary with the pointwise mean, median and the lower and
+    upper band in BAND_PERCENTILES, each an array with one value per
+    timestamp.
+    """
+    series = np.asarray(series, dtype=float)
+    low, median, high = np.percentile(
+        series, [BAND_PERCENTILES[0], 50, BAND_PERCENTILES[1]], axis=0)
+    return {"mean": series.mean(axis=0), "median": median,
+            "low": low, "high": high}
+
+
+def print_statistics(statistics, units):
+    """
+    Print the statistics of the metrics of a run.
+
+    :param statistics: Dictionary mapping metric names to the result of
+    describe.
+    :param units: Dictionary mapping metric names to their unit.
+    """
+    print("== Statistics over iterations ==")
+    for metric, values in statistics.items():
+        if values is None:
+            continue
+        unit = units.get(metric, "")
+        print(f"{metric} ({unit}), {values['count']} iteration(s):")
+        print(f"  mean {values['mean']:.3f} "
+              f"[{values['ci_low']:.3f}, {values['ci_high']:.3f}] "
+              f"({values['confidence'] * 100:.0f}% CI), "
+              f"std {values['std']:.3f}")
+        print("  " + ", ".join(
+            f"p{percentile} {values[f'p{percentile}']:.3f}"
+            for percentile in PERCENTILES))
+    print()
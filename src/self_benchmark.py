@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+self_benchmark.py
+
+This module benchmarks the processing of snnif itself, without Docker or a
+network. Synthetic nethogs output, Scaphandre JSON streams and FALCON and
+CrypTen logs are generated at a configurable size, and the parsers, the
+resampling and the figure generation are timed on them. The duration,
+throughput and peak memory of every step are stored in a history of their
+own, so slower or more memory hungry post-processing is flagged like a
+slower protocol.
+"""
+
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import extra_plugins
+from benchmark_suite import HistoryDatabase, detect_regressions
+from data_processor import DataProcessor
+
+# Sizes of the generated runs: the number of iterations, nethogs samples per
+# iteration, parties and lines per log file
+SIZES = {
+    "small": {"iterations": 5, "samples": 200, "parties": 3,
+              "log_lines": 2000},
+    "medium": {"iterations": 20, "samples": 2000, "parties": 3,
+               "log_lines": 50000},
+    "large": {"iterations": 50, "samples": 10000, "parties": 3,
+              "log_lines": 500000},
+}
+
+# Steps that are benchmarked, in the order they are run
+CASES = ("parse_nethogs", "parse_scaphandre", "nethogs_averages", "figures",
+         "falcon_logs", "crypten_logs")
+
+EXECFILE = "Falcon.out"
+
+# Time between nethogs samples, and between Scaphandre samples, in seconds
+NETHOGS_DELAY = 0.01
+SCAPHANDRE_DELAY = 0.05
+
+# Minimum time of every timed sample in seconds. Fast steps are run several
+# times per sample, so scheduler noise does not dominate their duration.
+MIN_SAMPLE_TIME = 0.2
+
+# Number of runs of which the lowest peak memory is taken
+MEMORY_REPEATS = 3
+
+# Metrics for which a higher value is a regression. The throughput is derived
+# from the duration, so it is not checked separately.
+REGRESSION_METRICS = ("duration", "peak_memory")
+
+# Duration in seconds below which the duration of a case is not checked for
+# regressions. The duration of such short steps varies by tens of percents
+# between processes, with the state of the caches and the CPU frequency, so
+# they are only checked at the larger sizes.
+MIN_CHECKED_DURATION = 0.05
+
+# Number of earlier runs needed before a case is checked for regressions. The
+# samples of a single run vary less than separate runs do, so the spread
+# between runs has to be known first.
+MIN_BASELINE_RUNS = 3
+
+# History database of the processing benchmarks, kept apart from the history
+# of the protocol benchmarks
+HISTORY_PATH = "self_benchmark_history.sqlite"
+
+
+def generate_nethogs(path, samples, parties, rng):
+    """
+    Write a nethogs trace file with cumulative data amounts. The parties
+    communicate in bursts during the first half of the iteration and are
+    idle afterwards, like a protocol that ends with local computation.
+
+    :param path: Path to the output file.
+    :param samples: Number of refreshes.
+    :param parties: Number of parties.
+    :param rng: Numpy random generator.
+    :return: Number of party samples written.
+    """
+    active = rng.random((samples, parties)) < 0.3
+    active[samples // 2:] = False
+    sent = np.cumsum(active * rng.random((samples, parties)) * 50, axis=0)
+    received = np.cumsum(active * rng.random((samples, parties)) * 50, axis=0)
+    with open(path, "w") as f:
+        for sample in range(samples):
+            f.write("Refreshing:\n")
+            for party in range(parties):
+                f.write(f"./{EXECFILE}/{1000 + party}/0\t"
+                        f"{sent[sample, party]:.3f}\t"
+                        f"{received[sample, party]:.3f}\n")
+            f.write("unknown TCP/0/0\t0\t0\n")
+    return samples * parties
+
+
+def generate_scaphandre(path, iteration_times, parties, rng):
+    """
+    Write a Scaphandre JSON stream for the given iterations. Every iteration
+    starts with the new nethogs process, which is how the data processor
+    splits the stream into iterations.
+
+    :param path: Path to the output file.
+    :param iteration_times: List of tuples of the start and stop time of
+    every iteration.
+    :param parties: Number of parties.
+    :param rng: Numpy random generator.
+    :return: Number of consumer samples written.
+    """
+    consumers = 0
+    with open(path, "w") as f:
+        for i, (start, stop) in enumerate(iteration_times):
+            timestamps = np.arange(start, stop, SCAPHANDRE_DELAY)
+            power = 5 + rng.random((len(timestamps), parties)) * 10
+            for j, timestamp in enumerate(timestamps):
+                entries = [{"exe": "/usr/sbin/nethogs", "pid": 500 + i,
+                            "container": {"name": "snnif"},
+                            "timestamp": float(timestamp),
+                            "consumption": 0.1}]
+                entries += [{"exe": f"/root/{EXECFILE}",
+                             "pid": 1000 + i * parties + party,
+                             "container": {"name": "snnif"},
+                             "timestamp": float(timestamp),
+                             "consumption": float(power[j, party])}
+                            for party in range(parties)]
+                consumers += len(entries)
+                f.write(json.dumps({"host": {"consumption": 100.0},
+                                    "consumers": entries}))
+    return consumers
+
+
+def generate_falcon_logs(directory, lines, parties, rng):
+    """
+    Write the party logs of a FALCON run, with the lines of the log schema
+    of FALCON among unrelated output.
+
+    :param directory: Directory of the log files.
+    :param lines: Number of lines per log file.
+    :param parties: Number of parties.
+    :param rng: Numpy random generator.
+    :return: List of the file names.
+    """
+    files = []
+    for party in range(parties):
+        file = f"P{party}.txt"
+        values = rng.random((lines, 2)) * 100
+        with open(os.path.join(directory, file), "w") as f:
+            for line in range(lines):
+                a, b = values[line]
+                kind = line % 8
+                if kind == 0:
+                    f.write(f"Wall Clock time for MiniONN: {a:.4f} sec\n")
+                elif kind == 1:
+                    f.write(f"CPU time for MiniONN: {b:.4f} sec\n")
+                elif kind == 2:
+                    f.write(f"Total communication: {a:.3f}MB (sent) and "
+                            f"{b:.3f}MB (recv)\n")
+                elif kind == 3:
+                    f.write(f"Total calls: {int(a)} (sends) and {int(b)} "
+                            "(recvs)\n")
+                elif kind == 4:
+                    f.write(f"Communication, MiniONN, P{party}: {a:.3f}MB "
+                            f"(sent) {b:.3f}MB (recv)\n")
+                elif kind == 5:
+                    f.write(f"Rounds, MiniONN, P{party}: {int(a)}(sends) "
+                            f"{int(b)}(recvs)\n")
+                else:
+                    f.write(f"Forward {line} layer completed in {a:.2f} "
+                            "ms\n")
+        files.append(file)
+    return files
+
+
+def generate_crypten_log(path, lines, rng):
+    """
+    Write a CrypTen training log with training and test lines.
+
+    :param path: Path to the log file.
+    :param lines: Number of lines.
+    :param rng: Numpy random generator.
+    """
+    values = rng.random((lines, 3)) * 100
+    with open(path, "w") as f:
+        for line in range(lines):
+            loss, prec1, prec5 = values[line]
+            statistics_part = (f"Loss {loss / 50:.4f} ({loss / 50:.4f})\t"
+                               f"Prec@1 {prec1:.3f} ({prec1:.3f})\t"
+                               f"Prec@5 {prec5:.3f} ({prec5:.3f})")
+            if line % 5 == 4:
+                f.write(f"Test: [{line % 40}/40]\tTime 0.050 (0.050)\t"
+                        f"{statistics_part}\n")
+            else:
+                f.write(f"Epoch: [{line // 1000}][{line % 1000}/1000]\t"
+                        f"Time 0.100 (0.100)\tData 0.010 (0.010)\t"
+                        f"{statistics_part}\n")
+
+
+def generate_run(directory, iterations, samples, parties, log_lines,
+                 seed=0):
+    """
+    Generate the results directory of a synthetic run.
+
+    :param directory: The results directory.
+    :param iterations: Number of iterations.
+    :param samples: Number of nethogs samples per iteration.
+    :param parties: Number of parties.
+    :param log_lines: Number of lines per log file.
+    :param seed: Seed of the random generator.
+    :return: Tuple of the configuration of the run and a dictionary with,
+    for every case, the size of its input in bytes and its number of samples.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    nethogs_samples = 0
+    iteration_times = []
+    start = 1700000000.0
+    with open(os.path.join(directory, "time.txt"), "w") as f:
+        for i in range(iterations):
+            nethogs_samples += generate_nethogs(
+                os.path.join(directory, f"nethogs_{i}.txt"), samples,
+                parties, rng)
+            duration = samples * NETHOGS_DELAY
+            stop = start + duration
+            f.write(f"nethogs_{i}: {duration + 1}\n")
+            f.write(f"iteration_duration_{i}: {duration}\n")
+            f.write(f"iteration_start_{i}: {start}\n")
+            f.write(f"iteration_stop_{i}: {stop}\n")
+            iteration_times.append((start, stop))
+            start = stop + 2
+    power_samples = generate_scaphandre(
+        os.path.join(directory, "scaphandre.json"), iteration_times, parties,
+        rng)
+    falcon_files = generate_falcon_logs(directory, log_lines, parties, rng)
+    generate_crypten_log(os.path.join(directory, "crypten.txt"), log_lines,
+                         rng)
+
+    protocols = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "protocols")
+    schemas = {}
+    for name in ("falcon", "crypten"):
+        with open(os.path.join(protocols, name, "config.json"), "r") as f:
+            schemas[name] = json.load(f)["log_schema"]
+
+    config = {"name": "self-benchmark", "execfile": EXECFILE,
+              "iterations": iterations, "results": directory,
+              "target_delay": NETHOGS_DELAY, "schemas": schemas,
+              "falcon_files": falcon_files}
+
+    def size(*files):
+        return sum(os.path.getsize(os.path.join(directory, file))
+                   for file in files)
+
+    nethogs_files = [f"nethogs_{i}.txt" for i in range(iterations)]
+    inputs = {
+        "parse_nethogs": (size(*nethogs_files), nethogs_samples),
+        "parse_scaphandre": (size("scaphandre.json"), power_samples),
+        "nethogs_averages": (size(*nethogs_files), nethogs_samples),
+        "figures": (size("scaphandre.json", *nethogs_files),
+                    nethogs_samples + power_samples),
+        "falcon_logs": (size(*falcon_files), log_lines * parties),
+        "crypten_logs": (size("crypten.txt"), log_lines),
+    }
+    return config, inputs
+
+
+def _prepare(case, config):
+    """
+    Prepare a case, so that only the benchmarked step is timed.
+
+    :param case: Name of the case.
+    :param config: Configuration of the synthetic run.
+    :return: Function running the step.
+    """
+    processor = DataProcessor(config)
+    if case == "parse_nethogs":
+        return processor._parse_nethogs
+    if case == "parse_scaphandre":
+        return processor._parse_scaphandre
+    if case == "nethogs_averages":
+        processor._parse_nethogs()
+        return processor._nethogs_averages
+    if case == "figures":
+        def figures():
+            import matplotlib.pyplot as plt
+
+            processor.nethogs_graphs()
+            processor.scaphandre_graphs()
+            plt.close("all")
+        return figures
+
+    schema = config["schemas"]["falcon" if case == "falcon_logs"
+                               else "crypten"]
+    files = config["falcon_files"] if case == "falcon_logs" \
+        else ["crypten.txt"]
+    log_config = dict(config, log_schema=schema)
+    return lambda: extra_plugins.parse_logs(log_config, files)
+
+
+def _time(case, config, number):
+    """
+    Time a number of runs of a case. Every run is prepared in advance, so
+    only the benchmarked steps are timed.
+
+    :param case: Name of the case.
+    :param config: Configuration of the synthetic run.
+    :param number: Number of runs.
+    :return: Average duration of a run in seconds.
+    """
+    steps = [_prepare(case, config) for _ in range(number)]
+    start = time.perf_counter()
+    for step in steps:
+        step()
+    return (time.perf_counter() - start) / number
+
+
+def measure(case, config, repeats):
+    """
+    Time a case and measure its peak memory. Like timeit.Timer.autorange,
+    the number of runs per sample is increased until a sample takes at least
+    MIN_SAMPLE_TIME. The peak memory is measured in separate runs, since
+    tracing the allocations slows down the step, and the lowest peak is
+    taken, since caches that are filled in the first runs add to it.
+
+    :param case: Name of the case.
+    :param config: Configuration of the synthetic run.
+    :param repeats: Number of timed samples.
+    :return: Tuple of the list of average durations of a run in seconds,
+    one for every sample, and the peak memory in bytes.
+    """
+    base = 1
+    while True:
+        for number in (base, base * 2, base * 5):
+            duration = _time(case, config, number)
+            if duration * number >= MIN_SAMPLE_TIME:
+                break
+        else:
+            base *= 10
+            continue
+        break
+
+    durations = [duration] + [_time(case, config, number)
+                              for _ in range(repeats - 1)]
+
+    peaks = []
+    for _ in range(MEMORY_REPEATS):
+        step = _prepare(case, config)
+        tracemalloc.start()
+        try:
+            step()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return durations, min(peaks)
+
+
+def run_benchmarks(size="small", history_path=None, repeats=10,
+                   threshold=3.0, tolerance=0.2, baseline_size=10):
+    """
+    Generate a synthetic run and benchmark every case on it. The results are
+    compared against the earlier results for the same size and stored in the
+    history database.
+
+    :param size: Name of the size in SIZES.
+    :param history_path: Path to the history database, or None to not
+    store the results.
+    :param repeats: Number of timed samples of every case.
+    :param threshold: Number of standard deviations that is tolerated.
+    :param tolerance: Relative increase that is tolerated. The processing
+    shares the host with other processes, so this is looser than for the
+    protocol benchmarks.
+    :param baseline_size: Number of earlier runs in the baseline.
+    :return: Dictionary mapping cases to their regressions.
+    """
+    # The figures are only written to files, so no display is needed
+    import matplotlib
+    matplotlib.use("Agg")
+
+    parameters = SIZES[size]
+    history = HistoryDatabase(history_path) if history_path else None
+    all_regressions = {}
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Generating a {size} synthetic run...")
+        config, inputs = generate_run(directory, **parameters)
+
+        print(f"== Processing benchmark ({size}) ==")
+        print(f"{'case':<18}{'best (s)':>12}{'MB/s':>10}"
+              f"{'samples/s':>14}{'peak (MB)':>11}")
+        try:
+            for case in CASES:
+                durations, peak = measure(case, config, repeats)
+                # The fastest sample is the least disturbed by other
+                # processes
+                best = min(durations)
+                size_bytes, samples = inputs[case]
+                summary = {
+                    "duration": best,
+                    "throughput": size_bytes / best / 1e6,
+                    "samples_per_second": samples / best,
+                    "peak_memory": peak,
+                    # The spread of the baseline is taken from the best
+                    # duration of every run, since the slower samples of a
+                    # run mostly measure the noise of the host
+                    "iterations": {"duration": [best],
+                                   "peak_memory": [peak]},
+                    "samples": durations,
+                }
+                print(f"{case:<18}{best:>12.4f}"
+                      f"{summary['throughput']:>10.2f}"
+                      f"{summary['samples_per_second']:>14.0f}"
+                      f"{peak / 1e6:>11.1f}")
+                if history is None:
+                    continue
+
+                benchmark = f"self-benchmark:{size}:{case}"
+                baseline = history.baseline(benchmark, baseline_size)
+                metrics = [metric for metric in REGRESSION_METRICS
+                           if metric != "duration" or
+                           best >= MIN_CHECKED_DURATION]
+                if len(baseline) >= MIN_BASELINE_RUNS:
+                    regressions = detect_regressions(summary, baseline,
+                                                     threshold, tolerance,
+                                                     metrics)
+                    if regressions:
+                        all_regressions[case] = regressions
+                history.record(benchmark, {"name": case, "run": size,
+                                           "iterations": repeats}, summary)
+        finally:
+            if history is not None:
+                history.close()
+    print()
+
+    if history is not None and len(baseline) < MIN_BASELINE_RUNS:
+        print(f"Only {len(baseline)} earlier run(s), regressions are checked "
+              f"from {MIN_BASELINE_RUNS} earlier runs on")
+    for case, regressions in all_regressions.items():
+        for metric, description in regressions.items():
+            print(f"Regression in '{case}' {metric}: {description}")
+    return all_regressions
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+time_alignment.py
+
+This module places the network, power and CPU measurements of a run on one
+time axis and joins them in fixed time windows, for example to compute the
+data sent per joule or the correlation between bandwidth and power. The
+measurements are converted once into binary timelines that are memory-mapped,
+so a run is processed one iteration at a time and never has to fit in
+memory.
+"""
+
+import json
+import os
+
+import numpy as np
+
+import checkpoint
+
+# Number of rows that are buffered before they are written to a timeline
+CHUNK_ROWS = 65536
+
+# Columns of the windows file
+WINDOW_COLUMNS = ("iteration", "offset", "data", "energy", "cpu")
+
+# Pairs of windowed rates whose correlation is reported
+CORRELATIONS = (("bandwidth", "power"), ("cpu", "power"),
+                ("bandwidth", "cpu"))
+
+
+def write_timeline(path, chunks, width):
+    """
+    Write a timeline to a binary file, one chunk of rows at a time.
+
+    :param path: Path to the timeline file.
+    :param chunks: Iterable of two-dimensional arrays with `width` columns,
+    the first column being the timestamp.
+    :param width: Number of columns.
+    :return: Number of rows written.
+    """
+    rows = 0
+    with open(path, "wb") as f:
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.float64).reshape(-1, width)
+            f.write(chunk.tobytes())
+            rows += len(chunk)
+    return rows
+
+
+def load_timeline(path, width):
+    """
+    Memory-map a timeline written by write_timeline.
+
+    :param path: Path to the timeline file.
+    :param width: Number of columns.
+    :return: Read-only two-dimensional array backed by the file.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty((0, width))
+    return np.memmap(path, dtype=np.float64, mode="r").reshape(-1, width)
+
+
+def between(timeline, start, stop):
+    """
+    Get the rows of a timeline within a time range, and the rows just before
+    and after it, so values can be interpolated at its bounds. The rows are
+    found with a binary search, so only the pages of the range are read.
+
+    :param timeline: Timeline sorted by its first column.
+    :param start: Start of the range.
+    :param stop: End of the range.
+    :return: The rows, copied into memory.
+    """
+    first, last = np.searchsorted(timeline[:, 0], [start, stop])
+    return np.array(timeline[max(first - 1, 0):last + 1])
+
+
+def cumulative_integral(timestamps, values):
+    """
+    Integrate a sampled rate over time with the trapezoidal rule.
+
+    :param timestamps: Sample times.
+    :param values: Rate at every sample time.
+    :return: The integral from the first sample up to every sample.
+    """
+    if len(timestamps) < 2:
+        return np.zeros(len(timestamps))
+    areas = np.diff(timestamps) * (values[1:] + values[:-1]) / 2
+    return np.concatenate([[0.0], np.cumsum(areas)])
+
+
+def window_sums(timestamps, cumulative, edges):
+    """
+    Compute the increase of a cumulative series within every window.
+
+    :param timestamps: Sample times of the cumulative series.
+    :param cumulative: The cumulative series.
+    :param edges: Bounds of the windows.
+    :return: The increase within every window.
+    """
+    if len(timestamps) == 0:
+        return np.zeros(len(edges) - 1)
+    return np.diff(np.interp(edges, timestamps, cumulative))
+
+
+class TimeAligner:
+    """
+    Aligns the measurements of a run on the clock of the host.
+
+    The nethogs output, the Scaphandre stream and the resource samples are
+    streamed into timelines in the timeline directory of the run: the
+    cumulative data sent per container, the power of the protocol processes
+    and the CPU utilization per process. Nethogs does not timestamp its
+    output, so its samples are spread evenly over the time it ran, and the
+    times measured in the containers are shifted by the clock offset in
+    timing.json.
+    """
+
+    def __init__(self, config, window=0.1):
+        """
+        Initialize the aligner.
+
+        :param config: Configuration data, with the results directory set.
+        :param window: Length of the join windows in seconds.
+        """
+        self._config = config
+        self._execfile = config.get("execfile", "")
+        self._window = window
+        self._results_dir = config["results"]
+        self._directory = os.path.join(self._results_dir, "timeline")
+        self._containers = checkpoint.party_dirs(config)
+        self._clock_offset = 0.0
+        try:
+            with open(os.path.join(self._results_dir, "timing.json"),
+                      "r") as f:
+                self._clock_offset = json.load(f).get("clock_offset", 0.0)
+        except (OSError, ValueError):
+            pass
+
+    def build(self):
+        """
+        Write the timelines of the run.
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        for container, directory in enumerate(self._containers):
+            times = self._times(directory)
+            write_timeline(self._path(f"network_{container}"),
+                           self._network_chunks(directory, times), 2)
+            write_timeline(self._path(f"cpu_{container}"),
+                           self._cpu_chunks(directory), 3)
+        write_timeline(self._path("power"), self._power_chunks(), 2)
+
+    def join(self):
+        """
+        Join the timelines in windows over every iteration. The windows are
+        written to windows.bin in the timeline directory, with the columns in
+        WINDOW_COLUMNS, and the correlations are computed from running sums,
+        so only one iteration is in memory at a time.
+
+        :return: Dictionary with the window length, the data sent per joule
+        of the run and of every iteration, and the correlations in
+        CORRELATIONS.
+        """
+        networks = [load_timeline(self._path(f"network_{container}"), 2)
+                    for container in range(len(self._containers))]
+        cpus = [load_timeline(self._path(f"cpu_{container}"), 3)
+                for container in range(len(self._containers))]
+        power = load_timeline(self._path("power"), 2)
+
+        totals = {"data": 0.0, "energy": 0.0}
+        per_iteration = {}
+        sums = {}
+
+        def windows():
+            for iteration, (start, stop, _) in sorted(
+                    self._times(self._results_dir).items()):
+                # The windows are stretched slightly, so that they end at the
+                # end of the iteration
+                count = max(int(round((stop - start) / self._window)), 1)
+                edges = np.linspace(start, stop, count + 1)
+                widths = np.diff(edges)
+                data = sum(window_sums(rows[:, 0], rows[:, 1], edges)
+                           for rows in (between(network, start, stop)
+                                        for network in networks))
+                rows = between(power, start, stop)
+                energy = window_sums(rows[:, 0], cumulative_integral(
+                    rows[:, 0], rows[:, 1]), edges)
+                cpu = np.zeros(len(edges) - 1)
+                for timeline in cpus:
+                    rows = between(timeline, start, stop)
+                    for pid in np.unique(rows[:, 1]):
+                        samples = rows[rows[:, 1] == pid]
+                        cpu += window_sums(
+                            samples[:, 0], cumulative_integral(
+                                samples[:, 0], samples[:, 2]), edges)
+
+                totals["data"] += float(data.sum())
+                totals["energy"] += float(energy.sum())
+                if energy.sum() > 0:
+                    per_iteration[iteration] = float(data.sum() /
+                                                     energy.sum())
+                self._accumulate(sums, {"bandwidth": data / widths,
+                                        "power": energy / widths,
+                                        "cpu": cpu / widths})
+                yield np.column_stack([
+                    np.full(len(data), iteration), edges[:-1] - start, data,
+                    energy, cpu])
+
+        write_timeline(self._path("windows"), windows(),
+                       len(WINDOW_COLUMNS))
+        return {
+            "window": self._window,
+            "data_per_joule": (totals["data"] / totals["energy"]
+                               if totals["energy"] > 0 else None),
+            "iterations": per_iteration,
+            "correlations": {f"{x}_{y}": self._correlation(sums, x, y)
+                             for x, y in CORRELATIONS},
+        }
+
+    def windows(self):
+        """
+        Memory-map the windows written by join.
+
+        :return: Array with the columns in WINDOW_COLUMNS.
+        """
+        return load_timeline(self._path("windows"), len(WINDOW_COLUMNS))
+
+    def report(self):
+        """
+        Build the timelines, join them, print the result and store it in
+        alignment.json in the results directory.
+        """
+        self.build()
+        result = self.join()
+        print(f"== Time alignment ({self._window} s windows) ==")
+        if result["data_per_joule"] is not None:
+            print(f"Data sent per joule: {result['data_per_joule']:.3f} kB/J")
+        for name, value in result["correlations"].items():
+            if value is not None:
+                x, y = name.split("_")
+                print(f"Correlation of {x} and {y}: {value:.3f}")
+        print()
+        with open(os.path.join(self._results_dir, "alignment.json"),
+                  "w") as f:
+            json.dump(result, f, indent=4)
+
+    def _path(self, name):
+        """
+        Get the path of a timeline.
+
+        :param name: Name of the timeline.
+        :return: Path to the timeline file.
+        """
+        return os.path.join(self._directory, f"{name}.bin")
+
+    def _times(self, directory):
+        """
+        Read the start and stop times of the iterations from time.txt, and
+        the time nethogs ran, on the clock of the host.
+
+        :param directory: Directory of time.txt.
+        :return: Dictionary mapping iteration indices to a tuple of the start
+        and stop time and the time nethogs stopped, which is None if it is
+        unknown.
+        """
+        times = {}
+        try:
+            with open(os.path.join(directory, "time.txt"), "r") as f:
+                for line in f:
+                    match = checkpoint.TIME_LINE.match(line)
+                    if match is None:
+                        continue
+                    key, run = match.group(1), int(match.group(2))
+                    value = float(line.partition(":")[2])
+                    times.setdefault(run, {})[key] = value
+        except OSError:
+            return {}
+
+        aligned = {}
+        for run, values in times.items():
+            if "iteration_start" not in values or \
+                    "iteration_stop" not in values:
+                continue
+            start = values["iteration_start"] - self._clock_offset
+            stop = values["iteration_stop"] - self._clock_offset
+            aligned[run] = (start, stop, start + values["nethogs"]
+                            if "nethogs" in values else None)
+        return aligned
+
+    def _network_chunks(self, directory, times):
+        """
+        Stream the nethogs output of a container as rows of the sample time
+        and the data sent by all parties so far, in kB.
+
+        :param directory: Directory of the nethogs output.
+        :param times: Iteration times, as returned by _times.
+        :return: Generator of arrays with two columns.
+        """
+        prefixes = (f"./{self._execfile}", f"/{self._execfile}")
+        for run, run_times in sorted(times.items()):
+            path = os.path.join(directory, f"nethogs_{run}.txt")
+            if run_times[2] is None or not os.path.exists(path):
+                continue
+
+            refreshes = 0
+            with open(path, "r") as f:
+                for line in f:
+                    if line.startswith("Refreshing"):
+                        refreshes += 1
+            if refreshes == 0:
+                continue
+            start, delay = run_times[0], (run_times[2] - run_times[0]) / \
+                refreshes
+
+            rows = []
+            sent = {}
+            sample = -1
+            with open(path, "r") as f:
+                for line in f:
+                    if line.startswith(prefixes):
+                        parts = line.split()
+                        if len(parts) >= 3:
+                            sent[parts[0]] = float(parts[1])
+                    elif line.startswith("Refreshing"):
+                        if sample >= 0:
+                            rows.append((start + sample * delay,
+                                         sum(sent.values())))
+                        if len(rows) >= CHUNK_ROWS:
+                            yield rows
+                            rows = []
+                        sample += 1
+            if sample >= 0:
+                rows.append((start + sample * delay, sum(sent.values())))
+            yield rows
+
+    def _cpu_chunks(self, directory):
+        """
+        Stream the resource samples of a container as rows of the sample
+        time, the process id and the number of cores in use.
+
+        :param directory: Directory of the resource samples.
+        :return: Generator of arrays with three columns.
+        """
+        for run in sorted(self._times(directory)):
+            path = os.path.join(directory, f"resources_{run}.txt")
+            if not os.path.exists(path):
+                continue
+            rows = []
+            with open(path, "r") as f:
+                header = f.readline().split()
+                if "timestamp" not in header:
+                    continue
+                columns = [header.index(name) for name in
+                           ("timestamp", "pid", "cpu_percent")]
+                for line in f:
+                    fields = line.split()
+                    timestamp, pid, cpu_percent = (float(fields[i])
+                                                   for i in columns)
+                    rows.append((timestamp - self._clock_offset, pid,
+                                 cpu_percent / 100))
+                    if len(rows) >= CHUNK_ROWS:
+                        yield sorted(rows)
+                        rows = []
+            yield sorted(rows)
+
+    def _power_chunks(self):
+        """
+        Stream the Scaphandre output as rows of the sample time and the
+        total power of the protocol processes. The objects are decoded one
+        after another from a buffer that is refilled in blocks.
+
+        :return: Generator of arrays with two columns.
+        """
+        path = os.path.join(self._results_dir, "scaphandre.json")
+        if not os.path.exists(path):
+            return
+        decoder = json.JSONDecoder()
+        execfile = self._execfile.lower()
+        rows = []
+        buffer = ""
+        with open(path, "r") as f:
+            while True:
+                block = f.read(1 << 20)
+                buffer += block
+                position = 0
+                while True:
+                    position = buffer.find("{", position)
+                    if position < 0:
+                        buffer = ""
+                        break
+                    try:
+                        obj, end = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        # An incomplete object is completed by the next block
+                        buffer = buffer[position:]
+                        break
+                    position = end
+                    consumers = [consumer for consumer in obj.get(
+                        "consumers", []) if consumer.get("container")
+                        is not None and execfile in consumer["exe"].lower()]
+                    if consumers:
+                        rows.append((consumers[0]["timestamp"],
+                                     sum(consumer["consumption"]
+                                         for consumer in consumers)))
+                if len(rows) >= CHUNK_ROWS:
+                    yield rows
+                    rows = []
+                if not block:
+                    break
+        yield rows
+
+    def _accumulate(self, sums, rates):
+        """
+        Add the windowed rates of an iteration to the running sums of the
+        correlations.
+
+        :param sums: Dictionary of running sums, updated in place.
+        :param rates: Dictionary mapping rate names to arrays.
+        """
+        sums["n"] = sums.get("n", 0) + len(rates["power"])
+        for name, values in rates.items():
+            sums[name] = sums.get(name, 0.0) + float(values.sum())
+            sums[f"{name}^2"] = sums.get(f"{name}^2", 0.0) + \
+                float((values ** 2).sum())
+        for x, y in CORRELATIONS:
+            sums[f"{x}*{y}"] = sums.get(f"{x}*{y}", 0.0) + \
+                float((rates[x] * rates[y]).sum())
+
+    def _correlation(self, sums, x, y):
+        """
+        Compute the Pearson correlation of two rates from the running sums.
+
+        :param sums: Dictionary of running sums.
+        :param x: Name of the first rate.
+        :param y: Name of the second rate.
+        :return: The correlation, or None if either rate is constant.
+        """
+        n = sums.get("n", 0)
+        if n < 2:
+            return None
+        covariance = sums[f"{x}*{y}"] - sums[x] * sums[y] / n
+        variance_x = sums[f"{x}^2"] - sums[x] ** 2 / n
+        variance_y = sums[f"{y}^2"] - sums[y] ** 2 / n
+        if variance_x <= 0 or variance_y <= 0:
+            return None
+        return float(covariance / np.sqrt(variance_x * variance_y))
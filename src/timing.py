@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+timing.py
+
+This module measures the time spent in every phase of a run on the host. The
+phases are timed with the monotonic clock of the host, and the clock of the
+container is aligned to the host clock once per run, so the iteration times
+reported by the protocol manager can be placed on the same time axis.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+
+class RunTimer:
+    """
+    Records the duration of the phases of a single run.
+
+    Every phase is timed with time.monotonic() on the host. The wall clock
+    time at the start of each phase is stored as well, which is used to place
+    the iterations measured inside the container relative to the run.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty timer.
+        """
+        self._phases = []
+        self._iterations = []
+        self.clock_offset = 0.0
+        self.measured_clock_offset = None
+        self.clock_uncertainty = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time the enclosed block as a phase with the given name.
+
+        :param name: Name of the phase.
+        """
+        wall_start = time.time()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._phases.append({
+                "name": name,
+                "start": wall_start,
+                "duration": time.monotonic() - start,
+            })
+
+    def align_clock(self, docker_manager):
+        """
+        Estimate the offset between the clock of the container and the clock
+        of the host. The container clock is read once, and the host clock is
+        read before and after. The uncertainty is half of the round trip.
+        Local containers share the clock of the host kernel, so their true
+        offset is zero and the estimate is only noise. The offset is
+        therefore only applied when it is larger than its uncertainty, such
+        as for a container on a remote Docker host.
+
+        :param docker_manager: The Docker manager of the running container.
+        """
+        before = time.time()
+        output = docker_manager.run_command("date +%s.%N")
+        after = time.time()
+        try:
+            container_time = float(output.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            print("Could not read the container clock, assuming it matches "
+                  "the host clock")
+            return
+        self.measured_clock_offset = container_time - (before + after) / 2
+        self.clock_uncertainty = (after - before) / 2
+        if abs(self.measured_clock_offset) > self.clock_uncertainty:
+            self.clock_offset = self.measured_clock_offset
+
+    def load_iterations(self, time_file_path):
+        """
+        Read the iteration times written by the protocol manager and convert
+        them to the host clock.
+
+        :param time_file_path: Path to the time.txt file of the run.
+        """
+        iterations = {}
+        with open(time_file_path, "r") as time_file:
+            for line in time_file:
+                key, _, value = line.partition(":")
+                for field in ("start", "stop"):
+                    prefix = f"iteration_{field}_"
+                    if key.startswith(prefix):
+                        index = int(key[len(prefix):])
+                        iterations.setdefault(index, {})[field] = (
+                            float(value.strip()) - self.clock_offset)
+
+        self._iterations = [
+            {"index": index, "start": times["start"],
+             "duration": times["stop"] - times["start"]}
+            for index, times in sorted(iterations.items())
+            if "start" in times and "stop" in times
+        ]
+
+    def duration(self, name):
+        """
+        Get the duration of a phase.
+
+        :param name: Name of the phase.
+        :return: The duration in seconds, or None if the phase was not timed.
+        """
+        for phase in self._phases:
+            if phase["name"] == name:
+                return phase["duration"]
+        return None
+
+    def summary(self):
+        """
+        Create the timing breakdown of the run. Iteration start times are
+        relative to the start of the protocol phase.
+
+        :return: Dictionary with the phases, iterations and clock alignment.
+        """
+        origin = next((phase["start"] for phase in self._phases
+                       if phase["name"] == "protocol"), None)
+        iterations = []
+        for iteration in self._iterations:
+            offset = None
+            if origin is not None:
+                offset = round(iteration["start"] - origin, 3)
+            iterations.append({
+                "index": iteration["index"],
+                "offset": offset,
+                "duration": round(iteration["duration"], 3),
+            })
+
+        return {
+            "phases": {phase["name"]: round(phase["duration"], 3)
+                       for phase in self._phases},
+            "iterations": iterations,
+            "clock_offset": round(self.clock_offset, 3),
+            "measured_clock_offset": (
+                None if self.measured_clock_offset is None
+                else round(self.measured_clock_offset, 3)),
+            "clock_uncertainty": (None if self.clock_uncertainty is None
+                                  else round(self.clock_uncertainty, 3)),
+        }
+
+    def print_summary(self):
+        """
+        Print the timing breakdown of the run.
+        """
+        summary = self.summary()
+        print("== Timing breakdown ==")
+        for name, duration in summary["phases"].items():
+            print(f"{name}\t\t\t{duration:.3f} s")
+        for iteration in summary["iterations"]:
+            # The offset is unknown when the protocol phase was not timed
+            offset = "" if iteration["offset"] is None \
+                else f" (+{iteration['offset']} s)"
+            print(f"iteration {iteration['index']}\t\t"
+                  f"{iteration['duration']:.3f} s{offset}")
+        if summary["measured_clock_offset"] is None:
+            print("clock offset\t\tnot measured")
+        else:
+            print(f"clock offset\t\t{summary['clock_offset']:.3f} s "
+                  f"(measured {summary['measured_clock_offset']:.3f} "
+                  f"+/- {summary['clock_uncertainty']:.3f} s)")
+        print()
+
+    def save(self, path):
+        """
+        Store the timing breakdown as JSON.
+
+        :param path: Path to the output file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
@@ -1,14 +1,29 @@
+import asyncio
+import functools
 import getpass
-import importlib
 import json
 import os
-import time
+import re
 import shutil
 import subprocess
+import time
+import uuid
+
+import checkpoint
+import config_engine
+import extra_plugins
+import network_emulation
+import run_cache
+from metrics_exporter import MetricsExporter
+from timing import RunTimer
 
-import psutil
-from docker_manager import DockerManager
-from data_processor import DataProcessor
+# The Docker SDK, psutil and the data processor (numpy and matplotlib) are
+# imported by the functions that use them, so parsing the arguments and
+# validating a configuration does not pay for their import time.
+
+# Measurement backends that run alongside the protocol, all of them are
+# enabled unless the `observers` of the configuration select a subset
+OBSERVERS = ("nethogs", "resources", "scaphandre")
 
 
 def parse_config(config_path):
@@ -50,6 +65,117 @@ def validate_config(config):
     if config["iterations"] < 1:
         print("Error: The number of iterations must be at least 1.")
         return False
+    errors = config_engine.validate(config)
+    if errors:
+        for error in errors:
+            print(f"Error: {error}.")
+        return False
+    if not validate_limits(config):
+        return False
+    if config["extra"] and not extra_plugins.validate_schema(config):
+        return False
+    for party in config.get("parties", []):
+        if not validate_limits(party):
+            return False
+    if config.get("topology", "single") == "multi":
+        parties = config.get("parties", [])
+        if not parties or any("command" not in party for party in parties):
+            print("Error: the multi-container topology requires a 'parties' "
+                  "list with a 'command' for every party.")
+            return False
+
+
+def validate_limits(limits):
+    """
+    Validate the resource limits in a configuration or party entry. The
+    `cpus` field is the number of CPUs the container may use, `cpuset` the
+    list of cores it may run on (such as "0-3" or "0,2") and `memory` the
+    memory limit (such as "4g").
+
+    :param limits: Configuration data or party entry.
+    :return: True if the limits are valid, False otherwise.
+    """
+    cpus = limits.get("cpus")
+    if cpus is not None and (not isinstance(cpus, (int, float)) or cpus <= 0):
+        print("Error: 'cpus' must be a positive number.")
+        return False
+    cpuset = limits.get("cpuset")
+    if cpuset is not None and \
+            not re.fullmatch(r"\d+(-\d+)?(,\d+(-\d+)?)*", str(cpuset)):
+        print(f"Error: invalid cpuset '{cpuset}'.")
+        return False
+    memory = limits.get("memory")
+    if memory is not None and \
+            not re.fullmatch(r"\d+[bkmg]?", str(memory).lower()):
+        print(f"Error: invalid memory limit '{memory}'.")
+        return False
+    return True
+
+
+def new_results_dir(config, parent=None):
+    """
+    Create the results directory of a new run and store its path in the
+    configuration. The directory is named after the run ID, which consists of
+    the protocol name, the start time and a random suffix, so concurrent runs
+    and earlier runs never overwrite each other. results/latest always points
+    to the most recent run.
+
+    :param config: Configuration data.
+    :param parent: Directory to create the run directory in, results/ in the
+    current working directory by default.
+    :return: Path to the new results directory.
+    """
+    root = parent or os.path.join(os.getcwd(), "results")
+    run_id = (f"{config['name']}-{time.strftime('%Y%m%d-%H%M%S')}-"
+              f"{uuid.uuid4().hex[:6]}")
+    results_dir = os.path.join(root, run_id)
+    os.makedirs(results_dir)
+    config["run_id"] = run_id
+    config["results"] = results_dir
+
+    if parent is None:
+        latest = os.path.join(root, "latest")
+        try:
+            if os.path.islink(latest):
+                os.remove(latest)
+            os.symlink(run_id, latest)
+        except OSError:
+            pass
+    return results_dir
+
+
+def load_run(results_dir):
+    """
+    Load the configuration of an earlier run from its results directory, so
+    its results can be processed again.
+
+    :param results_dir: Path to the results directory of the run.
+    :return: Configuration data of the run.
+    """
+    config_path = os.path.join(results_dir, "config.json")
+    if not os.path.exists(config_path):
+        print(f"Error: '{results_dir}' is not a results directory, "
+              "config.json is missing")
+        exit(1)
+    config = parse_config(config_path)
+    config["results"] = os.path.abspath(results_dir)
+    config["verbose"] = False
+    return config
+
+
+def save_run_config(config, path):
+    """
+    Store the configuration of a run, including its resource limits, with
+    the results.
+
+    :param config: Configuration data.
+    :param path: Path to the output file.
+    """
+    skipped = ("path", "verbose", "built", "force", "start-iteration",
+               "interrupted")
+    with open(path, "w") as f:
+        json.dump({key: value for key, value in config.items()
+                   if key not in skipped}, f, indent=4)
 
 
 def run_protocol(config, sudo_password=None):
@@ -60,6 +186,90 @@ def run_protocol(config, sudo_password=None):
     :param sudo_password: Sudo password for Scaphandre, if required.
     :return: Tuple indicating success and a message.
     """
+    # The password is asked before the event loop starts, since reading it
+    # blocks
+    if "scaphandre" in config.get("observers", OBSERVERS):
+        sudo_password = get_sudo_password(sudo_password)
+    try:
+        return asyncio.run(run_protocol_async(config, sudo_password))
+    except KeyboardInterrupt:
+        config["interrupted"] = True
+        return True, "Protocol execution interrupted"
+
+
+def get_sudo_password(sudo_password=None):
+    """
+    Ask for the sudo password for Scaphandre once, so it can be reused for
+    several runs.
+
+    :param sudo_password: Sudo password, if it is already known.
+    :return: The sudo password, or an empty string if Scaphandre is not
+    installed or no password was given.
+    """
+    if shutil.which("scaphandre") is None:
+        return ""
+    if sudo_password is None:
+        prompt_message = "Enter your sudo password (for Scaphandre): "
+        sudo_password = getpass.getpass(prompt=prompt_message)
+    return sudo_password
+
+
+def run_scaling(config, core_counts, sudo_password=None):
+    """
+    Run the protocol once for every core count and create speedup and
+    efficiency curves. Every run is pinned to the first cores of the host.
+
+    :param config: Configuration data.
+    :param core_counts: List of numbers of cores to run with.
+    :param sudo_password: Sudo password for Scaphandre, if required.
+    :return: Tuple indicating success and a message.
+    """
+    from data_processor import DataProcessor
+
+    if any(cores < 1 for cores in core_counts):
+        return False, "Core counts must be at least 1"
+    available = os.cpu_count()
+    if any(cores > available for cores in core_counts):
+        return False, f"The host has only {available} core(s)"
+
+    sudo_password = get_sudo_password(sudo_password)
+
+    campaign_dir = new_results_dir(config)
+    summaries = {}
+    for cores in sorted(core_counts):
+        print(f"== Running with {cores} core(s) ==")
+        run_config = dict(config, cpus=cores, cpuset=f"0-{cores - 1}",
+                          results=os.path.join(campaign_dir,
+                                               f"cores_{cores}"))
+        os.makedirs(run_config["results"])
+        result = run_protocol(run_config, sudo_password)
+        if result[0] is False:
+            return result
+        if run_config.get("interrupted"):
+            return False, "Scaling benchmark interrupted"
+        # The image only has to be built for the first run
+        config["built"] = True
+        summaries[cores] = DataProcessor(run_config).summary(
+            has_power_measurements(run_config))
+
+    DataProcessor(config).scaling_graphs(summaries)
+    return True, "Scaling benchmark executed successfully"
+
+
+async def run_protocol_async(config, sudo_password=None):
+    """
+    Run the protocol using Docker. The blocking Docker calls run in worker
+    threads, so independent steps such as building the image and validating
+    the sudo password, or retrieving the result files, overlap.
+
+    :param config: Configuration data.
+    :param sudo_password: Sudo password for Scaphandre, as returned by
+    get_sudo_password. Without a password, the power consumption is not
+    measured.
+    :return: Tuple indicating success and a message.
+    """
+    from docker_manager import DockerManager, DockerTopology
+
     scaphandre_installed = True
     scaphandre_path = shutil.which("scaphandre")
 
@@ -68,104 +278,335 @@ def run_protocol(config, sudo_password=None):
         print("Scaphandre is not installed or not in PATH, skipping power"
               " measurements")
 
-    docker_manager = DockerManager(config)
-    docker_manager.build_image()
-    docker_manager.run_container()
-
-    if scaphandre_installed:
-        if sudo_password is None:
-            prompt_message = "Enter your sudo password (for Scaphandre): "
-            sudo_password = getpass.getpass(prompt=prompt_message)
-
-        if sudo_password != "":
-            sudo_validation_proc = subprocess.Popen(
-                ["sudo", "-S", "echo"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE
-            )
-            sudo_validation_proc.stdin.write(f"{sudo_password}\n".encode())
-            sudo_validation_proc.stdin.flush()
-            sudo_validation_proc.stdin.close()
-            sudo_validation_proc.wait()
-
-            if sudo_validation_proc.returncode != 0:
+    observers = config.get("observers", OBSERVERS)
+    scaphandre_installed = scaphandre_installed and "scaphandre" in observers
+    use_scaphandre = scaphandre_installed and bool(sudo_password)
+    network_profile = network_emulation.get_profile(config)
+
+    exporter = None
+    if config.get("metrics-port", 0) > 0:
+        exporter = MetricsExporter(config)
+        exporter.start()
+
+    timer = RunTimer()
+    start = config.get("start-iteration", 0)
+    multi = config.get("topology", "single") == "multi"
+    if multi:
+        deployment = DockerTopology(config)
+        managers = deployment.managers
+        start_containers = deployment.run_containers
+        stop_containers = deployment.stop_containers
+    else:
+        deployment = DockerManager(config)
+        managers = [deployment]
+        start_containers = deployment.run_container
+        stop_containers = deployment.stop_container
+
+    with timer.phase("build"):
+        build = asyncio.to_thread(deployment.build_image)
+        if use_scaphandre:
+            _, sudo_valid = await asyncio.gather(
+                build, _validate_sudo(sudo_password))
+            if not sudo_valid:
+                if exporter is not None:
+                    exporter.stop()
                 return False, "Incorrect sudo password"
-
+        else:
+            await build
+
+    cache = None
+    if config.get("run-cache", True):
+        cache = run_cache.RunCache(config.get("cache-dir"))
+        cache_key, cache_inputs = run_cache.cache_key(
+            config, await asyncio.to_thread(lambda: deployment.image_id),
+            use_scaphandre)
+        if not config.get("force", False) and not start and \
+                cache.lookup(cache_key):
+            results_dir = config.get("results") or new_results_dir(config)
+            cache.restore(cache_key, results_dir)
+            save_run_config(config, os.path.join(results_dir, "config.json"))
+            config["cached"] = True
+            if exporter is not None:
+                exporter.stop()
+            print(f"Reusing the results of an identical run "
+                  f"({cache_key[:12]}), use --force to run it again")
+            return True, "Protocol results restored from the run cache"
+
+    with timer.phase("container_start"):
+        await asyncio.to_thread(start_containers)
+
+    results_dir = config.get("results") or new_results_dir(config)
+    if multi:
+        party_dirs = [os.path.join(results_dir, f"party_{i}")
+                      for i in range(len(managers))]
+    else:
+        party_dirs = [results_dir]
+    for party_dir in party_dirs:
+        os.makedirs(party_dir, exist_ok=True)
+
+    # The configuration is saved first, so an interrupted run can be resumed
+    save_run_config(config, os.path.join(results_dir, "config.json"))
+
+    power_path = os.path.join(results_dir, "scaphandre.json")
+    resumed_power_path = power_path + ".resumed"
+    if start:
+        for party_dir in party_dirs:
+            checkpoint.truncate_times(os.path.join(party_dir, "time.txt"),
+                                      start)
+        if use_scaphandre and os.path.exists(power_path):
+            # Scaphandre overwrites its output file, so the measurements of
+            # the completed iterations are kept aside and merged afterwards
+            stop = checkpoint.stop_time(
+                os.path.join(party_dirs[0], "time.txt"), start - 1)
+            if stop is not None:
+                checkpoint.truncate_power(power_path, stop)
+            os.replace(power_path, resumed_power_path)
+
+    checkpointers = []
+    scaphandre_proc = None
+    completed = False
+    error = None
     try:
-        docker_manager.copy_file(
-            os.path.join(os.path.dirname(__file__), "protocol_manager.py"),
-            docker_manager.workdir
-        )
-        command = (
-            f'python3 protocol_manager.py --command "{config["run"]}" '
-            f'--iterations {config["iterations"]}'
-        )
-        if config["verbose"]:
-            command += " --verbose"
-
-        if scaphandre_installed and sudo_password != "":
-            # The file is created first, otherwise Scaphandre will not be able
-            # to write to it. This also ensures the file is flushed.
-            if not os.path.exists("results"):
-                os.makedirs("results")
-
-            with open("results/scaphandre.json", "w") as f:
-                f.write("")
-
-            if config['max-top'] == 0:
-                process_amt = len(psutil.pids())
-                if config["verbose"]:
-                    print(f"Found {process_amt} processes, setting --max-top "
-                          f"to {process_amt + 10} to avoid missing any process"
-                          )
-                config["max-top"] = process_amt + 10
-
-            print(f"Max top consumers set to {config['max-top']}")
-            scaphandre_proc = subprocess.Popen(
-                ["sudo", "-S", "scaphandre", "json", "-s", "0", "--step-nano",
-                 "10000", "--containers", "--max-top-consumers",
-                 str(config["max-top"]), "-f", "results/scaphandre.json",],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE
-            )
-
-            scaphandre_proc.stdin.write(f"{sudo_password}\n".encode())
-            scaphandre_proc.stdin.flush()
-            sudo_password = None
+        with timer.phase("setup"):
+            setup = [asyncio.to_thread(timer.align_clock, managers[0])]
+            for manager in managers:
+                setup.append(asyncio.to_thread(
+                    manager.copy_file,
+                    os.path.join(os.path.dirname(__file__),
+                                 "protocol_manager.py"),
+                    manager.workdir
+                ))
+                if network_profile is not None:
+                    setup.append(asyncio.to_thread(
+                        network_emulation.apply_profile, manager,
+                        network_profile))
+            if start:
+                # The protocol manager appends the times of the remaining
+                # iterations to those of the completed ones
+                for manager, party_dir in zip(managers, party_dirs):
+                    setup.append(asyncio.to_thread(
+                        manager.copy_file,
+                        os.path.join(party_dir, "time.txt"),
+                        manager.workdir
+                    ))
+            await asyncio.gather(*setup)
+
+            if use_scaphandre:
+                scaphandre_proc = await _start_scaphandre(
+                    config, [manager.container_name for manager in managers],
+                    sudo_password)
+                sudo_password = None
+
+                if exporter is not None:
+                    exporter.follow_scaphandre(power_path)
 
         print("Starting protocol execution...")
 
-        time1 = docker_manager.run_command("date +%s%3N")
-        docker_manager.run_command(command)
-        time2 = docker_manager.run_command("date +%s%3N")
-
-        time.sleep(1)
-        if scaphandre_installed and sudo_password != "":
-            scaphandre_proc.terminate()
-            scaphandre_proc.wait()
-
-        results_dir = os.path.join(os.getcwd(), "results")
-        if not os.path.exists(results_dir):
-            os.makedirs(results_dir)
-
-        for run in range(config["iterations"]):
-            remote_file = f"{docker_manager.workdir}/nethogs_{run}.txt"
-            local_file = os.path.join(results_dir, f"nethogs_{run}.txt")
-            docker_manager.retrieve_file(remote_file, local_file)
-        docker_manager.retrieve_file(
-            f"{docker_manager.workdir}/time.txt", os.path.join(results_dir,
-                                                               "time.txt"))
-        print((int(time2) - int(time1)) / 1000.0, "second(s) elapsed in total")
-        handle_extra(docker_manager, config)
-    except KeyboardInterrupt:
+        with timer.phase("protocol"):
+            runs = []
+            for i, manager in enumerate(managers):
+                if multi:
+                    command = _manager_command(
+                        config, config["parties"][i]["command"], "eth0",
+                        exporter is not None)
+                    feed = (functools.partial(exporter.feed, source=i)
+                            if exporter is not None else None)
+                else:
+                    command = _manager_command(
+                        config, config["run"], "lo", exporter is not None)
+                    feed = exporter.feed if exporter is not None else None
+                checkpointers.append(checkpoint.Checkpointer(
+                    manager, party_dirs[i], feed))
+                runs.append(asyncio.to_thread(
+                    manager.run_command, command, checkpointers[i].feed))
+            await asyncio.gather(*runs)
+
+        with timer.phase("teardown"):
+            await asyncio.sleep(1)
+            if scaphandre_proc is not None:
+                scaphandre_proc.terminate()
+                await scaphandre_proc.wait()
+                scaphandre_proc = None
+
+        with timer.phase("retrieval"):
+            # Only the iterations that were not saved at their checkpoint
+            # are left to retrieve
+            retrievals = []
+            for manager, party_dir, checkpointer in zip(
+                    managers, party_dirs, checkpointers):
+                files = [file for run in range(start, config["iterations"])
+                         if run not in checkpointer.saved
+                         for file in checkpoint.iteration_files(run)]
+                files.append("time.txt")
+                retrievals += [asyncio.to_thread(
+                    manager.retrieve_file,
+                    f"{manager.workdir}/{file}",
+                    os.path.join(party_dir, file)
+                ) for file in files]
+            await asyncio.gather(*retrievals)
+        network_emulation.save_profile(
+            network_profile, os.path.join(results_dir, "network_profile.json"))
+        save_run_config(config, os.path.join(results_dir, "config.json"))
+        print(f"{timer.duration('protocol'):.3f} second(s) elapsed in total")
+
+        with timer.phase("extra"):
+            await asyncio.to_thread(handle_extra, deployment, config)
+        completed = True
+    except (KeyboardInterrupt, asyncio.CancelledError):
         print("Program interrupted, deleting the Docker container...")
+        config["interrupted"] = True
+    except network_emulation.NetworkEmulationError as e:
+        error = str(e)
     finally:
-        docker_manager.stop_container()
+        if scaphandre_proc is not None:
+            scaphandre_proc.terminate()
+            await scaphandre_proc.wait()
+        with timer.phase("container_stop"):
+            stop_containers()
+        if exporter is not None:
+            exporter.stop()
+        if os.path.exists(resumed_power_path):
+            checkpoint.merge_files(resumed_power_path, power_path)
+            os.replace(resumed_power_path, power_path)
+    if error is not None:
+        return False, error
+
+    if multi and os.path.exists(os.path.join(party_dirs[0], "time.txt")):
+        # The iteration times of the first party are used for the whole run.
+        shutil.copyfile(os.path.join(party_dirs[0], "time.txt"),
+                        os.path.join(results_dir, "time.txt"))
+
+    time_file_path = os.path.join(results_dir, "time.txt")
+    if os.path.exists(time_file_path):
+        timer.load_iterations(time_file_path)
+        timer.save(os.path.join(results_dir, "timing.json"))
+        if config["verbose"]:
+            timer.print_summary()
+
+    if cache is not None and completed:
+        await asyncio.to_thread(cache.store, cache_key, cache_inputs,
+                                results_dir)
+        max_size = config.get("cache-max-size")
+        removed = cache.evict(
+            config.get("cache-max-age"),
+            None if max_size is None else run_cache.parse_size(max_size))
+        if removed and config["verbose"]:
+            print(f"Removed {removed} entries from the run cache")
+    if not completed:
+        return True, "Protocol execution interrupted"
     return True, "Protocol executed successfully"
 
 
+def _manager_command(config, run_command, interface, progress):
+    """
+    Build the command that runs the protocol manager inside a container.
+
+    :param config: Configuration data.
+    :param run_command: The command that runs the protocol.
+    :param interface: Network interface measured by nethogs.
+    :param progress: Whether progress lines should be printed.
+    :return: The command as a string.
+    """
+    command = (
+        f'python3 protocol_manager.py --command "{run_command}" '
+        f'--iterations {config["iterations"]} '
+        f"--execfile '{config['execfile']}' --interface {interface}"
+    )
+    if config.get("start-iteration"):
+        command += f" --start {config['start-iteration']}"
+    observers = config.get("observers", OBSERVERS)
+    if "nethogs" not in observers:
+        command += " --no-nethogs"
+    if "resources" not in observers:
+        command += " --no-resources"
+    if config["verbose"]:
+        command += " --verbose"
+    if progress:
+        command += " --progress"
+    return command
+
+
+async def _validate_sudo(sudo_password):
+    """
+    Check if the given sudo password is correct.
+
+    :param sudo_password: Sudo password to validate.
+    :return: True if the password is correct, False otherwise.
+    """
+    sudo_validation_proc = await asyncio.create_subprocess_exec(
+        "sudo", "-S", "echo",
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.PIPE
+    )
+    await sudo_validation_proc.communicate(f"{sudo_password}\n".encode())
+    return sudo_validation_proc.returncode == 0
+
+
+async def _start_scaphandre(config, container_names, sudo_password):
+    """
+    Start Scaphandre in the background, writing to scaphandre.json in the
+    results directory of the run.
+
+    :param config: Configuration data.
+    :param container_names: Names of the containers running the protocol.
+    :param sudo_password: Sudo password for Scaphandre.
+    :return: The Scaphandre process.
+    """
+    # The file is created first, otherwise Scaphandre will not be able to
+    # write to it. This also ensures the file is flushed.
+    with open(os.path.join(config["results"], "scaphandre.json"), "w") as f:
+        f.write("")
+
+    scaphandre_proc = await asyncio.create_subprocess_exec(
+        *scaphandre_command(config, container_names),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.PIPE
+    )
+
+    scaphandre_proc.stdin.write(f"{sudo_password}\n".encode())
+    await scaphandre_proc.stdin.drain()
+    return scaphandre_proc
+
+
+def scaphandre_command(config, container_names):
+    """
+    Build the Scaphandre command for the selected measurement scope. In the
+    container scope, only the processes inside the benchmark container are
+    serialized. In the host scope, the top consumers of the whole host are
+    ranked and written, which requires a large enough --max-top-consumers.
+
+    :param config: Configuration data.
+    :param container_names: Names of the containers running the protocol.
+    :return: The Scaphandre command as a list of arguments.
+    """
+    import psutil
+
+    command = ["sudo", "-S", "scaphandre", "json", "-s", "0", "--step-nano",
+               "10000", "--containers", "-f",
+               os.path.join(config["results"], "scaphandre.json")]
+
+    if config.get("scaphandre-scope", "container") == "container":
+        print(f"Restricting power measurements to container(s) "
+              f"{', '.join(container_names)}")
+        names = "|".join(re.escape(name) for name in container_names)
+        command += ["--container-regex", f"^/?({names})$"]
+        return command
+
+    if config['max-top'] == 0:
+        process_amt = len(psutil.pids())
+        if config["verbose"]:
+            print(f"Found {process_amt} processes, setting --max-top "
+                  f"to {process_amt + 10} to avoid missing any process"
+                  )
+        config["max-top"] = process_amt + 10
+
+    print(f"Max top consumers set to {config['max-top']}")
+    command += ["--max-top-consumers", str(config["max-top"])]
+    return command
+
+
 def handle_extra(docker_manager, config):
     """
     Handle the extra data processing.
@@ -175,18 +616,22 @@ def handle_extra(docker_manager, config):
     if not config['extra']:
         return
 
-    extra = importlib.import_module(f"extra.{config['name']}")
-    if not hasattr(extra, "retrieve_data"):
-        print(f"Error: extra module '{config['name']}' does not have "
-              "'retrieve_data' function")
-        exit(1)
-    if not hasattr(extra, "process_data"):
-        print(f"Error: extra module '{config['name']}' does not have "
-              "'process_data' function")
-        exit(1)
+    plugin = extra_plugins.get_plugin(config)
+    data = plugin.retrieve_data(docker_manager, config)
+    plugin.process_data(data, config)
+
+
+def has_power_measurements(config):
+    """
+    Check whether a run has power measurements. Scaphandre may not be
+    installed, or may not have started, even if a sudo password was given.
 
-    data = extra.retrieve_data(docker_manager, config)
-    extra.process_data(data)
+    :param config: Configuration data, with the results directory set.
+    :return: True if the Scaphandre output of the run is not empty.
+    """
+    scaphandre_path = os.path.join(config["results"], "scaphandre.json")
+    return os.path.exists(scaphandre_path) and \
+        os.path.getsize(scaphandre_path) > 0
 
 
 def process_data(config, scaphandre=True):
@@ -195,7 +640,14 @@ def process_data(config, scaphandre=True):
 
     :param config: Configuration data.
     """
+    from data_processor import DataProcessor
+    from time_alignment import TimeAligner
+
     processor = DataProcessor(config)
     processor.nethogs_graphs()
+    processor.resource_graphs()
     if scaphandre:
         processor.scaphandre_graphs()
+    processor.phase_report(scaphandre)
+    processor.statistics_report(scaphandre)
+    TimeAligner(config, config.get("alignment-window", 0.1)).report()
@@ -15,6 +15,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import QThread, pyqtSignal
 
+import config_engine
 import utils
 
 
@@ -32,10 +33,8 @@ class ProtocolWorker(QThread):
             self.finished.emit(False, result[1])
             return
         try:
-            scaphandre = True
-            if not self.sudo_password:
-                scaphandre = False
-            utils.process_data(self.config, scaphandre)
+            utils.process_data(self.config,
+                               utils.has_power_measurements(self.config))
             self.finished.emit(True, "")
         except Exception as e:
             self.finished.emit(False, str(e))
@@ -138,12 +137,10 @@ class Ui_MainWindow(object):
         Populate the protocol selection combo box with available protocols.
         """
         protocols_path = os.path.join(os.getcwd(), "protocols")
+        self.catalog = {}
         if os.path.exists(protocols_path) and os.path.isdir(protocols_path):
-            directories = [
-                d for d in os.listdir(protocols_path)
-                if os.path.isdir(os.path.join(protocols_path, d))
-            ]
-            self.selectProtocolComboBox.addItems(directories)
+            self.catalog = config_engine.load_catalog(protocols_path)
+            self.selectProtocolComboBox.addItems(self.catalog.keys())
         else:
             self.selectProtocolComboBox.addItem("No protocols found")
 
@@ -153,11 +150,8 @@ class Ui_MainWindow(object):
         self.variable_widgets = {}
 
         protocol_name = self.selectProtocolComboBox.currentText()
-        if protocol_name and protocol_name != "No protocols found":
-            protocol_path = os.path.join(
-                os.getcwd(), "protocols", protocol_name)
-            config_path = os.path.join(protocol_path, "config.json")
-            config = utils.parse_config(config_path)
+        if protocol_name in self.catalog:
+            config = self.catalog[protocol_name].config
 
             if "modes" in config:
                 mode_label = QtWidgets.QLabel("Mode")
@@ -210,23 +204,28 @@ class Ui_MainWindow(object):
         else:
             self.textEdit.clear()
 
-    def populateTemplate(self, template_config, variables):
+    def variableValues(self):
         """
-        Substitute variables in the command template.
+        Get the values of the variables and the mode selected in the form.
+
+        :return: Tuple of a dictionary mapping variables to their values and
+        the selected mode, or None if the protocol has no modes.
         """
-        template = template_config['command_template']
-        for var_name in variables:
-            if var_name in template:
-                widget = self.variable_widgets.get(var_name)
-                if widget is not None:
-                    if isinstance(widget, QtWidgets.QComboBox):
-                        value = widget.currentText()
-                    elif isinstance(widget, QtWidgets.QSpinBox):
-                        value = str(widget.value())
-                    else:
-                        continue
-                    template = template.replace(f"${{{var_name}}}", value)
-        return template
+        values = {}
+        mode = None
+        for var_name, widget in self.variable_widgets.items():
+            if isinstance(widget, QtWidgets.QComboBox):
+                value = widget.currentText()
+            elif isinstance(widget, QtWidgets.QSpinBox):
+                value = str(widget.value())
+            else:
+                continue
+            if var_name == "MODE" and widget is getattr(
+                    self, "modeComboBox", None):
+                mode = value
+            else:
+                values[var_name] = value
+        return values, mode
 
     def runProtocol(self):
         """
@@ -245,17 +244,19 @@ class Ui_MainWindow(object):
         config['verbose'] = True
         config['name'] = self.selectProtocolComboBox.currentText()
 
-        if "modes" in config and hasattr(self, "modeComboBox"):
-            selected_mode = self.modeComboBox.currentText()
-            mode_config = config["modes"].get(selected_mode, {})
-            if "command_template" in mode_config:
-                command = self.populateTemplate(
-                    mode_config, config.get("variables", {}))
-                config['run'] = command
-                config['mode'] = selected_mode
-        elif "variables" in config and 'command_template' in config:
-            command = self.populateTemplate(config, config["variables"])
-            config['run'] = command
+        protocol = config_engine.Protocol(
+            config['name'], config['path'], config)
+        if protocol.has_template:
+            values, mode = self.variableValues()
+            values = {var_name: value for var_name, value in values.items()
+                      if var_name in protocol.variables}
+            try:
+                config = protocol.configure(values, mode)
+            except ValueError as e:
+                QMessageBox.critical(None, "Invalid configuration", str(e))
+                self.pushButton.setText("Run protocol")
+                self.pushButton.setEnabled(True)
+                return
 
         if utils.validate_config(config) is False:
             print("Invalid configuration")
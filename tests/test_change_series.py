@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+test_change_series.py
+
+Checks the series of changes against the same operations on the expanded
+series, with one value for every sample.
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
+
+from change_series import ChangeSeries, mean, stack  # noqa: E402
+
+
+def random_series(rng, length, changes):
+    """
+    Create a series with a number of random changes and its expansion.
+
+    :param rng: The random generator.
+    :param length: Number of samples of the series.
+    :param changes: Number of changes.
+    :return: Tuple of the series and the array of its value at every sample.
+    """
+    indices = np.sort(rng.choice(length, changes, replace=False))
+    values = np.cumsum(rng.integers(1, 100, changes)).astype(float)
+    dense = np.zeros(length)
+    for index, value in zip(indices, values):
+        dense[index:] = value
+    return ChangeSeries.from_samples(indices, values, length), dense
+
+
+class ChangeSeriesTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_from_samples_drops_repeated_values(self):
+        series = ChangeSeries.from_samples([0, 1, 2, 3, 4],
+                                           [0, 5, 5, 7, 7], 6)
+        np.testing.assert_array_equal(series.indices, [1, 3])
+        np.testing.assert_array_equal(series.values, [5, 7])
+        self.assertEqual(len(series), 6)
+        self.assertEqual(series.last, 7)
+
+    def test_at_matches_expansion(self):
+        series, dense = random_series(self.rng, 200, 20)
+        np.testing.assert_array_equal(series.at(np.arange(200)), dense)
+
+    def test_append_replaces_same_sample(self):
+        series = ChangeSeries()
+        series.append(0, 1.0)
+        series.append(2, 3.0)
+        series.append(2, 4.0)
+        series.append(5, 4.0)
+        np.testing.assert_array_equal(series.indices, [0, 2])
+        np.testing.assert_array_equal(series.values, [1.0, 4.0])
+        self.assertEqual(len(series), 6)
+
+    def test_resample_matches_nearest_neighbour(self):
+        for delay, step, count in ((0.37, 0.1, 900), (0.05, 0.13, 120),
+                                   (0.21, 0.21, 250)):
+            series, dense = random_series(self.rng, 200, 30)
+            times = np.arange(count) * step
+            # The nearest sample, where a tie goes to the earlier sample,
+            # and the last sample beyond the end of the series
+            nearest = np.ceil(times / delay - 0.5).astype(int)
+            expected = dense[np.minimum(nearest, len(dense) - 1)]
+            resampled = series.resample(delay, step, count)
+            self.assertEqual(len(resampled), count)
+            np.testing.assert_array_equal(
+                resampled.at(np.arange(count)), expected)
+
+    def test_resample_without_delay(self):
+        series = ChangeSeries([3], [2.0], 5)
+        resampled = series.resample(0, 0.1, 4)
+        np.testing.assert_array_equal(resampled.at(np.arange(4)), [2.0] * 4)
+        empty = ChangeSeries(length=5).resample(0.1, 0.1, 4)
+        np.testing.assert_array_equal(empty.at(np.arange(4)), [0.0] * 4)
+
+    def test_difference_matches_expansion(self):
+        series, dense = random_series(self.rng, 150, 25)
+        rates = series.difference(0.5)
+        expected = np.diff(dense, prepend=dense[0]) / 0.5
+        np.testing.assert_array_equal(rates.at(np.arange(150)), expected)
+
+    def test_stack_and_mean_match_expansion(self):
+        pairs = [random_series(self.rng, length, 10)
+                 for length in (80, 100, 120)]
+        indices, values = stack([series for series, _ in pairs])
+        for (series, dense), row in zip(pairs, values):
+            np.testing.assert_array_equal(
+                row, dense[np.minimum(indices, len(dense) - 1)])
+
+        average = mean([series for series, _ in pairs])
+        self.assertEqual(len(average), 120)
+        expected = np.mean([np.pad(dense, (0, 120 - len(dense)), mode="edge")
+                            for _, dense in pairs], axis=0)
+        np.testing.assert_allclose(average.at(np.arange(120)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+test_checkpoint.py
+
+Checks how an interrupted run is found to be complete up to an iteration,
+and how its times and power measurements are cut back to that iteration.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
+
+import checkpoint  # noqa: E402
+
+# time.txt of a run of 5 iterations that was interrupted in iteration 3
+TRUNCATED_TIMES = """\
+iteration_start_0: 100.0
+iteration_stop_0: 109.0
+nethogs_0: 9.5
+iteration_start_1: 110.0
+iteration_stop_1: 119.0
+nethogs_1: 9.5
+iteration_start_2: 120.0
+iteration_stop_2: 129.0
+nethogs_2: 9.5
+iteration_start_3: 130.0
+"""
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.results = self.directory.name
+        self.config = {"results": self.results, "iterations": 5}
+        self.time_path = os.path.join(self.results, "time.txt")
+        with open(self.time_path, "w") as f:
+            f.write(TRUNCATED_TIMES)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def save_files(self, runs, directory=None):
+        """
+        Create the files of a number of iterations.
+
+        :param runs: Indices of the iterations.
+        :param directory: Directory of the files, the results directory by
+        default.
+        """
+        for run in runs:
+            for file in checkpoint.iteration_files(run):
+                open(os.path.join(directory or self.results, file),
+                     "w").close()
+
+    def test_completed_iterations(self):
+        self.save_files(range(4))
+        self.assertEqual(checkpoint.completed_iterations(self.config), 3)
+
+    def test_missing_files(self):
+        self.save_files([0, 2])
+        self.assertEqual(checkpoint.completed_iterations(self.config), 1)
+
+    def test_missing_times(self):
+        os.remove(self.time_path)
+        self.assertEqual(checkpoint.completed_iterations(self.config), 0)
+
+    def test_completed_iterations_of_every_party(self):
+        config = dict(self.config, topology="multi", parties=[{}, {}])
+        for party, runs in ((0, range(3)), (1, range(2))):
+            directory = os.path.join(self.results, f"party_{party}")
+            os.makedirs(directory)
+            with open(os.path.join(directory, "time.txt"), "w") as f:
+                f.write(TRUNCATED_TIMES)
+            self.save_files(runs, directory)
+        self.assertEqual(checkpoint.completed_iterations(config), 2)
+
+    def test_truncate_times(self):
+        checkpoint.truncate_times(self.time_path, 2)
+        with open(self.time_path, "r") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, TRUNCATED_TIMES.splitlines()[:6])
+        self.assertEqual(checkpoint.stop_time(self.time_path, 1), 119.0)
+        self.assertIsNone(checkpoint.stop_time(self.time_path, 2))
+
+    def test_truncate_power(self):
+        path = os.path.join(self.results, "scaphandre.json")
+        with open(path, "w") as f:
+            for timestamp in (118.0, 119.0, 131.0):
+                f.write(json.dumps({
+                    "host": {"timestamp": timestamp, "consumption": 50.0},
+                    "consumers": [{"timestamp": timestamp}]}))
+            # The object that was being written when the run was stopped
+            f.write('{"host": {"timestamp": 132.0')
+        checkpoint.truncate_power(path, 119.0)
+        with open(path, "r") as f:
+            timestamps = [json.loads(line)["host"]["timestamp"]
+                          for line in f]
+        self.assertEqual(timestamps, [118.0, 119.0])
+
+    def test_merge_files(self):
+        first = os.path.join(self.results, "first")
+        second = os.path.join(self.results, "second")
+        for path, text in ((first, "a\n"), (second, "b\n")):
+            with open(path, "w") as f:
+                f.write(text)
+        checkpoint.merge_files(first, second)
+        with open(first, "r") as f:
+            self.assertEqual(f.read(), "a\nb\n")
+        self.assertFalse(os.path.exists(second))
+
+    def test_checkpointer_feed(self):
+        class Manager:
+            workdir = "/app"
+
+            def __init__(self):
+                self.retrieved = []
+
+            def retrieve_file(self, source, destination):
+                self.retrieved.append(os.path.basename(source))
+
+        manager = Manager()
+        output = []
+        checkpointer = checkpoint.Checkpointer(manager, self.results,
+                                               output.append)
+        # The output is split within the checkpoint lines
+        for chunk in ("iteration done\r\nsnnif-check", "point 0\nsnnif-",
+                      "checkpoint x\nsnnif-checkpoint 1\n"):
+            checkpointer.feed(chunk)
+        self.assertEqual(checkpointer.saved, {0, 1})
+        self.assertEqual(manager.retrieved,
+                         checkpoint.iteration_files(0) + ["time.txt"] +
+                         checkpoint.iteration_files(1) + ["time.txt"])
+        self.assertEqual(len(output), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
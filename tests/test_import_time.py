@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+test_import_time.py
+
+Checks that starting the CLI does not import the heavy dependencies, which
+are only needed to run or process a protocol, and that the imports of the
+CLI stay within a time budget. A sweep driver starts the CLI thousands of
+times, so every regression in its startup time adds up.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Modules that must not be imported to parse the arguments
+HEAVY_MODULES = ("matplotlib", "scipy", "numpy", "docker", "psutil", "PyQt5")
+
+# Maximum cumulative import time of the CLI in seconds, not counting the
+# startup of the interpreter itself
+IMPORT_BUDGET = 0.5
+
+# Modules imported by the interpreter before the CLI is imported
+STARTUP_MODULES = ("site", "encodings", "_frozen_importlib_external")
+
+
+def import_times(args):
+    """
+    Run Python with -X importtime and parse the imported modules.
+
+    :param args: Arguments of the Python interpreter after -X importtime.
+    :return: Dictionary mapping the top-level imports to their cumulative
+    import time in seconds, and the set of all imported modules.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args, cwd=SRC,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    top_level = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative) / 1e6
+    return top_level, modules
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_help_skips_heavy_modules(self):
+        _, modules = import_times(["main.py", "-h"])
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_help_within_budget(self):
+        top_level, _ = import_times(["main.py", "-h"])
+        total = sum(seconds for name, seconds in top_level.items()
+                    if name not in STARTUP_MODULES)
+        self.assertLess(total, IMPORT_BUDGET)
+
+    def test_data_processor_skips_matplotlib(self):
+        _, modules = import_times(["-c", "import data_processor"])
+        self.assertIn("data_processor", modules)
+        self.assertNotIn("matplotlib", modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+test_log_parser.py
+
+Checks that the single-pass log parser finds the same records as searching
+the whole file with every pattern, as the extra data processors did before.
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
+
+from log_parser import LogParser, LogPattern  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SAMPLE_LOG = """\
+Loading data... done
+Wall Clock time for MiniONN train: 1.524 sec
+CPU time for MiniONN train: 1.201 sec
+Communication, MiniONN train, P0: 12.5MB (sent) 13.25MB (recv)
+Rounds, MiniONN train, P0: 120(sends) 118(recvs)
+Communication, MiniONN train, P1: 2.5MB (sent) 3.0MB (recv)
+Rounds, MiniONN train, P1: 20(sends) 21(recvs)
+----------------------------------------------
+Wall Clock time for MiniONN test: 0.75 sec
+CPU time for MiniONN test: 0.5 sec
+Total communication: 15.0MB (sent) and 16.25MB (recv)
+Total calls: 140 (sends) and 139 (recvs)
+"""
+
+# The patterns and conversions of the extra data processor of Falcon before
+# the log schema was introduced
+FINDALL_PATTERNS = {
+    "wall_clock_times": (r"Wall Clock time for .*?: ([\d.]+) sec",
+                         float),
+    "cpu_times": (r"CPU time for .*?: ([\d.]+) sec", float),
+    "total_comms": (
+        r"Total communication: ([\d.]+)MB \(sent\) and ([\d.]+)MB \(recv\)",
+        lambda x: (float(x[0]), float(x[1]))),
+    "total_calls": (r"Total calls: (\d+) \(sends\) and (\d+) \(recvs\)",
+                    lambda x: (int(x[0]), int(x[1]))),
+    "party_comms": (
+        r"Communication, .*?, (P\d+): ([\d.]+)MB \(sent\) ([\d.]+)MB \(recv\)",
+        lambda x: (x[0], float(x[1]), float(x[2]))),
+    "party_rounds": (r"Rounds, .*?, (P\d+): (\d+)\(sends\) (\d+)\(recvs\)",
+                     lambda x: (x[0], int(x[1]), int(x[2]))),
+}
+
+
+def findall(content):
+    """
+    Parse a log as the extra data processors did before the log parser.
+
+    :param content: Content of the log file.
+    :return: Dictionary mapping every pattern name to its values.
+    """
+    return {name: [convert(match) for match in re.findall(regex, content)]
+            for name, (regex, convert) in FINDALL_PATTERNS.items()}
+
+
+class LogParserTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "P0.txt")
+        with open(self.path, "w") as f:
+            f.write(SAMPLE_LOG)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_schema_matches_findall(self):
+        with open(os.path.join(ROOT, "protocols", "falcon",
+                               "config.json"), "r") as f:
+            schema = json.load(f)["log_schema"]
+        parsed = LogParser.from_schema(schema).parse(self.path)
+
+        expected = findall(SAMPLE_LOG)
+        self.assertEqual(set(parsed), set(expected))
+        for name, values in expected.items():
+            records = [record[0] if len(record) == 1 else tuple(record)
+                       for record in parsed[name]]
+            self.assertEqual(records, values, name)
+
+    def test_records_are_typed(self):
+        parser = LogParser([LogPattern(
+            "calls", r"Total calls: (\d+) \(sends\) and (\d+) \(recvs\)",
+            [("sends", int), ("recvs", int)])])
+        records = parser.parse([self.path, self.path])["calls"]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0].sends, 140)
+        self.assertIsInstance(records[0].recvs, int)
+
+    def test_invalid_patterns(self):
+        with self.assertRaises(ValueError):
+            LogPattern("not an identifier", r"(\d+)", [("value", int)])
+        with self.assertRaises(ValueError):
+            LogPattern("values", r"(\d+) (\d+)", [("value", int)])
+        with self.assertRaises(ValueError):
+            LogParser.from_schema({"values": {
+                "regex": r"(\d+)", "fields": {"value": "decimal"}}})
+
+
+if __name__ == "__main__":
+    unittest.main()
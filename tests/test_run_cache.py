@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+test_run_cache.py
+
+Checks that the key of a run only depends on the inputs that change its
+measurements, and the eviction of the run cache by age and size.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
+
+import run_cache  # noqa: E402
+
+CONFIG = {"name": "falcon", "run": "./Falcon.out 0", "iterations": 5,
+          "execfile": "Falcon.out", "topology": "single", "verbose": False}
+
+
+class CacheKeyTest(unittest.TestCase):
+    def test_key_is_stable(self):
+        key, inputs = run_cache.cache_key(dict(CONFIG), "sha256:1", True)
+        reordered = dict(reversed(list(CONFIG.items())))
+        self.assertEqual(run_cache.cache_key(reordered, "sha256:1", True)[0],
+                         key)
+        self.assertEqual(inputs["protocol_manager"],
+                         run_cache.file_digest(run_cache.MANAGER_PATH))
+
+    def test_key_ignores_other_settings(self):
+        key, _ = run_cache.cache_key(dict(CONFIG), "sha256:1", True)
+        changed = dict(CONFIG, verbose=True, built=True)
+        self.assertEqual(run_cache.cache_key(changed, "sha256:1", True)[0],
+                         key)
+
+    def test_key_changes_with_inputs(self):
+        key, _ = run_cache.cache_key(dict(CONFIG), "sha256:1", True)
+        keys = {
+            run_cache.cache_key(dict(CONFIG, iterations=6), "sha256:1",
+                                True)[0],
+            run_cache.cache_key(dict(CONFIG, cpus=2), "sha256:1", True)[0],
+            run_cache.cache_key(dict(CONFIG), "sha256:2", True)[0],
+            run_cache.cache_key(dict(CONFIG), "sha256:1", False)[0],
+        }
+        self.assertNotIn(key, keys)
+        self.assertEqual(len(keys), 4)
+
+    def test_parse_size(self):
+        self.assertEqual(run_cache.parse_size("500m"), 500 * 1024 ** 2)
+        self.assertEqual(run_cache.parse_size("1.5k"), 1536)
+        self.assertEqual(run_cache.parse_size(2048), 2048)
+        with self.assertRaises(ValueError):
+            run_cache.parse_size("lots")
+
+
+class RunCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = run_cache.RunCache(
+            os.path.join(self.directory.name, "cache"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def store(self, key, size, last_used):
+        """
+        Store an entry with a results file of a given size, last used at a
+        given time.
+
+        :param key: Key of the entry.
+        :param size: Size of the results file in bytes.
+        :param last_used: Time the entry was last used.
+        """
+        results = os.path.join(self.directory.name, key)
+        os.makedirs(results)
+        with open(os.path.join(results, "time.txt"), "w") as f:
+            f.write("x" * size)
+        self.cache.store(key, {}, results)
+        path = os.path.join(self.cache.root, key, run_cache.MANIFEST)
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        manifest["last_used"] = last_used
+        with open(path, "w") as f:
+            json.dump(manifest, f)
+
+    def test_store_and_restore(self):
+        self.store("a", 10, time.time())
+        self.assertTrue(self.cache.lookup("a"))
+        self.assertFalse(self.cache.lookup("b"))
+        restored = os.path.join(self.directory.name, "restored")
+        self.cache.restore("a", restored)
+        self.assertEqual(os.listdir(restored), ["time.txt"])
+
+    def test_evict_by_age(self):
+        now = time.time()
+        self.store("old", 10, now - 3 * 24 * 3600)
+        self.store("new", 10, now - 3600)
+        self.assertEqual(self.cache.evict(max_age=2), 1)
+        self.assertFalse(self.cache.lookup("old"))
+        self.assertTrue(self.cache.lookup("new"))
+
+    def test_evict_least_recently_used(self):
+        now = time.time()
+        for i, key in enumerate(("a", "b", "c")):
+            self.store(key, 1000, now - (3 - i) * 60)
+        # Using an entry makes it the most recently used one
+        self.cache.restore("a", os.path.join(self.directory.name, "out"))
+        self.assertEqual(self.cache.evict(max_size=2500), 1)
+        self.assertFalse(self.cache.lookup("b"))
+        self.assertTrue(self.cache.lookup("a"))
+        self.assertTrue(self.cache.lookup("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+test_time_alignment.py
+
+Checks the windowed join of the time aligner on a small synthetic run, whose
+data, energy and CPU time per window are known in advance.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
+
+from time_alignment import TimeAligner, between, window_sums  # noqa: E402
+
+START = 100.0
+
+
+def write_run(directory):
+    """
+    Write a run of one iteration of one second. The protocol sends 10 kB in
+    every nethogs refresh for the first 0.9 seconds, uses 5 W and one core.
+
+    :param directory: Results directory of the run.
+    """
+    with open(os.path.join(directory, "time.txt"), "w") as f:
+        f.write(f"iteration_start_0: {START}\n")
+        f.write(f"iteration_stop_0: {START + 1}\n")
+        f.write("nethogs_0: 1.0\n")
+
+    with open(os.path.join(directory, "nethogs_0.txt"), "w") as f:
+        for refresh in range(10):
+            f.write("Refreshing:\n")
+            f.write(f"./meteor.out/42/0\t{10.0 * refresh}\t0.0\n")
+
+    with open(os.path.join(directory, "scaphandre.json"), "w") as f:
+        for sample in range(-2, 23):
+            timestamp = START + sample * 0.05
+            f.write(json.dumps({"consumers": [
+                {"exe": "/app/meteor.out", "pid": 42, "consumption": 5.0,
+                 "timestamp": timestamp, "container": {"name": "c"}},
+                {"exe": "/usr/sbin/nethogs", "pid": 43, "consumption": 1.0,
+                 "timestamp": timestamp, "container": {"name": "c"}}]}))
+
+    with open(os.path.join(directory, "resources_0.txt"), "w") as f:
+        f.write("timestamp\tpid\tcpu_percent\n")
+        for sample in range(-2, 23):
+            f.write(f"{START + sample * 0.05}\t42\t100.0\n")
+
+
+class TimeAlignerTest(unittest.TestCase):
+    def test_join_windows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_run(directory)
+            aligner = TimeAligner({"results": directory,
+                                   "execfile": "meteor.out"}, window=0.25)
+            aligner.build()
+            result = aligner.join()
+            windows = np.array(aligner.windows())
+
+        np.testing.assert_array_equal(windows[:, 0], [0, 0, 0, 0])
+        np.testing.assert_allclose(windows[:, 1], [0, 0.25, 0.5, 0.75])
+        # The data grows by 100 kB/s until the last refresh at 0.9 s
+        np.testing.assert_allclose(windows[:, 2], [25, 25, 25, 15])
+        np.testing.assert_allclose(windows[:, 3], [1.25] * 4)
+        np.testing.assert_allclose(windows[:, 4], [0.25] * 4)
+        self.assertAlmostEqual(result["data_per_joule"], 18)
+        self.assertAlmostEqual(result["iterations"][0], 18)
+        # The power is constant, so it is not correlated with anything
+        self.assertIsNone(result["correlations"]["bandwidth_power"])
+
+    def test_window_sums(self):
+        timestamps = np.array([0.0, 1.0, 2.0])
+        cumulative = np.array([0.0, 10.0, 30.0])
+        np.testing.assert_allclose(
+            window_sums(timestamps, cumulative, [0.0, 0.5, 1.5, 3.0]),
+            [5, 15, 10])
+        np.testing.assert_allclose(
+            window_sums(np.array([]), np.array([]), [0.0, 1.0]), [0])
+
+    def test_between_includes_neighbours(self):
+        timeline = np.column_stack([np.arange(10.0), np.arange(10.0)])
+        np.testing.assert_array_equal(
+            between(timeline, 3.5, 5.5)[:, 0], [3, 4, 5, 6])
+
+
+if __name__ == "__main__":
+    unittest.main()